@@ -4,23 +4,26 @@ from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
 from fastapi.responses import JSONResponse, FileResponse, Response  # type: ignore
 from fastapi.exceptions import RequestValidationError  # type: ignore
+from fastapi.encoders import jsonable_encoder  # type: ignore
 from pydantic import BaseModel  # type: ignore
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import random
 import time
 import re
 import csv
 import hashlib
-import math
 import base64
 import os
 import sqlite3
 import json
 from pathlib import Path
-import tempfile
-import subprocess
 import threading
+from contextlib import AsyncExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from functools import wraps
 from uuid import uuid4
 from app.core.config import load_env
 
@@ -36,9 +39,17 @@ from app.services.gemini_service import (
 import logging
 import httpx  # type: ignore
 from app.services.fal_service import generate_images as fal_generate_images, generate_video as fal_generate_video, generate_kling_image_to_video as fal_generate_kling_video
-from app.services.video_service import create_video_from_url, check_ffmpeg_available, get_ffmpeg_path
+from app.services.video_service import create_video_from_url, check_ffmpeg_available
+from app.services.render_executor import get_render_stats
+from app.services.source_image_cache import get_source_image_cache
 from app.services.video_config import get_video_presets, get_video_preset
 from app.services.human_video_service import check_ffmpeg_available as check_ffmpeg_available_human
+from app.services.ffmpeg_capabilities import get_ffmpeg_capabilities, refresh_ffmpeg_capabilities
+from app.services.media_probe import MediaProbe, probe_media
+from app.services.scene_executor import SceneAnalysisExecutor
+from app.services.recheck_scheduler import RecheckScheduler, RECHECK_ENABLED
+from app.services.schema_migrations import apply_migrations, get_schema_version
+from app.services.db_pool import SQLitePool
 from app.services.face_detection import has_human_face
 from app.services.motion_logic import (
     get_motion_variations,
@@ -56,7 +67,10 @@ from autopost.feedback import (
     refresh_feedback_weights,
     get_learning_strength,
     refresh_global_feedback_weights,
-    get_global_feedback_weights
+    get_global_feedback_weights,
+    get_engagement_rates,
+    rebuild_engagement_aggregates,
+    record_engagement_sample
 )
 from app.services.supabase_service import (
     get_user_profile,
@@ -71,6 +85,7 @@ from app.services.supabase_service import (
     update_user_quota,
     update_user_coins,
     get_profile_by_user_id,
+    get_profiles_by_user_ids,
     list_auth_users,
     list_midtrans_transactions,
     list_midtrans_transactions_filtered,
@@ -78,9 +93,6 @@ from app.services.supabase_service import (
     list_profiles_due_for_renewal,
     list_recent_reminders,
     insert_subscription_reminder,
-    get_user_by_id,
-    ensure_user_profile,
-    verify_user_token,
     upload_image_to_supabase_storage,
     convert_base64_to_image_bytes,
     get_user_identity_record,
@@ -89,8 +101,27 @@ from app.services.supabase_service import (
     create_avatar_ref_signed_url,
     insert_midtrans_transaction_log,
     insert_admin_adjustment,
-    list_admin_adjustments
+    list_admin_adjustments,
+    get_profile_cache_stats
 )
+from app.services.supabase_async import (
+    aclose_async_client,
+    get_user_by_id_async,
+    get_user_profile_async,
+    get_profile_by_user_id_async,
+    ensure_user_profile_async,
+    update_user_coins_async,
+    update_user_trial_remaining_async
+)
+from app.services.auth_verifier import get_auth_verifier
+from app.services.job_queue import JobQueue, JobFailed
+from app.services.trend_index import TrendIndex
+from app.services.embedding_cache import get_embedding_cache
+from app.services.embedding_client import EmbeddingClient
+from app.services.trend_embedding_store import TrendEmbeddingStore, trend_content_hash
+from app.services.qdrant_trends import QdrantTrendStore
+from app.services.trends_dataset import TrendsCsvCache
+from app.services.score_cache import ScoreCache, SCORE_CACHE_SQLITE
 from app.services.image_preprocessor import preprocess_image
 from app.core.logging import setup_logging
 
@@ -122,6 +153,16 @@ RATE_LIMIT_WINDOW_SECONDS = 5 * 60
 RATE_LIMIT_AUTH_LIMIT = 30
 RATE_LIMIT_ANON_LIMIT = 10
 
+async def _verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a Supabase JWT; cache hits never leave the event loop."""
+    verifier = get_auth_verifier()
+    cached = verifier.get_cached(token)
+    if cached:
+        return cached
+    # First sight of a token may need a JWKS fetch and the remote confirmation.
+    return await asyncio.to_thread(verifier.verify, token)
+
+
 # Authentication dependency
 async def get_current_user(request: Request, authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
     """Verify Supabase JWT token and return user info."""
@@ -131,7 +172,7 @@ async def get_current_user(request: Request, authorization: Optional[str] = Head
     try:
         # Extract token from "Bearer <token>" format
         token = authorization.replace("Bearer ", "").strip()
-        user = verify_user_token(token)
+        user = await _verify_access_token(token)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         user_id = user.get("id")
@@ -139,10 +180,10 @@ async def get_current_user(request: Request, authorization: Optional[str] = Head
             raise HTTPException(status_code=401, detail="User ID not found in token")
 
         # SECURITY: validate profile existence and status; no side effects in auth.
-        profile = get_user_profile(user_id)
+        profile = await get_user_profile_async(user_id)
         if not profile:
             try:
-                profile = ensure_user_profile(
+                profile = await ensure_user_profile_async(
                     user_id,
                     user.get("user_metadata", {}).get("full_name")
                 )
@@ -173,7 +214,7 @@ async def get_current_user_raw(request: Request, authorization: Optional[str] =
         raise HTTPException(status_code=401, detail="Authorization header required")
     try:
         token = authorization.replace("Bearer ", "").strip()
-        user = verify_user_token(token)
+        user = await _verify_access_token(token)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         user_id = user.get("id")
@@ -237,6 +278,7 @@ async def require_admin_or_reminder_token(
 # Database path
 BACKEND_ROOT = Path(__file__).resolve().parents[1]
 DB_PATH = BACKEND_ROOT / 'premium_studio.db'
+DB_POOL = SQLitePool(str(DB_PATH))
 AUTPOST_TEMP_DIR = BACKEND_ROOT / 'temp_videos'
 AUTPOST_TEMP_DIR.mkdir(parents=True, exist_ok=True)
 # SECURITY: restrict file access to a safe base directory.
@@ -247,6 +289,8 @@ AUTPOST_LLM_MODEL = os.getenv("AUTPOST_LLM_MODEL", "gemini-1.5-flash")
 AUTPOST_LLM_PROVIDER = os.getenv("AUTPOST_LLM_PROVIDER", "gemini")  # gemini | ollama | openai_compat
 AUTPOST_LLM_BASE_URL = os.getenv("AUTPOST_LLM_BASE_URL", "http://127.0.0.1:11434")
 AUTPOST_SCORE_CACHE_TTL = int(os.getenv("AUTPOST_SCORE_CACHE_TTL", "900"))  # seconds
+AUTPOST_SCORE_BATCH = os.getenv("AUTPOST_SCORE_BATCH", "true").lower() in {"1", "true", "yes", "on"}
+AUTPOST_SCORE_BATCH_CONCURRENCY = max(1, int(os.getenv("AUTPOST_SCORE_BATCH_CONCURRENCY", "3")))
 AUTPOST_RATE_LIMIT_PER_MIN = int(os.getenv("AUTPOST_RATE_LIMIT_PER_MIN", "10"))
 AUTPOST_MAX_TEMP_AGE_HOURS = int(os.getenv("AUTPOST_MAX_TEMP_AGE_HOURS", "24"))
 AUTPOST_SCENE_PROVIDER = os.getenv("AUTPOST_SCENE_PROVIDER", "none").lower()  # none | openscenesense | http
@@ -260,11 +304,14 @@ AUTPOST_SCENE_SAMPLE_SCALE = int(os.getenv("AUTPOST_SCENE_SAMPLE_SCALE", "480"))
 AUTPOST_VOICE_SAMPLE_SECONDS = float(os.getenv("AUTPOST_VOICE_SAMPLE_SECONDS", "6"))
 AUTPOST_VOICE_VAD_MODE = int(os.getenv("AUTPOST_VOICE_VAD_MODE", "2"))  # 0-3, higher is more aggressive
 AUTPOST_TRENDS_CSV = BACKEND_ROOT / "trends.csv"
+AUTPOST_TRENDS_DATA = TrendsCsvCache(AUTPOST_TRENDS_CSV)
 AUTPOST_EMBEDDING_PROVIDER = os.getenv("AUTPOST_EMBEDDING_PROVIDER", "ollama")  # ollama | openai_compat
 AUTPOST_EMBEDDING_MODEL = os.getenv("AUTPOST_EMBEDDING_MODEL", "nomic-embed-text")
+AUTPOST_EMBEDDING_CLIENT = EmbeddingClient(AUTPOST_EMBEDDING_PROVIDER, AUTPOST_LLM_BASE_URL, AUTPOST_EMBEDDING_MODEL)
 AUTPOST_QDRANT_URL = os.getenv("AUTPOST_QDRANT_URL", "")
 AUTPOST_QDRANT_API_KEY = os.getenv("AUTPOST_QDRANT_API_KEY", "")
 AUTPOST_QDRANT_COLLECTION = os.getenv("AUTPOST_QDRANT_COLLECTION", "autopost_trends")
+AUTPOST_QDRANT = QdrantTrendStore(AUTPOST_QDRANT_URL, AUTPOST_QDRANT_API_KEY, AUTPOST_QDRANT_COLLECTION)
 AUTPOST_HASHTAG_REGEX = os.getenv("AUTPOST_HASHTAG_REGEX", r"^#[a-z0-9_]{2,40}$")
 AUTPOST_CATEGORY_WHITELIST = os.getenv(
     "AUTPOST_CATEGORY_WHITELIST",
@@ -320,127 +367,26 @@ def init_database():
     """Initialize database and create tables if they don't exist"""
     from datetime import datetime
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = DB_POOL.acquire()
         cursor = conn.cursor()
         
         # Remove deprecated allowlist table
         cursor.execute('DROP TABLE IF EXISTS authorized_users')
 
-        # Create autopost_videos table for dashboard queue
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS autopost_videos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                file_name TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                title TEXT,
-                caption TEXT,
-                hook_text TEXT,
-                cta_text TEXT,
-                hashtags TEXT,
-                category TEXT,
-                title_source TEXT,
-                hook_source TEXT,
-                cta_source TEXT,
-                hashtags_source TEXT,
-                status TEXT NOT NULL,
-                score REAL,
-                score_details TEXT,
-                score_reasons TEXT,
-                threshold REAL,
-                next_check_at TEXT,
-                scheduled_at TEXT,
-                status_note TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                error TEXT
-            )
-        ''')
-
-        # Ensure new columns exist for older databases
-        for column_def in [
-            "title_source TEXT",
-            "hook_source TEXT",
-            "cta_source TEXT",
-            "hashtags_source TEXT",
-            "score_reasons TEXT",
-            "scheduled_at TEXT",
-            "status_note TEXT",
-        ]:
-            try:
-                cursor.execute(f"ALTER TABLE autopost_videos ADD COLUMN {column_def}")
-            except sqlite3.OperationalError:
-                pass
+        # Tables, late-added columns and hot-path indexes, each recorded in schema_migrations
+        applied = apply_migrations(conn)
+        if applied:
+            logger.info(f"Schema migrated to version {get_schema_version(conn)} (applied {applied})")
 
-        # Create autopost_metrics table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS autopost_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                video_id INTEGER NOT NULL,
-                views INTEGER DEFAULT 0,
-                likes INTEGER DEFAULT 0,
-                comments INTEGER DEFAULT 0,
-                shares INTEGER DEFAULT 0,
-                avg_watch_time REAL,
-                retention_curve TEXT,
-                posted_at TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-
-        # Create autopost_competitors table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS autopost_competitors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                url TEXT,
-                notes TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-
-        # Create autopost_pattern_feedback table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS autopost_pattern_feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                pattern_type TEXT NOT NULL,
-                pattern_key TEXT NOT NULL,
-                weight REAL NOT NULL DEFAULT 1.0,
-                updated_at TEXT NOT NULL,
-                UNIQUE(user_id, pattern_type, pattern_key)
-            )
-        ''')
-
-        # Create autopost_pattern_feedback_global table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS autopost_pattern_feedback_global (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT NOT NULL,
-                pattern_key TEXT NOT NULL,
-                weight REAL NOT NULL DEFAULT 1.0,
-                updated_at TEXT NOT NULL,
-                UNIQUE(pattern_type, pattern_key)
-            )
-        ''')
-
-        # Create admin audit logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admin_audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                actor_user_id TEXT NOT NULL,
-                actor_email TEXT,
-                action TEXT NOT NULL,
-                target_user_id TEXT,
-                details TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        
         # Bootstrap admin users in Supabase (optional)
         conn.commit()
+
+        # One-time backfill of engagement aggregates for databases that predate the table
+        has_aggregates = conn.execute("SELECT 1 FROM autopost_engagement_aggregates LIMIT 1").fetchone()
+        has_metrics = conn.execute("SELECT 1 FROM autopost_metrics LIMIT 1").fetchone()
+        if has_metrics and not has_aggregates:
+            replayed = rebuild_engagement_aggregates(conn)
+            logger.info(f"Backfilled engagement aggregates from {replayed} metrics rows")
         conn.close()
         logger.info(f"Database initialized at: {DB_PATH}")
     except Exception as e:
@@ -462,6 +408,17 @@ def bootstrap_admin_profiles() -> None:
 init_database()
 bootstrap_admin_profiles()
 
+# Durable queue for long-running generation endpoints (handlers registered next to the endpoints)
+GENERATION_JOBS = JobQueue(str(DB_PATH))
+GENERATION_JOBS.init_schema()
+AUTPOST_TREND_EMBEDDINGS = TrendEmbeddingStore(str(DB_PATH))
+AUTPOST_TREND_EMBEDDINGS.init_schema()
+AUTPOST_SCORE_CACHE = ScoreCache(
+    AUTPOST_SCORE_CACHE_TTL,
+    db_path=str(DB_PATH) if SCORE_CACHE_SQLITE else None
+)
+AUTPOST_SCORE_CACHE.init_schema()
+
 
 def _trial_guard(profile: Dict[str, Any], user_id: str) -> None:
     expires_at = profile.get("subscribed_until") or profile.get("subscription_expires_at")
@@ -484,12 +441,12 @@ def _trial_guard(profile: Dict[str, Any], user_id: str) -> None:
         )
 
 
-def _get_profile_for_user(current_user: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+async def _get_profile_for_user(current_user: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
     """Security: always resolve profile server-side before sensitive operations."""
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    profile = get_user_profile(user_id)
+    profile = await get_user_profile_async(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     return user_id, profile
@@ -507,34 +464,33 @@ def _require_coins(profile: Dict[str, Any], cost: int) -> int:
 
 
 def _log_admin_audit(
-    conn: sqlite3.Connection,
     actor_user_id: str,
     actor_email: Optional[str],
     action: str,
     target_user_id: Optional[str],
     details: Optional[Dict[str, Any]] = None
 ) -> None:
-    conn.execute(
-        """
-        INSERT INTO admin_audit_logs (actor_user_id, actor_email, action, target_user_id, details, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            actor_user_id,
-            actor_email,
-            action,
-            target_user_id,
-            json.dumps(details or {}),
-            _now_iso()
+    """Append one admin audit row; blocking, so async handlers call it via asyncio.to_thread."""
+    with DB_POOL.write() as conn:
+        conn.execute(
+            """
+            INSERT INTO admin_audit_logs (actor_user_id, actor_email, action, target_user_id, details, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                actor_user_id,
+                actor_email,
+                action,
+                target_user_id,
+                json.dumps(details or {}),
+                _now_iso()
+            )
         )
-    )
 
 # Database helper functions
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get a pooled database connection (Row factory); close() hands it back to the pool"""
+    return DB_POOL.acquire()
 
 
 def get_user_role_from_profile(user_id: str) -> Optional[str]:
@@ -776,165 +732,86 @@ def _refresh_trends_index() -> int:
         prepared_rows.append(prepared)
         texts.append(text)
     try:
-        vectors = _embed_texts(texts) if texts else []
+        vectors = AUTPOST_TREND_EMBEDDINGS.sync(
+            AUTPOST_EMBEDDING_PROVIDER, AUTPOST_EMBEDDING_MODEL, prepared_rows, texts, _embed_texts
+        ) if texts else []
     except Exception as e:
-        logger.warning(f"Failed to embed trends texts (LLM server unreachable?): {e}")
+        logger.warning(f"Failed to load trend embeddings: {e}")
         vectors = []
+    has_vectors = any(vector is not None for vector in vectors)
     AUTPOST_TRENDS_INDEX["rows"] = prepared_rows
-    AUTPOST_TRENDS_INDEX["vectors"] = vectors
-    if vectors and AUTPOST_QDRANT_URL:
-        _upsert_qdrant_trends(prepared_rows, vectors)
+    AUTPOST_TRENDS_INDEX["index"] = TrendIndex(prepared_rows, vectors) if has_vectors else None
+    if has_vectors and AUTPOST_QDRANT.enabled:
+        _sync_qdrant_trends(prepared_rows, vectors)
     return len(prepared_rows)
 
 
+def _sync_qdrant_trends(rows: List[Dict[str, Any]], vectors: List[Any]) -> None:
+    hashes: List[str] = []
+    embedded: List[Any] = []
+    payloads: List[Dict[str, Any]] = []
+    for row, vector in zip(rows, vectors):
+        if vector is None:
+            continue
+        hashes.append(trend_content_hash(
+            AUTPOST_EMBEDDING_PROVIDER, AUTPOST_EMBEDDING_MODEL, row.get("hashtag", ""), row.get("category", "")
+        ))
+        embedded.append(vector)
+        payloads.append({
+            "category": row.get("category"),
+            "hashtag": row.get("hashtag"),
+            "weight": row.get("weight", 1.0)
+        })
+    try:
+        AUTPOST_QDRANT.sync(hashes, embedded, payloads)
+    except Exception as e:
+        logger.warning(f"Qdrant trends sync failed: {e}")
 
 
-def _cosine_vec(a: List[float], b: List[float]) -> float:
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(y * y for y in b))
-    if norm_a == 0.0 or norm_b == 0.0:
-        return 0.0
-    return dot / (norm_a * norm_b)
 
 
 def _embed_texts(texts: List[str]) -> List[List[float]]:
-    if not texts:
-        return []
-    if AUTPOST_EMBEDDING_PROVIDER == "ollama":
-        vectors: List[List[float]] = []
-        for text in texts:
-            r = httpx.post(
-                f"{AUTPOST_LLM_BASE_URL}/api/embeddings",
-                json={"model": AUTPOST_EMBEDDING_MODEL, "prompt": text},
-                timeout=30.0
-            )
-            r.raise_for_status()
-            vectors.append(r.json().get("embedding", []))
-        return vectors
-    if AUTPOST_EMBEDDING_PROVIDER == "openai_compat":
-        response = httpx.post(
-            f"{AUTPOST_LLM_BASE_URL}/v1/embeddings",
-            json={"model": AUTPOST_EMBEDDING_MODEL, "input": texts},
-            timeout=30.0
-        )
-        response.raise_for_status()
-        data = response.json()
-        return [d.get("embedding", []) for d in data.get("data", [])]
-    return []
+    return AUTPOST_EMBEDDING_CLIENT.embed(texts)
+
+
+def _embed_query(text: str) -> List[float]:
+    """Embed one search query through the LRU/TTL cache; empty list when embedding fails."""
+    cache = get_embedding_cache()
+    key = cache.key(AUTPOST_EMBEDDING_PROVIDER, AUTPOST_EMBEDDING_MODEL, text)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    vectors = _embed_texts([text])
+    vector = vectors[0] if vectors and vectors[0] else []
+    cache.set(key, vector)
+    return vector
 
 
 def _search_trends(query_text: str, category: Optional[str], limit: int = 8) -> List[Dict[str, Any]]:
     rows = AUTPOST_TRENDS_INDEX.get("rows", [])
-    vectors = AUTPOST_TRENDS_INDEX.get("vectors", [])
+    index: Optional[TrendIndex] = AUTPOST_TRENDS_INDEX.get("index")
     if AUTPOST_QDRANT_URL:
         results = _search_qdrant_trends(query_text, category, limit)
         if results:
             return results
-    if not rows or not vectors:
-        rows = _load_trends_csv()
-        return rows[:limit]
+    if not rows or index is None:
+        return AUTPOST_TRENDS_DATA.get().top(category, limit)
 
     category_key = (category or "").strip().lower()
-    query_vecs = _embed_texts([f"{query_text} {category_key}".strip()])
-    if not query_vecs or not query_vecs[0]:
-        return rows[:limit]
-    query_vec = query_vecs[0]
-    scored: List[Dict[str, Any]] = []
-    for idx, row in enumerate(rows):
-        score = _cosine_vec(query_vec, vectors[idx]) if idx < len(vectors) else 0.0
-        if row.get("category") == category_key:
-            score += 0.05
-        elif row.get("category") in ("", "general", "all"):
-            score += 0.02
-        scored.append({
-            "hashtag": row.get("hashtag"),
-            "category": row.get("category"),
-            "score": score,
-            "weight": row.get("weight", 1.0)
-        })
-    scored.sort(key=lambda r: r["score"], reverse=True)
-    return scored[:limit]
-
-
-def _qdrant_headers() -> Dict[str, str]:
-    headers: Dict[str, str] = {"Content-Type": "application/json"}
-    if AUTPOST_QDRANT_API_KEY:
-        headers["api-key"] = AUTPOST_QDRANT_API_KEY
-    return headers
-
-
-def _ensure_qdrant_collection(vector_size: int) -> None:
-    try:
-        response = httpx.get(
-            f"{AUTPOST_QDRANT_URL}/collections/{AUTPOST_QDRANT_COLLECTION}",
-            headers=_qdrant_headers(),
-            timeout=10.0
-        )
-        if response.status_code == 200:
-            return
-    except Exception:
-        pass
-
-    httpx.put(
-        f"{AUTPOST_QDRANT_URL}/collections/{AUTPOST_QDRANT_COLLECTION}",
-        headers=_qdrant_headers(),
-        json={"vectors": {"size": vector_size, "distance": "Cosine"}},
-        timeout=20.0
-    ).raise_for_status()
-
-
-def _upsert_qdrant_trends(rows: List[Dict[str, Any]], vectors: List[List[float]]) -> None:
-    if not AUTPOST_QDRANT_URL or not vectors:
-        return
-    vector_size = len(vectors[0]) if vectors and vectors[0] else 0
-    if vector_size == 0:
-        return
-    _ensure_qdrant_collection(vector_size)
-    points = []
-    for idx, row in enumerate(rows):
-        if idx >= len(vectors):
-            break
-        points.append({
-            "id": idx + 1,
-            "vector": vectors[idx],
-            "payload": {
-                "category": row.get("category"),
-                "hashtag": row.get("hashtag"),
-                "weight": row.get("weight", 1.0)
-            }
-        })
-    httpx.put(
-        f"{AUTPOST_QDRANT_URL}/collections/{AUTPOST_QDRANT_COLLECTION}/points",
-        headers=_qdrant_headers(),
-        json={"points": points},
-        timeout=30.0
-    ).raise_for_status()
+    query_vec = _embed_query(f"{query_text} {category_key}".strip())
+    if not query_vec:
+        return AUTPOST_TRENDS_DATA.get().top(category_key, limit)
+    return index.search(query_vec, category_key, limit)
 
 
 def _search_qdrant_trends(query_text: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
-    if not AUTPOST_QDRANT_URL:
+    if not AUTPOST_QDRANT.enabled:
         return []
-    query_vecs = _embed_texts([query_text])
-    if not query_vecs or not query_vecs[0]:
+    query_vec = _embed_query(query_text)
+    if not query_vec:
         return []
-    query_vec = query_vecs[0]
-    filter_obj = None
     category_key = (category or "").strip().lower()
-    if category_key:
-        filter_obj = {"must": [{"key": "category", "match": {"value": category_key}}]}
-    response = httpx.post(
-        f"{AUTPOST_QDRANT_URL}/collections/{AUTPOST_QDRANT_COLLECTION}/points/search",
-        headers=_qdrant_headers(),
-        json={"vector": query_vec, "limit": limit, "with_payload": True, "filter": filter_obj},
-        timeout=20.0
-    )
-    if response.status_code != 200:
-        return []
-    data = response.json()
-    results = data.get("result", [])
+    results = AUTPOST_QDRANT.search(query_vec, category_key, limit)
     scored = []
     for item in results:
         payload = item.get("payload") or {}
@@ -954,22 +831,38 @@ def _search_qdrant_trends(query_text: str, category: Optional[str], limit: int)
 
 
 def _qdrant_count(category: Optional[str]) -> Optional[int]:
-    if not AUTPOST_QDRANT_URL:
+    if not AUTPOST_QDRANT.enabled:
         return None
-    category_key = (category or "").strip().lower()
-    filter_obj = None
-    if category_key:
-        filter_obj = {"must": [{"key": "category", "match": {"value": category_key}}]}
-    response = httpx.post(
-        f"{AUTPOST_QDRANT_URL}/collections/{AUTPOST_QDRANT_COLLECTION}/points/count",
-        headers=_qdrant_headers(),
-        json={"filter": filter_obj, "exact": True},
-        timeout=10.0
-    )
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data.get("result", {}).get("count")
+    return AUTPOST_QDRANT.count((category or "").strip().lower())
+
+
+TrendContext = Tuple[List[str], float, List[Dict[str, Any]]]
+
+# Memo of _get_trend_context results for the current request / scoring call, keyed by (query, category).
+_TREND_CONTEXT_MEMO: ContextVar[Optional[Dict[Tuple[str, str], TrendContext]]] = ContextVar(
+    "trend_context_memo", default=None
+)
+
+
+@contextmanager
+def _trend_context_scope():
+    """Share trend lookups inside this block; nested scopes reuse the outer memo."""
+    if _TREND_CONTEXT_MEMO.get() is not None:
+        yield
+        return
+    token = _TREND_CONTEXT_MEMO.set({})
+    try:
+        yield
+    finally:
+        _TREND_CONTEXT_MEMO.reset(token)
+
+
+def _trend_context_scoped(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _trend_context_scope():
+            return func(*args, **kwargs)
+    return wrapper
 
 
 def _get_trend_context(
@@ -979,11 +872,18 @@ def _get_trend_context(
     cta_text: Optional[str],
     hashtags: Optional[str],
     category: Optional[str]
-) -> Tuple[List[str], float, List[Dict[str, Any]]]:
+) -> TrendContext:
     query = " ".join([t for t in [title, caption, hook_text, cta_text, hashtags] if t])
+    memo = _TREND_CONTEXT_MEMO.get()
+    memo_key = (query, (category or "").strip().lower())
+    if memo is not None and memo_key in memo:
+        trend_list, best_score, results = memo[memo_key]
+        return list(trend_list), best_score, list(results)
     results = _search_trends(query, category, limit=8)
     trend_list = [r.get("hashtag") for r in results if r.get("hashtag")]
     best_score = max([r.get("score", 0.0) for r in results], default=0.0)
+    if memo is not None:
+        memo[memo_key] = (list(trend_list), best_score, list(results))
     return trend_list, best_score, results
 
 
@@ -1003,40 +903,6 @@ def _compute_engagement_rate(views: int, likes: int, comments: int, shares: int)
     return (likes + comments + shares) / views
 
 
-def _fetch_recent_performance(
-    conn: sqlite3.Connection,
-    user_id: str,
-    limit: int = 50
-) -> List[Dict[str, Any]]:
-    rows = conn.execute(
-        """
-        SELECT v.category, v.hook_text, v.cta_text, v.hashtags,
-               m.views, m.likes, m.comments, m.shares
-        FROM autopost_metrics m
-        JOIN autopost_videos v ON v.id = m.video_id
-        WHERE m.user_id = ?
-        ORDER BY m.created_at DESC
-        LIMIT ?
-        """,
-        (user_id, limit)
-    ).fetchall()
-    results: List[Dict[str, Any]] = []
-    for row in rows:
-        results.append({
-            "category": row["category"],
-            "hook_text": row["hook_text"],
-            "cta_text": row["cta_text"],
-            "hashtags": row["hashtags"] or "",
-            "engagement_rate": _compute_engagement_rate(
-                int(row["views"] or 0),
-                int(row["likes"] or 0),
-                int(row["comments"] or 0),
-                int(row["shares"] or 0)
-            )
-        })
-    return results
-
-
 def _apply_feedback_loop(
     user_id: Optional[str],
     category: Optional[str],
@@ -1055,9 +921,11 @@ def _apply_feedback_loop(
             "reasons": []
         }
     conn = get_db_connection()
-    rows = _fetch_recent_performance(conn, user_id, limit=50)
-    conn.close()
-    if not rows:
+    try:
+        rates = get_engagement_rates(conn, user_id, category, hook_text, cta_text, trend_tags)
+    finally:
+        conn.close()
+    if rates["overall"] is None:
         return {
             "overall_rate": 0.0,
             "category_rate": None,
@@ -1068,34 +936,11 @@ def _apply_feedback_loop(
             "reasons": []
         }
 
-    def _avg(values: List[float]) -> Optional[float]:
-        if not values:
-            return None
-        return sum(values) / max(1, len(values))
-
-    overall_rate = _avg([r["engagement_rate"] for r in rows]) or 0.0
-    category_rate = _avg([
-        r["engagement_rate"]
-        for r in rows
-        if category and (r["category"] or "").lower() == category.lower()
-    ])
-    hook_rate = _avg([
-        r["engagement_rate"]
-        for r in rows
-        if hook_text and (r["hook_text"] or "").strip().lower() == hook_text.strip().lower()
-    ])
-    cta_rate = _avg([
-        r["engagement_rate"]
-        for r in rows
-        if cta_text and (r["cta_text"] or "").strip().lower() == cta_text.strip().lower()
-    ])
-    trend_rate = None
-    if trend_tags:
-        trend_rate = _avg([
-            r["engagement_rate"]
-            for r in rows
-            if any(tag in (r["hashtags"] or "") for tag in trend_tags)
-        ])
+    overall_rate = rates["overall"] or 0.0
+    category_rate = rates["category"]
+    hook_rate = rates["hook"]
+    cta_rate = rates["cta"]
+    trend_rate = rates["hashtag"] if trend_tags else None
 
     delta = 0.0
     reasons: List[str] = []
@@ -1298,88 +1143,6 @@ def _analyze_scene_with_openscenesense(file_path: str) -> Optional[Dict[str, Any
     return None
 
 
-def _get_ffprobe_path() -> str:
-    ffmpeg_path = get_ffmpeg_path()
-    if ffmpeg_path.lower().endswith("ffmpeg.exe"):
-        return ffmpeg_path[:-9] + "ffprobe.exe"
-    if ffmpeg_path.lower().endswith("ffmpeg"):
-        return ffmpeg_path[:-6] + "ffprobe"
-    return "ffprobe"
-
-
-def _detect_audio_presence(file_path: str) -> Optional[bool]:
-    try:
-        ffprobe_path = _get_ffprobe_path()
-        cmd = [
-            ffprobe_path,
-            "-v",
-            "error",
-            "-show_streams",
-            "-of",
-            "json",
-            file_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=6)
-        if result.returncode != 0:
-            return None
-        data = json.loads(result.stdout or "{}")
-        streams = data.get("streams") or []
-        return any(stream.get("codec_type") == "audio" for stream in streams)
-    except Exception:
-        return None
-
-
-def _detect_voice_presence(file_path: str) -> Optional[bool]:
-    try:
-        import webrtcvad  # type: ignore
-    except Exception:
-        return None
-    try:
-        ffmpeg_path = get_ffmpeg_path()
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        tmp.close()
-        cmd = [
-            ffmpeg_path,
-            "-y",
-            "-i",
-            file_path,
-            "-t",
-            str(AUTPOST_VOICE_SAMPLE_SECONDS),
-            "-ac",
-            "1",
-            "-ar",
-            "16000",
-            tmp.name
-        ]
-        subprocess.run(cmd, capture_output=True, check=False, timeout=10)
-        if not os.path.exists(tmp.name) or os.path.getsize(tmp.name) == 0:
-            return None
-        with open(tmp.name, "rb") as f:
-            wav = f.read()
-        os.remove(tmp.name)
-        if len(wav) < 44:
-            return None
-        pcm = wav[44:]  # skip wav header
-        vad = webrtcvad.Vad(AUTPOST_VOICE_VAD_MODE)
-        frame_ms = 30
-        frame_bytes = int(16000 * 2 * frame_ms / 1000)
-        if frame_bytes <= 0:
-            return None
-        total_frames = 0
-        speech_frames = 0
-        for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes):
-            frame = pcm[i:i + frame_bytes]
-            total_frames += 1
-            if vad.is_speech(frame, 16000):
-                speech_frames += 1
-        if total_frames == 0:
-            return None
-        speech_ratio = speech_frames / total_frames
-        return speech_ratio >= 0.2
-    except Exception:
-        return None
-
-
 def _analyze_scene_with_http(file_path: str) -> Optional[Dict[str, Any]]:
     if not AUTPOST_SCENE_ENDPOINT:
         return None
@@ -1399,57 +1162,57 @@ def _analyze_scene_with_http(file_path: str) -> Optional[Dict[str, Any]]:
     return None
 
 
-def _prepare_scene_sample(file_path: str) -> Tuple[Optional[str], bool, Dict[str, Any]]:
+def _probe_scene_media(file_path: str) -> Tuple[MediaProbe, Optional[str], bool, Dict[str, Any]]:
+    """One ffmpeg pass for audio/voice signals plus the scene sample; returns (probe, sample_path, cleanup, meta)."""
     meta = {"sampled": False, "skipped_reason": None}
     try:
         size_mb = os.path.getsize(file_path) / (1024 * 1024)
     except Exception:
         size_mb = 0.0
+    scene_enabled = AUTPOST_SCENE_PROVIDER in ("http", "openscenesense")
+    capabilities = get_ffmpeg_capabilities()
+    want_sample = scene_enabled and AUTPOST_SCENE_LIGHT_MODE and capabilities.available
+    probe = MediaProbe()
+    if capabilities.available:
+        probe = probe_media(
+            file_path,
+            capabilities.ffmpeg_path,
+            voice_seconds=AUTPOST_VOICE_SAMPLE_SECONDS,
+            vad_mode=AUTPOST_VOICE_VAD_MODE,
+            sample_filter=(
+                f"scale='min({AUTPOST_SCENE_SAMPLE_SCALE},iw)':-2,fps={AUTPOST_SCENE_SAMPLE_FPS}"
+                if want_sample else None
+            ),
+            sample_seconds=AUTPOST_SCENE_SAMPLE_SECONDS
+        )
+
+    if not scene_enabled:
+        meta["skipped_reason"] = "scene_provider_disabled"
+        return probe, None, False, meta
     if AUTPOST_SCENE_LIGHT_MODE:
-        if not check_ffmpeg_available():
+        if not capabilities.available:
             if size_mb > AUTPOST_SCENE_MAX_MB:
                 meta["skipped_reason"] = "ffmpeg_unavailable_and_file_too_large"
-                return None, False, meta
+                return probe, None, False, meta
             meta["skipped_reason"] = "ffmpeg_unavailable"
-            return file_path, False, meta
-        try:
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            tmp.close()
-            ffmpeg_path = get_ffmpeg_path()
-            vf = f"scale='min({AUTPOST_SCENE_SAMPLE_SCALE},iw)':-2,fps={AUTPOST_SCENE_SAMPLE_FPS}"
-            cmd = [
-                ffmpeg_path,
-                "-y",
-                "-i",
-                file_path,
-                "-t",
-                str(AUTPOST_SCENE_SAMPLE_SECONDS),
-                "-vf",
-                vf,
-                "-an",
-                tmp.name
-            ]
-            subprocess.run(cmd, capture_output=True, check=False, timeout=10)
-            if not os.path.exists(tmp.name) or os.path.getsize(tmp.name) == 0:
-                meta["skipped_reason"] = "sample_failed"
-                return file_path, False, meta
-            meta["sampled"] = True
-            return tmp.name, True, meta
-        except Exception:
-            meta["skipped_reason"] = "sample_exception"
-            return file_path, False, meta
+            return probe, file_path, False, meta
+        if not probe.sample_path:
+            meta["skipped_reason"] = "sample_failed"
+            return probe, file_path, False, meta
+        meta["sampled"] = True
+        return probe, probe.sample_path, True, meta
     if size_mb > AUTPOST_SCENE_MAX_MB:
         meta["skipped_reason"] = "file_too_large"
-        return None, False, meta
-    return file_path, False, meta
+        return probe, None, False, meta
+    return probe, file_path, False, meta
 
 
 def _get_scene_signals(file_path: Optional[str]) -> Optional[Dict[str, Any]]:
     if not file_path:
         return None
-    audio_present = _detect_audio_presence(file_path)
-    voice_present = _detect_voice_presence(file_path) if audio_present else False if audio_present is False else None
-    sample_path, should_cleanup, meta = _prepare_scene_sample(file_path)
+    probe, sample_path, should_cleanup, meta = _probe_scene_media(file_path)
+    audio_present = probe.audio_present
+    voice_present = probe.voice_present
     if not sample_path:
         return {"_meta": meta, "audio_present": audio_present, "voice_present": voice_present}
     provider = AUTPOST_SCENE_PROVIDER
@@ -1474,37 +1237,41 @@ def _get_scene_signals(file_path: Optional[str]) -> Optional[Dict[str, Any]]:
     return result
 
 
-async def _async_scene_analysis(video_id: int, file_path: str, user_id: str) -> None:
+def _run_scene_analysis(video_id: int, file_path: str, user_id: str) -> Optional[str]:
+    """Re-score an uploaded video with scene signals; runs on a scene-analysis worker thread."""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         row = conn.execute("SELECT * FROM autopost_videos WHERE id = ?", (video_id,)).fetchone()
-        if not row:
-            return
-        scene_signals = _get_scene_signals(file_path)
-        details = _score_video_metadata(
-            row["title"],
-            row["caption"],
-            row["hook_text"],
-            row["cta_text"],
-            row["hashtags"],
-            row["category"],
-            user_id,
-            scene_signals
-        )
-        score = float(details.get("score", 0.0))
-        threshold = _adjust_threshold_with_feedback(
-            row["threshold"] or DEFAULT_AUTPOST_THRESHOLD,
-            details.get("feedback") or {},
-            float(details.get("trend_similarity") or 0.0)
-        )
-        details["threshold"] = threshold
-        compliance_blocked = bool(details.get("compliance_blocked"))
-        if compliance_blocked:
-            status = "WAITING_RECHECK"
-            next_check_at = _schedule_next_check()
-        else:
-            status = "QUEUED" if score >= threshold else "WAITING_RECHECK"
-            next_check_at = None if status == "QUEUED" else _schedule_next_check()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    scene_signals = _get_scene_signals(file_path)
+    details = _score_video_metadata(
+        row["title"],
+        row["caption"],
+        row["hook_text"],
+        row["cta_text"],
+        row["hashtags"],
+        row["category"],
+        user_id,
+        scene_signals
+    )
+    score = float(details.get("score", 0.0))
+    threshold = _adjust_threshold_with_feedback(
+        row["threshold"] or DEFAULT_AUTPOST_THRESHOLD,
+        details.get("feedback") or {},
+        float(details.get("trend_similarity") or 0.0)
+    )
+    details["threshold"] = threshold
+    compliance_blocked = bool(details.get("compliance_blocked"))
+    if compliance_blocked:
+        status = "WAITING_RECHECK"
+        next_check_at = _schedule_next_check()
+    else:
+        status = "QUEUED" if score >= threshold else "WAITING_RECHECK"
+        next_check_at = None if status == "QUEUED" else _schedule_next_check()
+    with DB_POOL.write() as conn:
         _update_autopost_record(
             conn,
             video_id,
@@ -1514,18 +1281,15 @@ async def _async_scene_analysis(video_id: int, file_path: str, user_id: str) ->
             next_check_at=next_check_at,
             threshold=threshold
         )
-        conn.commit()
-        try:
-            await _broadcast_autopost_event(user_id, "autopost.updated", {"id": video_id, "status": status})
-        except Exception as exc:
-            logger.warning(f"Broadcast autopost update failed: {exc}")
-    except Exception as exc:
-        logger.error(f"Async scene analysis failed for video_id={video_id}: {exc}", exc_info=True)
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+    return status
+
+
+AUTPOST_SCENE_ANALYSIS = SceneAnalysisExecutor(_run_scene_analysis)
+
+
+async def _async_scene_analysis(video_id: int, file_path: str, user_id: str) -> None:
+    # Only enqueues; the blocking analysis runs on the scene-analysis pool, never on the event loop.
+    AUTPOST_SCENE_ANALYSIS.submit(video_id, file_path, user_id)
 
 
 def _evaluate_compliance_gate(
@@ -1612,6 +1376,7 @@ def _evaluate_compliance_gate(
     }
 
 
+@_trend_context_scoped
 def _score_video_metadata(
     title: Optional[str],
     caption: Optional[str],
@@ -1624,11 +1389,42 @@ def _score_video_metadata(
 ) -> Dict[str, Any]:
     """LLM scoring with cache + heuristic fallback."""
     cache_key = _build_score_cache_key(title, caption, hook_text, cta_text, hashtags, category, user_id)
-    cached = _get_cached_score(cache_key)
-    if cached:
-        return cached
+    return AUTPOST_SCORE_CACHE.get_or_compute(
+        cache_key,
+        lambda: _compute_video_score(
+            title, caption, hook_text, cta_text, hashtags, category, user_id, scene_signals
+        )
+    )
 
+
+def _compute_video_score(
+    title: Optional[str],
+    caption: Optional[str],
+    hook_text: Optional[str],
+    cta_text: Optional[str],
+    hashtags: Optional[str],
+    category: Optional[str],
+    user_id: Optional[str],
+    scene_signals: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
     llm_result = _score_video_with_llm(title, caption, hook_text, cta_text, hashtags, category)
+    return _build_score_details(
+        llm_result, title, caption, hook_text, cta_text, hashtags, category, user_id, scene_signals
+    )
+
+
+def _build_score_details(
+    llm_result: Optional[Dict[str, Any]],
+    title: Optional[str],
+    caption: Optional[str],
+    hook_text: Optional[str],
+    cta_text: Optional[str],
+    hashtags: Optional[str],
+    category: Optional[str],
+    user_id: Optional[str],
+    scene_signals: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Merge an LLM result (or None for heuristic-only) with trend, scene and feedback signals."""
     if llm_result:
         details: Dict[str, Any] = dict(llm_result)
     else:
@@ -1746,10 +1542,120 @@ def _score_video_metadata(
     if feedback.get("reasons"):
         details["feedback_reasons"] = feedback.get("reasons")
         details["feedback_summary"] = " + ".join(feedback.get("reasons"))
-    _set_cached_score(cache_key, details)
     return details
 
 
+@_trend_context_scoped
+def _score_video_metadata_batch(
+    items: List[Dict[str, Optional[str]]],
+    category: Optional[str],
+    user_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score several metadata variants (title/caption/hook_text/cta_text/hashtags dicts) at once.
+    Uncached variants share one LLM prompt; if the batch answer is unusable they are scored
+    one by one, at most AUTPOST_SCORE_BATCH_CONCURRENCY at a time. Variants another caller is
+    already scoring are waited for (single-flight), not scored again.
+    """
+    fields = ("title", "caption", "hook_text", "cta_text", "hashtags")
+    keys = [_build_score_cache_key(*(item.get(f) for f in fields), category, user_id) for item in items]
+
+    def compute(positions: List[int]) -> List[Dict[str, Any]]:
+        # Runs while these keys are in flight, so it must not go back through get_or_compute.
+        batch = [items[idx] for idx in positions]
+        llm_results = _score_variants_with_llm(batch, category) if len(batch) > 1 else None
+        if llm_results is not None:
+            return [
+                _build_score_details(llm_result, *(item.get(f) for f in fields), category, user_id, None)
+                for item, llm_result in zip(batch, llm_results)
+            ]
+
+        def score_one(item: Dict[str, Optional[str]]) -> Dict[str, Any]:
+            return _compute_video_score(*(item.get(f) for f in fields), category, user_id, None)
+
+        if len(batch) == 1:
+            return [score_one(batch[0])]
+        # One context copy per call so the workers share this call's trend-context memo.
+        contexts = [copy_context() for _ in batch]
+        with ThreadPoolExecutor(max_workers=min(AUTPOST_SCORE_BATCH_CONCURRENCY, len(batch))) as executor:
+            return list(executor.map(lambda ctx, item: ctx.run(score_one, item), contexts, batch))
+
+    return AUTPOST_SCORE_CACHE.get_or_compute_many(keys, compute)
+
+
+def _call_scoring_llm(prompt: str, timeout: float = 30.0) -> str:
+    """Send a scoring prompt to the configured LLM provider; returns the raw reply ("" if none)."""
+    if AUTPOST_LLM_PROVIDER == "gemini":
+        return (generate_text_content(AUTPOST_LLM_MODEL, prompt) or "").strip()
+    if AUTPOST_LLM_PROVIDER == "ollama":
+        # Ollama local server (quantized LLaMA/Mistral)
+        response = httpx.post(
+            f"{AUTPOST_LLM_BASE_URL}/api/generate",
+            json={
+                "model": AUTPOST_LLM_MODEL,
+                "prompt": prompt,
+                "stream": False
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        return (data.get("response") or "").strip()
+    if AUTPOST_LLM_PROVIDER == "openai_compat":
+        # OpenAI-compatible API (e.g., vLLM/llama.cpp server)
+        response = httpx.post(
+            f"{AUTPOST_LLM_BASE_URL}/v1/chat/completions",
+            json={
+                "model": AUTPOST_LLM_MODEL,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.2
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        return (data.get("choices", [{}])[0].get("message", {}).get("content") or "").strip()
+    return ""
+
+
+def _normalize_llm_score(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    score = float(parsed.get("score", 0.0))
+    parsed["score"] = max(0.0, min(10.0, score))
+    parsed["provider"] = AUTPOST_LLM_PROVIDER
+    return parsed
+
+
+def _score_variants_with_llm(
+    items: List[Dict[str, Optional[str]]],
+    category: Optional[str]
+) -> Optional[List[Dict[str, Any]]]:
+    """One LLM call for all variants; None when batching is off or the reply is not a complete JSON array."""
+    if not AUTPOST_SCORE_BATCH or not items:
+        return None
+    prompt = _build_tiktok_batch_prompt(items, category)
+    try:
+        raw = _call_scoring_llm(prompt, timeout=30.0 + 10.0 * len(items))
+        if "[" not in raw or "]" not in raw:
+            return None
+        parsed = json.loads(raw[raw.find("["):raw.rfind("]") + 1])
+        if not isinstance(parsed, list):
+            return None
+        by_index: Dict[int, Dict[str, Any]] = {}
+        for position, entry in enumerate(parsed):
+            if not isinstance(entry, dict):
+                continue
+            idx = entry.pop("index", position)
+            if isinstance(idx, (int, float)) and 0 <= int(idx) < len(items):
+                by_index.setdefault(int(idx), _normalize_llm_score(entry))
+        if len(by_index) != len(items):
+            logger.warning(f"Batch LLM scoring returned {len(by_index)}/{len(items)} variants, scoring one by one")
+            return None
+        return [by_index[idx] for idx in range(len(items))]
+    except Exception as e:
+        logger.warning(f"Batch LLM scoring failed, scoring one by one: {e}")
+        return None
+
+
 def _score_video_with_llm(
     title: Optional[str],
     caption: Optional[str],
@@ -1760,52 +1666,13 @@ def _score_video_with_llm(
 ) -> Optional[Dict[str, Any]]:
     prompt = _build_tiktok_prompt(title, caption, hook_text, cta_text, hashtags, category)
     try:
-        raw = ""
-        if AUTPOST_LLM_PROVIDER == "gemini":
-            raw = (generate_text_content(AUTPOST_LLM_MODEL, prompt) or "").strip()
-            if not raw:
-                return None
-        elif AUTPOST_LLM_PROVIDER == "ollama":
-            # Ollama local server (quantized LLaMA/Mistral)
-            response = httpx.post(
-                f"{AUTPOST_LLM_BASE_URL}/api/generate",
-                json={
-                    "model": AUTPOST_LLM_MODEL,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            raw = (data.get("response") or "").strip()
-        elif AUTPOST_LLM_PROVIDER == "openai_compat":
-            # OpenAI-compatible API (e.g., vLLM/llama.cpp server)
-            response = httpx.post(
-                f"{AUTPOST_LLM_BASE_URL}/v1/chat/completions",
-                json={
-                    "model": AUTPOST_LLM_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.2
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            raw = (data.get("choices", [{}])[0].get("message", {}).get("content") or "").strip()
-        else:
-            return None
-
+        raw = _call_scoring_llm(prompt)
         if not raw:
             return None
         # Extract JSON if the model wrapped it
         if "{" in raw and "}" in raw:
             raw = raw[raw.find("{"):raw.rfind("}") + 1]
-        parsed = json.loads(raw)
-        score = float(parsed.get("score", 0.0))
-        parsed["score"] = max(0.0, min(10.0, score))
-        parsed["provider"] = AUTPOST_LLM_PROVIDER
-        return parsed
+        return _normalize_llm_score(json.loads(raw))
     except Exception as e:
         logger.warning(f"LLM scoring failed, fallback to heuristic: {e}")
         return None
@@ -1834,37 +1701,8 @@ def _build_score_cache_key(
     return hashlib.sha256(raw.encode()).hexdigest()
 
 
-def _get_cached_score(key: str) -> Optional[Dict[str, Any]]:
-    cached = AUTPOST_SCORE_CACHE.get(key)
-    if not cached:
-        return None
-    ts, payload = cached
-    if (datetime.now().timestamp() - ts) > AUTPOST_SCORE_CACHE_TTL:
-        AUTPOST_SCORE_CACHE.pop(key, None)
-        return None
-    return payload
-
-
-def _set_cached_score(key: str, payload: Dict[str, Any]) -> None:
-    AUTPOST_SCORE_CACHE[key] = (datetime.now().timestamp(), payload)
-
-
 def _load_trends_csv() -> List[Dict[str, Any]]:
-    if not AUTPOST_TRENDS_CSV.exists():
-        return []
-    rows: List[Dict[str, Any]] = []
-    try:
-        with open(AUTPOST_TRENDS_CSV, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rows.append({
-                    "category": (row.get("category") or "").strip().lower(),
-                    "hashtag": (row.get("hashtag") or "").strip(),
-                    "weight": float(row.get("weight") or 1.0)
-                })
-    except Exception as e:
-        logger.warning(f"Failed to load trends CSV: {e}")
-    return rows
+    return AUTPOST_TRENDS_DATA.get().rows
 
 
 
@@ -1908,6 +1746,44 @@ hashtags: {hashtags or ""}
 """.strip()
 
 
+def _build_tiktok_batch_prompt(items: List[Dict[str, Optional[str]]], category: Optional[str]) -> str:
+    blocks: List[str] = []
+    for idx, item in enumerate(items):
+        trends, best_score, _ = _get_trend_context(
+            item.get("title"), item.get("caption"), item.get("hook_text"),
+            item.get("cta_text"), item.get("hashtags"), category
+        )
+        blocks.append(f"""
+[{idx}]
+Hashtag tren relevan (RAG): {", ".join(trends) or "-"} (trend_similarity={best_score:.2f})
+title: {item.get("title") or ""}
+caption: {item.get("caption") or ""}
+hook_text: {item.get("hook_text") or ""}
+cta_text: {item.get("cta_text") or ""}
+hashtags: {item.get("hashtags") or ""}
+""".strip())
+    variants = "\n\n".join(blocks)
+    return f"""
+Anda adalah analis performa video TikTok berbahasa Indonesia. Nilai potensi engagement (view, like, follow, share)
+untuk SETIAP varian berikut secara terpisah.
+Konteks kategori: {category or "-"}
+
+Berikan output HANYA JSON array valid berisi {len(items)} objek (satu per varian), dengan schema:
+[{{
+  "index": number,         // nomor varian
+  "score": number,         // 0-10 total engagement
+  "hook_score": number,    // 0-10 kekuatan hook
+  "cta_score": number,     // 0-10 kekuatan CTA
+  "trend_score": number,   // 0-10 kesesuaian tren
+  "recommendation": string,
+  "signals": string[]
+}}]
+
+Varian:
+{variants}
+""".strip()
+
+
 def _update_autopost_record(conn: sqlite3.Connection, record_id: int, **fields: Any) -> None:
     if not fields:
         return
@@ -1935,13 +1811,41 @@ async def _broadcast_autopost_event(user_id: str, event: str, payload: Dict[str,
 app = FastAPI()
 
 
+@app.on_event("startup")
+async def _probe_ffmpeg() -> None:
+    # Probe once up front so request paths only read the cached registry.
+    await asyncio.to_thread(refresh_ffmpeg_capabilities)
+
+
+@app.on_event("startup")
+async def _start_generation_workers() -> None:
+    GENERATION_JOBS.set_notifier(_broadcast_autopost_event)
+    GENERATION_JOBS.start()
+    AUTPOST_SCENE_ANALYSIS.set_notifier(_broadcast_autopost_event)
+    AUTPOST_RECHECK.set_notifier(_broadcast_autopost_event)
+    if RECHECK_ENABLED:
+        AUTPOST_RECHECK.start()
+
+
+@app.on_event("shutdown")
+async def _close_shared_clients() -> None:
+    await GENERATION_JOBS.stop()
+    await AUTPOST_SCENE_ANALYSIS.stop()
+    await AUTPOST_RECHECK.stop()
+    await aclose_async_client()
+    AUTPOST_EMBEDDING_CLIENT.close()
+    AUTPOST_QDRANT.close()
+    DB_POOL.close_thread_connections()
+
+
 @app.middleware("http")
 async def request_context_middleware(request: Request, call_next):
     request_id = _get_request_id(request)
     request.state.request_id = request_id
     start_time = time.perf_counter()
     try:
-        response = await call_next(request)
+        with _trend_context_scope():
+            response = await call_next(request)
     except Exception:
         duration_ms = int((time.perf_counter() - start_time) * 1000)
         _log_request(request, request_id, 500, duration_ms)
@@ -2017,16 +1921,18 @@ async def readiness_check():
     ready = True
 
     db_ok = False
+    schema_version = None
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("SELECT 1")
         cursor.fetchone()
+        schema_version = get_schema_version(conn)
         conn.close()
         db_ok = True
     except Exception:
         db_ok = False
-    checks["db"] = {"ok": db_ok}
+    checks["db"] = {"ok": db_ok, "schema_version": schema_version, "pool": DB_POOL.get_stats()}
     if not db_ok:
         ready = False
 
@@ -2036,14 +1942,22 @@ async def readiness_check():
         ready = False
 
     ffmpeg_required = os.getenv("FFMPEG_REQUIRED", "false").lower() in {"1", "true", "yes", "on"}
-    ffmpeg_ok = False
-    try:
-        ffmpeg_ok = check_ffmpeg_available()
-    except Exception:
-        ffmpeg_ok = False
-    checks["ffmpeg"] = {"ok": ffmpeg_ok, "optional": not ffmpeg_required}
+    ffmpeg_caps = get_ffmpeg_capabilities()
+    ffmpeg_ok = ffmpeg_caps.available
+    checks["ffmpeg"] = {"ok": ffmpeg_ok, "optional": not ffmpeg_required, **ffmpeg_caps.to_dict()}
     if ffmpeg_required and not ffmpeg_ok:
         ready = False
+    checks["render"] = {"ok": True, **get_render_stats()}
+    checks["source_image_cache"] = {"ok": True, **get_source_image_cache().get_stats()}
+    checks["profile_cache"] = {"ok": True, **get_profile_cache_stats()}
+    checks["embedding_cache"] = {"ok": True, **get_embedding_cache().get_stats()}
+    checks["score_cache"] = {"ok": True, **AUTPOST_SCORE_CACHE.get_stats()}
+    checks["scene_analysis"] = {"ok": True, **AUTPOST_SCENE_ANALYSIS.get_stats()}
+    checks["recheck"] = {"ok": True, **AUTPOST_RECHECK.get_stats()}
+    try:
+        checks["jobs"] = {"ok": True, **GENERATION_JOBS.get_stats()}
+    except Exception as e:
+        checks["jobs"] = {"ok": False, "error": str(e)}
 
     status = "ready" if ready else "not_ready"
     status_code = 200 if ready else 503
@@ -2084,7 +1998,7 @@ async def ensure_access(current_user: Dict[str, Any] = Depends(get_current_user)
     if not email:
         raise HTTPException(status_code=400, detail="Email not found in token")
     user_id = current_user.get("id")
-    profile = get_user_profile(user_id) if user_id else None
+    profile = await get_user_profile_async(user_id) if user_id else None
     return {
         "authorized": True,
         "user_id": user_id,
@@ -2094,9 +2008,8 @@ async def ensure_access(current_user: Dict[str, Any] = Depends(get_current_user)
         "coins_balance": (profile or {}).get("coins_balance")
     }
 AUTPOST_WS_CONNECTIONS: Dict[str, List[WebSocket]] = {}
-AUTPOST_SCORE_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 AUTPOST_RATE_LIMIT: Dict[str, List[float]] = {}
-AUTPOST_TRENDS_INDEX: Dict[str, Any] = {"rows": [], "vectors": []}
+AUTPOST_TRENDS_INDEX: Dict[str, Any] = {"rows": [], "index": None}
 
 # Initialize trends index on startup (after AUTPOST_TRENDS_INDEX is defined)
 _refresh_trends_index()
@@ -2866,7 +2779,7 @@ async def generate_images_legacy(
 ):
     """Generate 4 variations of studio images"""
     # Security: enforce auth + coins server-side for legacy generation.
-    user_id, profile = _get_profile_for_user(current_user)
+    user_id, profile = await _get_profile_for_user(current_user)
     _require_coins(profile, LEGACY_IMAGE_COST)
     results = []
     had_error = False
@@ -2932,7 +2845,7 @@ A high-resolution video showing the product in this setting, with subtle natural
             })
     # Deduct coins only after the request completes successfully.
     if not had_error:
-        update_user_coins(user_id, -LEGACY_IMAGE_COST)
+        await update_user_coins_async(user_id, -LEGACY_IMAGE_COST)
     return results
 
 # New Pydantic models for new API (ImageDataModel and GenerationOptionsModel already defined above)
@@ -2967,7 +2880,7 @@ async def generate_photo(
     """Generate a single product photo with two video prompts (Version A and B)"""
     try:
         # Security: enforce auth + coins server-side for legacy generation.
-        user_id, profile = _get_profile_for_user(current_user)
+        user_id, profile = await _get_profile_for_user(current_user)
         _require_coins(profile, LEGACY_IMAGE_COST)
         logger.info("Received generate-photo request")
         
@@ -3024,7 +2937,7 @@ async def generate_photo(
             background_image,
             options_dict
         )
-        update_user_coins(user_id, -LEGACY_IMAGE_COST)
+        await update_user_coins_async(user_id, -LEGACY_IMAGE_COST)
         logger.info("Photo generated successfully")
         return result
     except HTTPException:
@@ -3131,7 +3044,7 @@ async def get_profile(current_user: Dict[str, Any] = Depends(get_current_user)):
         if not user_id:
             raise HTTPException(status_code=400, detail="User ID not found in token")
 
-        profile = get_user_profile(user_id)
+        profile = await get_user_profile_async(user_id)
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
@@ -3198,7 +3111,7 @@ async def generate_image_saas(
             raise HTTPException(status_code=400, detail="User ID not found in token")
         
         # Check user profile and coins balance
-        profile = get_user_profile(user_id)
+        profile = await get_user_profile_async(user_id)
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
@@ -3305,7 +3218,8 @@ async def generate_image_saas(
                 # Upload to Supabase Storage - REQUIRED (now using processed image)
                 # Extract category from filename or use default
                 category = "upload"  # Default category for multipart uploads
-                public_url = upload_image_to_supabase_storage(
+                public_url = await asyncio.to_thread(
+                    upload_image_to_supabase_storage,
                     file_content=file_content,
                     file_name=file_name,
                     bucket_name="IMAGES_UPLOAD",
@@ -3406,7 +3320,8 @@ async def generate_image_saas(
                             
                             logger.info(f"📤 Uploading preprocessed face_image to Supabase Storage (size: {file_size} bytes)")
                             
-                            public_url = upload_image_to_supabase_storage(
+                            public_url = await asyncio.to_thread(
+                                upload_image_to_supabase_storage,
                                 file_content=image_bytes,
                                 file_name=f"face_image{file_ext}",
                                 bucket_name="IMAGES_UPLOAD",
@@ -3464,7 +3379,8 @@ async def generate_image_saas(
                                 
                                 logger.info(f"📤 Uploading preprocessed product_image[{idx}] to Supabase Storage (size: {file_size} bytes)")
                                 
-                                public_url = upload_image_to_supabase_storage(
+                                public_url = await asyncio.to_thread(
+                                    upload_image_to_supabase_storage,
                                     file_content=image_bytes,
                                     file_name=f"product_image_{idx}{file_ext}",
                                     bucket_name="IMAGES_UPLOAD",
@@ -3515,7 +3431,8 @@ async def generate_image_saas(
                             
                             logger.info(f"📤 Uploading preprocessed background_image to Supabase Storage (size: {file_size} bytes)")
                             
-                            public_url = upload_image_to_supabase_storage(
+                            public_url = await asyncio.to_thread(
+                                upload_image_to_supabase_storage,
                                 file_content=image_bytes,
                                 file_name=f"background_image{file_ext}",
                                 bucket_name="IMAGES_UPLOAD",
@@ -3707,7 +3624,7 @@ async def generate_image_saas(
         # Only reduce coins if generation was successful (no exception raised)
         # Reduce coins_balance by 75 after successful generation
         logger.info(f"Images generated successfully. Reducing coins by {image_batch_cost} for user {user_id}")
-        updated_profile = update_user_coins(user_id, -image_batch_cost)
+        updated_profile = await update_user_coins_async(user_id, -image_batch_cost)
         remaining_coins = updated_profile.get("coins_balance", 0) if updated_profile else coins - image_batch_cost
         logger.info(f"Coins deducted. Remaining coins for user {user_id}: {remaining_coins}")
         
@@ -3828,6 +3745,7 @@ async def create_videos_batch(
         ]  # 3 videos with different fake motion
     }
     """
+    source_images = AsyncExitStack()
     try:
         user_id = current_user.get("id")
         if not user_id:
@@ -3861,30 +3779,18 @@ async def create_videos_batch(
         logger.info(f"Category: {category}")
         logger.info(f"Model type: {model_type}, Character: {model_character}")
         
-        # Download image temporarily to check for human face and detect product region
-        import tempfile
-        import httpx
-        from pathlib import Path
-        
-        temp_dir = tempfile.mkdtemp()
+        # Fetch the image once through the shared source cache; detection and all renders reuse it.
+        # The checkout keeps the cached file pinned until the batch finishes.
         temp_image_path = None
         has_face = False
         product_region = None
         final_focus_y = None
         
         try:
-            # Download image to check for face and detect product region
-            logger.info("Downloading image to check for human face and detect product region...")
-            response = httpx.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            image_ext = Path(image_url).suffix or '.jpg'
-            if image_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
-                image_ext = '.jpg'
-            
-            temp_image_path = os.path.join(temp_dir, f"check_face{image_ext}")
-            with open(temp_image_path, 'wb') as f:
-                f.write(response.content)
+            logger.info("Fetching source image to check for human face and detect product region...")
+            temp_image_path = await source_images.enter_async_context(
+                get_source_image_cache().checkout(image_url)
+            )
             
             # Check for human face
             has_face = has_human_face(temp_image_path)
@@ -3935,121 +3841,129 @@ async def create_videos_batch(
             for idx, mv in enumerate(motion_variations):
                 logger.info(f"  Motion {idx + 1}: {mv.get('name', 'Unknown')} - {mv.get('motion_type', 'Unknown')}")
             
+            def _variation_2_overrides() -> Tuple[str, str, str]:
+                # Linear zoom 1.00 -> 1.05 across full duration (no sin/cos)
+                zoom_speed = 0.05 / total_frames
+                zoom_expr = f"1+{zoom_speed:.8f}*on"
+
+                category_lower = (category or "").strip().lower()
+                center_x = "iw/2-(iw/zoom/2)"
+                center_y = "ih/2-(ih/zoom/2)"
+                if "shoe" in category_lower or "sepatu" in category_lower or "sandal" in category_lower or "footwear" in category_lower:
+                    return zoom_expr, center_x, f"{center_y}-0.03*ih*on/{total_frames}"
+                if "bag" in category_lower or "tas" in category_lower:
+                    return zoom_expr, center_x, f"{center_y}+0.03*ih*on/{total_frames}"
+                if "accessor" in category_lower or "small" in category_lower:
+                    return zoom_expr, f"{center_x}+0.02*iw*on/{total_frames}", f"{center_y}+0.02*ih*on/{total_frames}"
+                return zoom_expr, f"{center_x}+0.03*iw*on/{total_frames}", center_y
+
+            async def _render_variation(
+                motion_index: int,
+                motion_config: Dict[str, Any],
+                render_kwargs: Dict[str, Any],
+                filename_prefix: str
+            ) -> str:
+                use_focus = (motion_index == 2 and final_focus_y is not None)
+                is_variation_2 = motion_index == 1
+                zoom_expr_override = None
+                x_expr_override = None
+                y_expr_override = None
+                apply_zoom_boost = True
+                rotate_override = motion_config.get('rotate', 0.0)
+
+                if is_variation_2:
+                    zoom_expr_override, x_expr_override, y_expr_override = _variation_2_overrides()
+                    apply_zoom_boost = False
+                    rotate_override = 0.0
+
+                common_kwargs = dict(
+                    render_kwargs,
+                    image_url=image_url,
+                    duration=duration_seconds,
+                    pan_x=motion_config.get('pan_x', 0.0),
+                    pan_y=motion_config.get('pan_y', 0.0),
+                    pan_speed=motion_config.get('pan_speed', 0.0),
+                    rotate=rotate_override,
+                    apply_zoom_boost=apply_zoom_boost
+                )
+                try:
+                    video_path = await create_video_from_url(
+                        output_filename=f"{filename_prefix}_{int(os.urandom(4).hex(), 16)}",
+                        focus_x=0.5 if use_focus else None,
+                        focus_y=final_focus_y if use_focus else None,
+                        zoom_expr_override=zoom_expr_override,
+                        x_expr_override=x_expr_override,
+                        y_expr_override=y_expr_override,
+                        **common_kwargs
+                    )
+                except Exception as focus_error:
+                    if not use_focus:
+                        raise
+                    logger.warning(f"Variation 3 focus failed, retrying centered: {focus_error}")
+                    video_path = await create_video_from_url(
+                        output_filename=f"{filename_prefix}_{int(os.urandom(4).hex(), 16)}",
+                        focus_x=None,
+                        focus_y=None,
+                        zoom_expr_override=zoom_expr_override if is_variation_2 else None,
+                        x_expr_override=x_expr_override if is_variation_2 else None,
+                        y_expr_override=y_expr_override if is_variation_2 else None,
+                        **common_kwargs
+                    )
+                temp_files.append(video_path)
+                return video_path
+
+            async def _upload_rendered_video(video_path: str) -> Tuple[str, float]:
+                def _read_and_upload() -> Tuple[str, float]:
+                    with open(video_path, 'rb') as video_file:
+                        video_bytes = video_file.read()
+                    video_url = upload_image_to_supabase_storage(
+                        file_content=video_bytes,
+                        file_name=os.path.basename(video_path),
+                        bucket_name="IMAGES_UPLOAD",  # Using same bucket for now
+                        user_id=user_id,
+                        category="videos"
+                    )
+                    return video_url, len(video_bytes) / (1024 * 1024)
+
+                return await asyncio.to_thread(_read_and_upload)
+
             if has_face:
                 # HUMAN FACE DETECTED: Use the same cinematic FFmpeg pipeline (no alpha overlays)
                 logger.info("Using CINEMATIC FFmpeg pipeline for human images (no alpha overlays)")
 
-                for motion_index, motion_config in enumerate(motion_variations[:3]):
-                    try:
-                        logger.info(f"Creating cinematic video {motion_index + 1}/3 for human image")
-
-                        use_focus = (motion_index == 2 and final_focus_y is not None)
-                        is_variation_2 = motion_index == 1
-                        zoom_expr_override = None
-                        x_expr_override = None
-                        y_expr_override = None
-                        apply_zoom_boost = True
-                        rotate_override = motion_config.get('rotate', 0.0)
-
-                        if is_variation_2:
-                            # Linear zoom 1.00 -> 1.05 across full duration (no sin/cos)
-                            zoom_speed = 0.05 / total_frames
-                            zoom_expr_override = f"1+{zoom_speed:.8f}*on"
-
-                            category_lower = (category or "").strip().lower()
-                            center_x = "iw/2-(iw/zoom/2)"
-                            center_y = "ih/2-(ih/zoom/2)"
-                            if "shoe" in category_lower or "sepatu" in category_lower or "sandal" in category_lower or "footwear" in category_lower:
-                                x_expr_override = center_x
-                                y_expr_override = f"{center_y}-0.03*ih*on/{total_frames}"
-                            elif "bag" in category_lower or "tas" in category_lower:
-                                x_expr_override = center_x
-                                y_expr_override = f"{center_y}+0.03*ih*on/{total_frames}"
-                            elif "accessor" in category_lower or "small" in category_lower:
-                                x_expr_override = f"{center_x}+0.02*iw*on/{total_frames}"
-                                y_expr_override = f"{center_y}+0.02*ih*on/{total_frames}"
-                            elif "apparel" in category_lower or "model" in category_lower or "fashion" in category_lower:
-                                x_expr_override = f"{center_x}+0.03*iw*on/{total_frames}"
-                                y_expr_override = center_y
-                            else:
-                                x_expr_override = f"{center_x}+0.03*iw*on/{total_frames}"
-                                y_expr_override = center_y
-
-                            apply_zoom_boost = False
-                            rotate_override = 0.0
-
-                        try:
-                            video_path = await create_video_from_url(
-                                image_url=image_url,
-                                output_filename=f"video_{user_id}_human_{motion_index}_{int(os.urandom(4).hex(), 16)}",
-                                duration=duration_seconds,
-                                zoom_start=motion_config.get('zoom_start', 1.0),
-                                zoom_end=motion_config.get('zoom_end', 1.08),
-                                zoom_speed=motion_config.get('zoom_speed', 0.0015),
-                                pan_x=motion_config.get('pan_x', 0.0),
-                                pan_y=motion_config.get('pan_y', 0.0),
-                                pan_speed=motion_config.get('pan_speed', 0.0),
-                                rotate=rotate_override,
-                                focus_x=0.5 if use_focus else None,
-                                focus_y=final_focus_y if use_focus else None,
-                                zoom_expr_override=zoom_expr_override,
-                                x_expr_override=x_expr_override,
-                                y_expr_override=y_expr_override,
-                                apply_zoom_boost=apply_zoom_boost
-                            )
-                        except Exception as focus_error:
-                            if use_focus:
-                                logger.warning(f"Variation 3 focus failed, retrying centered: {focus_error}")
-                                video_path = await create_video_from_url(
-                                    image_url=image_url,
-                                    output_filename=f"video_{user_id}_human_{motion_index}_{int(os.urandom(4).hex(), 16)}",
-                                    duration=duration_seconds,
-                                    zoom_start=motion_config.get('zoom_start', 1.0),
-                                    zoom_end=motion_config.get('zoom_end', 1.08),
-                                    zoom_speed=motion_config.get('zoom_speed', 0.0015),
-                                    pan_x=motion_config.get('pan_x', 0.0),
-                                    pan_y=motion_config.get('pan_y', 0.0),
-                                    pan_speed=motion_config.get('pan_speed', 0.0),
-                                    rotate=rotate_override,
-                                    focus_x=None,
-                                    focus_y=None,
-                                    zoom_expr_override=zoom_expr_override if is_variation_2 else None,
-                                    x_expr_override=x_expr_override if is_variation_2 else None,
-                                    y_expr_override=y_expr_override if is_variation_2 else None,
-                                    apply_zoom_boost=apply_zoom_boost
-                                )
-                            else:
-                                raise
-
-                        temp_files.append(video_path)
-
-                        video_filename = os.path.basename(video_path)
-                        with open(video_path, 'rb') as video_file:
-                            video_bytes = video_file.read()
-                            video_size_mb = len(video_bytes) / (1024 * 1024)
-
-                            video_url = upload_image_to_supabase_storage(
-                                file_content=video_bytes,
-                                file_name=video_filename,
-                                bucket_name="IMAGES_UPLOAD",
-                                user_id=user_id,
-                                category="videos"
-                            )
-
-                            videos.append({
-                                "video_url": video_url,
-                                "preset_name": motion_config.get('name', f"Variation {motion_index + 1}"),
-                                "file_size_mb": round(video_size_mb, 2),
-                                "description": motion_config.get('description', 'Cinematic motion'),
-                                "type": "standard"
-                            })
-
-                            logger.info(f"✅ Cinematic video {motion_index + 1}/3 uploaded: {video_url} ({video_size_mb:.2f} MB)")
-
+                async def _create_human_video(motion_index: int, motion_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                    try:
+                        logger.info(f"Creating cinematic video {motion_index + 1}/3 for human image")
+                        video_path = await _render_variation(
+                            motion_index,
+                            motion_config,
+                            {
+                                "zoom_start": motion_config.get('zoom_start', 1.0),
+                                "zoom_end": motion_config.get('zoom_end', 1.08),
+                                "zoom_speed": motion_config.get('zoom_speed', 0.0015)
+                            },
+                            f"video_{user_id}_human_{motion_index}"
+                        )
+                        video_url, video_size_mb = await _upload_rendered_video(video_path)
+                        logger.info(f"✅ Cinematic video {motion_index + 1}/3 uploaded: {video_url} ({video_size_mb:.2f} MB)")
+                        return {
+                            "video_url": video_url,
+                            "preset_name": motion_config.get('name', f"Variation {motion_index + 1}"),
+                            "file_size_mb": round(video_size_mb, 2),
+                            "description": motion_config.get('description', 'Cinematic motion'),
+                            "type": "standard"
+                        }
                     except Exception as video_error:
                         logger.error(f"Failed to create cinematic video {motion_index + 1}/3: {str(video_error)}")
-                        continue
-                        
+                        return None
+
+                # Render all variations concurrently; the render executor bounds FFmpeg parallelism.
+                results = await asyncio.gather(*[
+                    _create_human_video(motion_index, motion_config)
+                    for motion_index, motion_config in enumerate(motion_variations[:3])
+                ])
+                videos.extend(video for video in results if video)
+
             else:
                 # NO HUMAN FACE: Use dynamic motion variations with product focus
                 logger.info("Using DYNAMIC motion variations (no face, product-focused)")
@@ -4069,13 +3983,10 @@ async def create_videos_batch(
                         last_config['name'] = f"{last_config.get('name', 'Variation')} (Copy {len(motion_variations) + 1})"
                         motion_variations.append(last_config)
                     logger.info(f"✅ Extended motion variations to {len(motion_variations)}")
-                
-                # Generate 3 videos with different motion variations
-                logger.info(f"Starting video generation loop with {len(motion_variations)} motion configs")
-                for motion_index, motion_config in enumerate(motion_variations):
-                    if motion_index >= 3:
-                        logger.warning(f"⚠️ Skipping motion config {motion_index + 1} (only generating 3 videos)")
-                        break
+                if len(motion_variations) > 3:
+                    logger.warning(f"⚠️ Skipping {len(motion_variations) - 3} extra motion config(s) (only generating 3 videos)")
+
+                async def _create_product_video(motion_index: int, motion_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
                     try:
                         preset = presets[motion_index] if motion_index < len(presets) else presets[0]
                         logger.info(f"🎬 [VIDEO {motion_index + 1}/3] Starting: {motion_config['name']}")
@@ -4083,147 +3994,63 @@ async def create_videos_batch(
                         
                         # Create video with dynamic motion configuration
                         logger.info(f"   Step 1/3: Calling create_video_from_url...")
-                        use_focus = (motion_index == 2 and final_focus_y is not None)
-                        is_variation_2 = motion_index == 1
-                        zoom_expr_override = None
-                        x_expr_override = None
-                        y_expr_override = None
-                        apply_zoom_boost = True
-                        rotate_override = motion_config.get('rotate', 0.0)
-
-                        if is_variation_2:
-                            zoom_speed = 0.05 / total_frames
-                            zoom_expr_override = f"1+{zoom_speed:.8f}*on"
-
-                            category_lower = (category or "").strip().lower()
-                            center_x = "iw/2-(iw/zoom/2)"
-                            center_y = "ih/2-(ih/zoom/2)"
-                            if "shoe" in category_lower or "sepatu" in category_lower or "sandal" in category_lower or "footwear" in category_lower:
-                                x_expr_override = center_x
-                                y_expr_override = f"{center_y}-0.03*ih*on/{total_frames}"
-                            elif "bag" in category_lower or "tas" in category_lower:
-                                x_expr_override = center_x
-                                y_expr_override = f"{center_y}+0.03*ih*on/{total_frames}"
-                            elif "accessor" in category_lower or "small" in category_lower:
-                                x_expr_override = f"{center_x}+0.02*iw*on/{total_frames}"
-                                y_expr_override = f"{center_y}+0.02*ih*on/{total_frames}"
-                            elif "apparel" in category_lower or "model" in category_lower or "fashion" in category_lower:
-                                x_expr_override = f"{center_x}+0.03*iw*on/{total_frames}"
-                                y_expr_override = center_y
-                            else:
-                                x_expr_override = f"{center_x}+0.03*iw*on/{total_frames}"
-                                y_expr_override = center_y
-
-                            apply_zoom_boost = False
-                            rotate_override = 0.0
-
-                        try:
-                            video_path = await create_video_from_url(
-                                image_url=image_url,
-                                hook_text=preset['hook_text'],
-                                cta_text=preset['cta_text'],
-                                output_filename=f"video_{user_id}_{motion_index}_{int(os.urandom(4).hex(), 16)}",
-                                duration=duration_seconds,
-                                zoom_start=motion_config['zoom_start'],
-                                zoom_end=motion_config['zoom_end'],
-                                zoom_speed=motion_config['zoom_speed'],
-                                hook_position=preset['hook_position'],
-                                hook_timing=preset['hook_timing'],
-                                cta_position=preset['cta_position'],
-                                cta_timing=preset['cta_timing'],
-                                pan_x=motion_config.get('pan_x', 0.0),
-                                pan_y=motion_config.get('pan_y', 0.0),
-                                pan_speed=motion_config.get('pan_speed', 0.0),
-                                rotate=rotate_override,
-                                focus_x=0.5 if use_focus else None,
-                                focus_y=final_focus_y if use_focus else None,
-                                zoom_expr_override=zoom_expr_override,
-                                x_expr_override=x_expr_override,
-                                y_expr_override=y_expr_override,
-                                apply_zoom_boost=apply_zoom_boost
-                            )
-                        except Exception as focus_error:
-                            if use_focus:
-                                logger.warning(f"Variation 3 focus failed, retrying centered: {focus_error}")
-                                video_path = await create_video_from_url(
-                                    image_url=image_url,
-                                    hook_text=preset['hook_text'],
-                                    cta_text=preset['cta_text'],
-                                    output_filename=f"video_{user_id}_{motion_index}_{int(os.urandom(4).hex(), 16)}",
-                                    duration=duration_seconds,
-                                    zoom_start=motion_config['zoom_start'],
-                                    zoom_end=motion_config['zoom_end'],
-                                    zoom_speed=motion_config['zoom_speed'],
-                                    hook_position=preset['hook_position'],
-                                    hook_timing=preset['hook_timing'],
-                                    cta_position=preset['cta_position'],
-                                    cta_timing=preset['cta_timing'],
-                                    pan_x=motion_config.get('pan_x', 0.0),
-                                    pan_y=motion_config.get('pan_y', 0.0),
-                                    pan_speed=motion_config.get('pan_speed', 0.0),
-                                    rotate=rotate_override,
-                                    focus_x=None,
-                                    focus_y=None,
-                                    zoom_expr_override=zoom_expr_override if is_variation_2 else None,
-                                    x_expr_override=x_expr_override if is_variation_2 else None,
-                                    y_expr_override=y_expr_override if is_variation_2 else None,
-                                    apply_zoom_boost=apply_zoom_boost
-                                )
-                            else:
-                                raise
-                        
-                        temp_files.append(video_path)
+                        video_path = await _render_variation(
+                            motion_index,
+                            motion_config,
+                            {
+                                "hook_text": preset['hook_text'],
+                                "cta_text": preset['cta_text'],
+                                "zoom_start": motion_config['zoom_start'],
+                                "zoom_end": motion_config['zoom_end'],
+                                "zoom_speed": motion_config['zoom_speed'],
+                                "hook_position": preset['hook_position'],
+                                "hook_timing": preset['hook_timing'],
+                                "cta_position": preset['cta_position'],
+                                "cta_timing": preset['cta_timing']
+                            },
+                            f"video_{user_id}_{motion_index}"
+                        )
                         
-                        # Upload video to Supabase Storage (file_path-based for lower memory)
-                        video_filename = os.path.basename(video_path)
-                        with open(video_path, 'rb') as video_file:
-                            video_bytes = video_file.read()
-                            video_size_mb = len(video_bytes) / (1024 * 1024)
-                            
-                            video_url = upload_image_to_supabase_storage(
-                                file_content=video_bytes,
-                                file_name=video_filename,
-                                bucket_name="IMAGES_UPLOAD",  # Using same bucket for now
-                                user_id=user_id,
-                                category="videos"
-                            )
-                            
-                            logger.info(f"   ✅ Step 2/3: Uploaded to Supabase: {video_url[:50]}...")
-                            
-                            videos.append({
-                                "video_url": video_url,
-                                "preset_name": motion_config['name'],
-                                "file_size_mb": round(video_size_mb, 2),
-                                "description": motion_config.get('description', preset.get('description', '')),
-                                "type": "standard"
-                            })
-                            
-                            logger.info(f"   ✅ Step 3/3: Added to videos array")
-                            logger.info(f"✅ [VIDEO {motion_index + 1}/3] COMPLETE: {motion_config['name']} → {video_url[:50]}... ({video_size_mb:.2f} MB)")
-                            
+                        # Upload video to Supabase Storage
+                        video_url, video_size_mb = await _upload_rendered_video(video_path)
+                        logger.info(f"   ✅ Step 2/3: Uploaded to Supabase: {video_url[:50]}...")
+                        logger.info(f"   ✅ Step 3/3: Added to videos array")
+                        logger.info(f"✅ [VIDEO {motion_index + 1}/3] COMPLETE: {motion_config['name']} → {video_url[:50]}... ({video_size_mb:.2f} MB)")
+                        return {
+                            "video_url": video_url,
+                            "preset_name": motion_config['name'],
+                            "file_size_mb": round(video_size_mb, 2),
+                            "description": motion_config.get('description', preset.get('description', '')),
+                            "type": "standard"
+                        }
                     except Exception as video_error:
                         logger.error(f"❌ [VIDEO {motion_index + 1}/3] FAILED: {str(video_error)}", exc_info=True)
                         logger.error(f"   Error type: {type(video_error).__name__}")
                         logger.error(f"   Motion config that failed: {motion_config.get('name', 'Unknown')}")
                         # Continue with other videos even if one fails
-                        continue
+                        return None
+
+                # Generate 3 videos concurrently; the render executor bounds FFmpeg parallelism.
+                logger.info(f"Starting concurrent video generation with {min(3, len(motion_variations))} motion configs")
+                results = await asyncio.gather(*[
+                    _create_product_video(motion_index, motion_config)
+                    for motion_index, motion_config in enumerate(motion_variations[:3])
+                ])
+                videos.extend(video for video in results if video)
             
-            # Clean up temporary files
+            # Clean up temporary files (each render writes into its own temp directory)
             for temp_file in temp_files:
                 try:
                     if os.path.exists(temp_file):
                         os.remove(temp_file)
                 except Exception as cleanup_error:
                     logger.warning(f"Failed to cleanup temp file {temp_file}: {cleanup_error}")
-            
-            # Clean up temp directory
-            try:
-                if temp_files:
-                    temp_dir = os.path.dirname(temp_files[0])
+                try:
+                    temp_dir = os.path.dirname(temp_file)
                     if os.path.exists(temp_dir):
                         os.rmdir(temp_dir)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp directory: {cleanup_error}")
+                except Exception as cleanup_error:
+                    logger.warning(f"Failed to cleanup temp directory: {cleanup_error}")
             
             # Return videos even if not all 3 were created (partial success is better than complete failure)
             if len(videos) == 0:
@@ -4265,6 +4092,8 @@ async def create_videos_batch(
     except Exception as e:
         logger.error(f"Error creating videos batch: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to create videos: {str(e)}")
+    finally:
+        await source_images.aclose()
 
 
 @app.post("/api/create-kling-video")
@@ -4276,7 +4105,7 @@ async def create_kling_video(
         user_id = current_user.get("id")
         if not user_id:
             raise HTTPException(status_code=400, detail="User ID not found in token")
-        profile = get_user_profile(user_id)
+        profile = await get_user_profile_async(user_id)
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         coins = profile.get("coins_balance", 0)
@@ -4293,7 +4122,7 @@ async def create_kling_video(
         if not image_url:
             raise HTTPException(status_code=400, detail="image_url is required")
         video_url = await fal_generate_kling_video(prompt, image_url, negative_prompt)
-        updated_profile = update_user_coins(user_id, -pro_video_cost)
+        updated_profile = await update_user_coins_async(user_id, -pro_video_cost)
         remaining_coins = updated_profile.get("coins_balance", 0) if updated_profile else coins - pro_video_cost
         return {"video_url": video_url, "remaining_coins": remaining_coins}
     except HTTPException:
@@ -4320,10 +4149,11 @@ async def generate_video_saas(
         if not user_id:
             raise HTTPException(status_code=400, detail="User ID not found in token")
 
-        enforce_rate_limit(http_request, user_id, "generate-video-saas")
+        if not getattr(http_request.state, "rate_limit_checked", False):
+            enforce_rate_limit(http_request, user_id, "generate-video-saas")
         
         # Check user profile and coins
-        profile = get_user_profile(user_id)
+        profile = await get_user_profile_async(user_id)
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
@@ -4338,7 +4168,7 @@ async def generate_video_saas(
         video_url = await fal_generate_video(request.prompt, request.image_url)
         
         # Deduct 5 coins
-        update_user_coins(user_id, -5)
+        await update_user_coins_async(user_id, -5)
         
         return {
             "video_url": video_url,
@@ -4352,6 +4182,123 @@ async def generate_video_saas(
         logger.error(f"Error generating video: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# ---------------------------------------------------------------------------
+# Generation jobs: enqueue now, run on a worker, poll status/result or listen on /ws/autopost
+# ---------------------------------------------------------------------------
+
+def _job_request(body: Dict[str, Any]) -> Request:
+    """Synthetic JSON request so queued jobs reuse the endpoint code unchanged."""
+    raw_body = json.dumps(body).encode("utf-8")
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": raw_body, "more_body": False}
+
+    request = Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/jobs",
+            "headers": [(b"content-type", b"application/json")],
+            "query_string": b"",
+            "client": None,
+            "app": app
+        },
+        receive
+    )
+    # Rate limits were enforced when the job was enqueued.
+    request.state.rate_limit_checked = True
+    return request
+
+
+def _job_endpoint_runner(endpoint_call):
+    async def _run(job: Dict[str, Any], report) -> Any:
+        user = job.get("user_context") or {"id": job["user_id"]}
+        await report(0.05, "started")
+        try:
+            result = await endpoint_call(job.get("payload") or {}, user)
+        except HTTPException as exc:
+            raise JobFailed(exc.status_code, exc.detail)
+        return jsonable_encoder(result)
+    return _run
+
+
+GENERATION_JOBS.register(
+    "generate-image",
+    _job_endpoint_runner(lambda payload, user: generate_image_saas(_job_request(payload), user))
+)
+GENERATION_JOBS.register(
+    "create-videos-batch",
+    _job_endpoint_runner(lambda payload, user: create_videos_batch(_job_request(payload), user))
+)
+GENERATION_JOBS.register(
+    "create-kling-video",
+    _job_endpoint_runner(lambda payload, user: create_kling_video(_job_request(payload), user))
+)
+GENERATION_JOBS.register(
+    "generate-video-saas",
+    _job_endpoint_runner(
+        lambda payload, user: generate_video_saas(_job_request(payload), GenerateVideoRequestSaaS(**payload), user)
+    )
+)
+
+
+def _get_owned_job(job_id: str, current_user: Dict[str, Any]) -> Dict[str, Any]:
+    job = GENERATION_JOBS.get(job_id)
+    # SECURITY: never reveal other users' jobs (same 404 as a missing job).
+    if not job or job.get("user_id") != current_user.get("id"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs/{kind}", status_code=202)
+async def enqueue_generation_job(
+    kind: str,
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Queue a long-running generation (JSON body of the matching endpoint) and return its job id."""
+    user_id = current_user.get("id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    if kind not in GENERATION_JOBS.kinds():
+        raise HTTPException(status_code=404, detail=f"Unknown job kind. Supported: {', '.join(GENERATION_JOBS.kinds())}")
+    try:
+        payload = await request.json()
+    except Exception:
+        raise HTTPException(status_code=422, detail="Job payload must be a JSON object")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=422, detail="Job payload must be a JSON object")
+    if kind == "generate-video-saas":
+        try:
+            GenerateVideoRequestSaaS(**payload)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    enforce_rate_limit(request, user_id, kind)
+    job = GENERATION_JOBS.enqueue(user_id, kind, payload, user_context=current_user)
+    view = GENERATION_JOBS.public_view(job)
+    await _broadcast_autopost_event(user_id, "job.updated", view)
+    return {
+        **view,
+        "status_url": f"/api/jobs/{job['id']}",
+        "result_url": f"/api/jobs/{job['id']}/result"
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_generation_job(job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)):
+    return GENERATION_JOBS.public_view(_get_owned_job(job_id, current_user))
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_generation_job_result(job_id: str, current_user: Dict[str, Any] = Depends(get_current_user)):
+    job = _get_owned_job(job_id, current_user)
+    if job["status"] == "SUCCEEDED":
+        return job.get("result")
+    if job["status"] == "FAILED":
+        raise HTTPException(status_code=job.get("error_status") or 500, detail=job.get("error") or "Job failed")
+    raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+
 class CreateMidtransTransactionRequest(BaseModel):
     package_id: str
     order_id: str
@@ -4582,7 +4529,7 @@ async def billing_webhook(request: Request):
         if plan_id == "pro_monthly":
             days = 30
 
-        profile = get_profile_by_user_id(user_id)
+        profile = await get_profile_by_user_id_async(user_id)
         now = datetime.utcnow()
         current_exp = _parse_iso_dt((profile or {}).get("subscribed_until") or (profile or {}).get("subscription_expires_at"))
         base = current_exp if current_exp and current_exp > now else now
@@ -4626,7 +4573,7 @@ async def billing_status(current_user: Dict[str, Any] = Depends(get_current_user
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    profile = get_profile_by_user_id(user_id)
+    profile = await get_profile_by_user_id_async(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     expires_at = profile.get("subscribed_until") or profile.get("subscription_expires_at")
@@ -4727,7 +4674,7 @@ async def billing_reminders_run(
         recent = list_recent_reminders(user_id, "renewal", hours=24)
         if recent:
             continue
-        user = get_user_by_id(user_id)
+        user = await get_user_by_id_async(user_id)
         email = (user or {}).get("email")
         message = "Masa langganan Pro kamu hampir habis. Yuk perpanjang agar fitur tetap aktif."
         if email and email_webhook:
@@ -4823,7 +4770,7 @@ async def midtrans_webhook(request: Request):
             raise HTTPException(status_code=400, detail="Unsupported payment amount")
         
         # Update user coins
-        update_user_coins(user_id, coins_to_add)
+        await update_user_coins_async(user_id, coins_to_add)
 
         # Log transaction to Supabase
         try:
@@ -4881,68 +4828,58 @@ class AutopostTaskUpdateRequest(BaseModel):
     error: Optional[str] = None
 
 
-def _recheck_due_videos(conn: sqlite3.Connection, user_id: str) -> int:
-    now = _now_iso()
-    rows = conn.execute(
-        """
-        SELECT * FROM autopost_videos
-        WHERE user_id = ? AND status = 'WAITING_RECHECK'
-          AND next_check_at IS NOT NULL AND next_check_at <= ?
-        ORDER BY next_check_at ASC
-        """,
-        (user_id, now)
-    ).fetchall()
-    updated = 0
-    for row in rows:
+def _recheck_autopost_video(video_id: int) -> Optional[Tuple[str, str]]:
+    """Re-score one claimed WAITING_RECHECK video; runs on a recheck scheduler thread."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT * FROM autopost_videos WHERE id = ? AND status = 'WAITING_RECHECK'",
+            (video_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    user_id = row["user_id"]
+    previous_details = {}
+    try:
+        previous_details = json.loads(row["score_details"] or "{}")
+    except Exception:
         previous_details = {}
-        try:
-            previous_details = json.loads(row["score_details"] or "{}")
-        except Exception:
-            previous_details = {}
-        scene_signals = previous_details.get("scene_signals")
-        if not scene_signals and row.get("file_path"):
-            scene_signals = _get_scene_signals(row["file_path"])
-        details = _score_video_metadata(
-            row["title"],
-            row["caption"],
-            row["hook_text"],
-            row["cta_text"],
-            row["hashtags"],
-            row["category"],
-            user_id,
-            scene_signals
-        )
-        score = float(details.get("score", 0.0))
-        score_reasons = build_score_reasons(
-            details,
-            row["title"],
-            row["hook_text"],
-            row["cta_text"],
-            row["hashtags"],
-            row["category"]
-        )
-        threshold = _adjust_threshold_with_feedback(
-            row["threshold"] or DEFAULT_AUTPOST_THRESHOLD,
-            details.get("feedback") or {},
-            float(details.get("trend_similarity") or 0.0)
-        )
-        details["threshold"] = threshold
-        _log_score_details(f"user={user_id} video_id={row['id']}", details)
-        compliance_blocked = bool(details.get("compliance_blocked"))
-        if compliance_blocked:
-            _update_autopost_record(
-                conn,
-                row["id"],
-                status="WAITING_RECHECK",
-                score=score,
-                score_details=json.dumps(details),
-                score_reasons=json.dumps(score_reasons),
-                next_check_at=_schedule_next_check(),
-                scheduled_at=None,
-                status_note=None,
-                threshold=threshold
-            )
-        elif score >= threshold:
+    scene_signals = previous_details.get("scene_signals")
+    if not scene_signals and row["file_path"]:
+        scene_signals = _get_scene_signals(row["file_path"])
+    details = _score_video_metadata(
+        row["title"],
+        row["caption"],
+        row["hook_text"],
+        row["cta_text"],
+        row["hashtags"],
+        row["category"],
+        user_id,
+        scene_signals
+    )
+    score = float(details.get("score", 0.0))
+    score_reasons = build_score_reasons(
+        details,
+        row["title"],
+        row["hook_text"],
+        row["cta_text"],
+        row["hashtags"],
+        row["category"]
+    )
+    threshold = _adjust_threshold_with_feedback(
+        row["threshold"] or DEFAULT_AUTPOST_THRESHOLD,
+        details.get("feedback") or {},
+        float(details.get("trend_similarity") or 0.0)
+    )
+    details["threshold"] = threshold
+    _log_score_details(f"user={user_id} video_id={row['id']}", details)
+    compliance_blocked = bool(details.get("compliance_blocked"))
+    status = "QUEUED" if score >= threshold and not compliance_blocked else "WAITING_RECHECK"
+    # Scoring ran without a transaction; only the status write holds the database write lock.
+    with DB_POOL.write() as conn:
+        if status == "QUEUED":
             preferred_window = get_best_posting_window(conn, user_id)
             scheduled_at_dt = resolve_schedule_time(datetime.now(), preferred_window)
             scheduled_at = scheduled_at_dt.isoformat() if scheduled_at_dt else None
@@ -4972,10 +4909,10 @@ def _recheck_due_videos(conn: sqlite3.Connection, user_id: str) -> int:
                 status_note=None,
                 threshold=threshold
             )
-        updated += 1
-    if updated:
-        conn.commit()
-    return updated
+    return user_id, status
+
+
+AUTPOST_RECHECK = RecheckScheduler(str(DB_PATH), _recheck_autopost_video)
 
 
 def _count_active_autopost_tasks(user_id: str) -> int:
@@ -5003,6 +4940,7 @@ autopost_service = AutopostService(
         default_threshold=DEFAULT_AUTPOST_THRESHOLD,
         scene_provider=AUTPOST_SCENE_PROVIDER,
         get_db_connection=get_db_connection,
+        write_transaction=DB_POOL.write,
         enforce_rate_limit=_enforce_rate_limit,
         get_user_profile=get_user_profile,
         update_user_trial_remaining=update_user_trial_remaining,
@@ -5010,6 +4948,7 @@ autopost_service = AutopostService(
         get_trend_context=_get_trend_context,
         get_scene_signals=_get_scene_signals,
         score_video_metadata=_score_video_metadata,
+        score_video_metadata_batch=_score_video_metadata_batch,
         adjust_threshold_with_feedback=_adjust_threshold_with_feedback,
         schedule_next_check=_schedule_next_check,
         now_iso=_now_iso,
@@ -5017,7 +4956,6 @@ autopost_service = AutopostService(
         broadcast_event=_broadcast_autopost_event,
         cleanup_old_temp_videos=_cleanup_old_temp_videos,
         async_scene_analysis=_async_scene_analysis,
-        recheck_due_videos=_recheck_due_videos,
         active_tasks=_count_active_autopost_tasks
     )
 )
@@ -5031,11 +4969,9 @@ async def autopost_recheck(
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    conn = get_db_connection()
-    updated = _recheck_due_videos(conn, user_id)
-    conn.close()
-    _cleanup_old_temp_videos()
-    await _broadcast_autopost_event(user_id, "autopost.recheck", {"updated": updated})
+    # Same claim-and-rescore path as the scheduler, limited to this user; the sweep broadcasts the result.
+    updated = await AUTPOST_RECHECK.sweep(user_id)
+    await asyncio.to_thread(_cleanup_old_temp_videos)
     return {"updated": updated}
 
 
@@ -5046,25 +4982,26 @@ async def autopost_next_task(
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    profile = get_user_profile(user_id)
+    profile = await get_user_profile_async(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     _trial_guard(profile, user_id)
 
-    conn = get_db_connection()
-    _recheck_due_videos(conn, user_id)
-    row = conn.execute(
-        "SELECT * FROM autopost_videos WHERE user_id = ? AND status = 'QUEUED' ORDER BY created_at ASC LIMIT 1",
-        (user_id,)
-    ).fetchone()
+    def _take_next_task() -> Optional[sqlite3.Row]:
+        # Select and mark in one write transaction so two pollers never take the same task.
+        with DB_POOL.write() as conn:
+            row = conn.execute(
+                "SELECT * FROM autopost_videos WHERE user_id = ? AND status = 'QUEUED' ORDER BY created_at ASC LIMIT 1",
+                (user_id,)
+            ).fetchone()
+            if row:
+                _update_autopost_record(conn, row["id"], status="IN_PROGRESS")
+            return row
+
+    row = await asyncio.to_thread(_take_next_task)
     if not row:
-        conn.close()
         return {"task": None}
 
-    _update_autopost_record(conn, row["id"], status="IN_PROGRESS")
-    conn.commit()
-    conn.close()
-
     return {
         "task": {
             "id": row["id"],
@@ -5125,26 +5062,25 @@ async def autopost_complete_task(
     if status not in ["POSTED", "FAILED"]:
         raise HTTPException(status_code=400, detail="Invalid status. Use POSTED or FAILED.")
 
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
-        (video_id, user_id)
-    ).fetchone()
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Video not found")
+    def _complete_task() -> sqlite3.Row:
+        with DB_POOL.write() as conn:
+            row = conn.execute(
+                "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
+                (video_id, user_id)
+            ).fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Video not found")
 
-    allowed_previous = ("IN_PROGRESS", "PROCESSING", "RETRYING")
-    if row["status"] in ("POSTED", "FAILED"):
-        conn.close()
-        raise HTTPException(status_code=409, detail="Task already completed")
-    if row["status"] not in allowed_previous:
-        conn.close()
-        raise HTTPException(status_code=400, detail=f"Invalid state transition from {row['status']}")
+            allowed_previous = ("IN_PROGRESS", "PROCESSING", "RETRYING")
+            if row["status"] in ("POSTED", "FAILED"):
+                raise HTTPException(status_code=409, detail="Task already completed")
+            if row["status"] not in allowed_previous:
+                raise HTTPException(status_code=400, detail=f"Invalid state transition from {row['status']}")
 
-    _update_autopost_record(conn, video_id, status=status, error=payload.error)
-    conn.commit()
-    conn.close()
+            _update_autopost_record(conn, video_id, status=status, error=payload.error)
+            return row
+
+    row = await asyncio.to_thread(_complete_task)
 
     # Cleanup file after POSTED or FAILED
     try:
@@ -5173,31 +5109,78 @@ async def autopost_retry_task(
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
 
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
-        (video_id, user_id)
-    ).fetchone()
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Video not found")
+    def _retry_task() -> None:
+        with DB_POOL.write() as conn:
+            row = conn.execute(
+                "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
+                (video_id, user_id)
+            ).fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Video not found")
+
+            allowed_retry_states = ("FAILED", "CANCELLED")
+            if row["status"] not in allowed_retry_states:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Task can only be retried if status in {allowed_retry_states}"
+                )
 
-    allowed_retry_states = ("FAILED", "CANCELLED")
-    if row["status"] not in allowed_retry_states:
-        conn.close()
-        raise HTTPException(
-            status_code=400,
-            detail=f"Task can only be retried if status in {allowed_retry_states}"
-        )
+            _update_autopost_record(conn, video_id, status="QUEUED", error=None)
 
-    _update_autopost_record(conn, video_id, status="QUEUED", error=None)
-    conn.commit()
-    conn.close()
+    await asyncio.to_thread(_retry_task)
     logger.info(f"[AUTPOST] user={user_id} retry task video_id={video_id}")
     await _broadcast_autopost_event(user_id, "autopost.updated", {"id": video_id, "status": "QUEUED"})
     return {"status": "QUEUED"}
 
 
+def _record_autopost_metrics(
+    user_id: str,
+    video_id: int,
+    views: int,
+    likes: int,
+    comments: int,
+    shares: int,
+    avg_watch_time: Any,
+    retention_curve: Any,
+    posted_at: Optional[str]
+) -> None:
+    """Insert one metrics row and fold it into the engagement aggregates in a single transaction."""
+    with DB_POOL.write() as conn:
+        video = conn.execute(
+            "SELECT category, hook_text, cta_text, hashtags FROM autopost_videos WHERE id = ?",
+            (video_id,)
+        ).fetchone()
+        conn.execute(
+            """
+            INSERT INTO autopost_metrics
+            (user_id, video_id, views, likes, comments, shares, avg_watch_time, retention_curve, posted_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id,
+                video_id,
+                views,
+                likes,
+                comments,
+                shares,
+                avg_watch_time,
+                json.dumps(retention_curve) if retention_curve is not None else None,
+                posted_at,
+                _now_iso()
+            )
+        )
+        if video:
+            record_engagement_sample(
+                conn,
+                user_id,
+                video["category"],
+                video["hook_text"],
+                video["cta_text"],
+                video["hashtags"],
+                _compute_engagement_rate(views, likes, comments, shares)
+            )
+
+
 @app.post("/api/autopost/metrics")
 async def autopost_metrics(
     payload: Dict[str, Any],
@@ -5206,7 +5189,7 @@ async def autopost_metrics(
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    profile = get_user_profile(user_id)
+    profile = await get_user_profile_async(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     _trial_guard(profile, user_id)
@@ -5222,28 +5205,18 @@ async def autopost_metrics(
     retention_curve = normalized.get("retention_curve")
     posted_at = normalized.get("posted_at")
 
-    conn = get_db_connection()
-    conn.execute(
-        """
-        INSERT INTO autopost_metrics
-        (user_id, video_id, views, likes, comments, shares, avg_watch_time, retention_curve, posted_at, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            user_id,
-            int(video_id),
-            views,
-            likes,
-            comments,
-            shares,
-            avg_watch_time,
-            json.dumps(retention_curve) if retention_curve is not None else None,
-            posted_at,
-            _now_iso()
-        )
+    await asyncio.to_thread(
+        _record_autopost_metrics,
+        user_id,
+        int(video_id),
+        views,
+        likes,
+        comments,
+        shares,
+        avg_watch_time,
+        retention_curve,
+        posted_at
     )
-    conn.commit()
-    conn.close()
     await _broadcast_autopost_event(user_id, "autopost.metrics", {"video_id": video_id})
     return {"status": "ok"}
 
@@ -5335,27 +5308,37 @@ async def autopost_retry_variant(
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="User ID not found in token")
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
-        (video_id, user_id)
-    ).fetchone()
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Video not found")
-    if row["status"] == "QUEUED":
-        conn.close()
-        raise HTTPException(status_code=409, detail="Task already queued")
     allowed_retry_variant = ("FAILED",)
-    if row["status"] not in allowed_retry_variant:
+
+    def _check_retry_variant(conn: sqlite3.Connection) -> sqlite3.Row:
+        row = conn.execute(
+            "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
+            (video_id, user_id)
+        ).fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Video not found")
+        if row["status"] == "QUEUED":
+            raise HTTPException(status_code=409, detail="Task already queued")
+        if row["status"] not in allowed_retry_variant:
+            raise HTTPException(status_code=400, detail="Retry variant allowed only when FAILED")
+        return row
+
+    conn = get_db_connection()
+    try:
+        row = _check_retry_variant(conn)
+    finally:
         conn.close()
-        raise HTTPException(status_code=400, detail="Retry variant allowed only when FAILED")
     templates = _get_engagement_templates(row["category"])
     new_hook = templates["hooks"][0] if templates["hooks"] else row["hook_text"]
     new_cta = templates["ctas"][0] if templates["ctas"] else row["cta_text"]
-    _update_autopost_record(conn, video_id, status="QUEUED", hook_text=new_hook, cta_text=new_cta, error=None)
-    conn.commit()
-    conn.close()
+
+    def _queue_variant() -> None:
+        # Templates are built outside the transaction; re-check the state under the write lock.
+        with DB_POOL.write() as conn:
+            _check_retry_variant(conn)
+            _update_autopost_record(conn, video_id, status="QUEUED", hook_text=new_hook, cta_text=new_cta, error=None)
+
+    await asyncio.to_thread(_queue_variant)
     logger.info(f"[AUTPOST] user={user_id} retry-variant video_id={video_id}")
     await _broadcast_autopost_event(user_id, "autopost.updated", {"id": video_id, "status": "QUEUED"})
     return {"status": "QUEUED", "hook_text": new_hook, "cta_text": new_cta}
@@ -5386,13 +5369,15 @@ async def add_competitor(
         raise HTTPException(status_code=400, detail="title is required")
     url = payload.get("url")
     notes = payload.get("notes")
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT INTO autopost_competitors (user_id, title, url, notes, created_at) VALUES (?, ?, ?, ?, ?)",
-        (user_id, title, url, notes, _now_iso())
-    )
-    conn.commit()
-    conn.close()
+
+    def _insert_competitor() -> None:
+        with DB_POOL.write() as conn:
+            conn.execute(
+                "INSERT INTO autopost_competitors (user_id, title, url, notes, created_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, title, url, notes, _now_iso())
+            )
+
+    await asyncio.to_thread(_insert_competitor)
     return {"status": "ok"}
 
 
@@ -5460,7 +5445,7 @@ async def admin_upload_trends(
         logger.error(f"Failed to save trends CSV: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to save CSV")
 
-    count = _refresh_trends_index()
+    count = await asyncio.to_thread(_refresh_trends_index)
     AUTPOST_IMPORT_STATUS.update({"status": "done", "processed": count, "valid": count, "invalid": 0})
     return {"status": "ok", "rows": count}
 
@@ -5469,10 +5454,18 @@ async def admin_upload_trends(
 async def admin_refresh_trends(
     _: Dict[str, Any] = Depends(require_admin)
 ):
-    count = _refresh_trends_index()
+    count = await asyncio.to_thread(_refresh_trends_index)
     return {"status": "ok", "rows": count}
 
 
+@app.post("/api/admin/ffmpeg/refresh")
+async def admin_refresh_ffmpeg(
+    _: Dict[str, Any] = Depends(require_admin)
+):
+    capabilities = await asyncio.to_thread(refresh_ffmpeg_capabilities)
+    return {"status": "ok", "ffmpeg": capabilities.to_dict()}
+
+
 @app.get("/api/admin/trends/import-status")
 async def admin_trends_import_status(
     _: Dict[str, Any] = Depends(require_admin)
@@ -5503,7 +5496,7 @@ async def admin_trends_template(
 async def admin_trends_export(
     _: Dict[str, Any] = Depends(require_admin)
 ):
-    rows = AUTPOST_TRENDS_INDEX.get("rows", [])
+    rows = AUTPOST_TRENDS_DATA.get().rows
     output = ["category,hashtag,weight"]
     for row in rows:
         category = (row.get("category") or "").replace("\n", " ").strip()
@@ -5519,7 +5512,7 @@ async def admin_trends_export(
 async def admin_preview_trends(
     _: Dict[str, Any] = Depends(require_admin)
 ):
-    rows = AUTPOST_TRENDS_INDEX.get("rows", [])
+    rows = AUTPOST_TRENDS_DATA.get().rows
     preview = [{"category": r.get("category"), "hashtag": r.get("hashtag"), "weight": r.get("weight")} for r in rows[:200]]
     return {"rows": preview, "total": len(rows)}
 
@@ -5544,15 +5537,14 @@ async def admin_list_trends(
         preview = [{"category": r.get("category"), "hashtag": r.get("hashtag"), "weight": r.get("weight")} for r in page_rows]
         return {"rows": preview, "total": total, "page": page, "page_size": page_size}
 
-    rows = AUTPOST_TRENDS_INDEX.get("rows", [])
+    dataset = AUTPOST_TRENDS_DATA.get()
+    rows = dataset.for_category(category) if category else dataset.rows
     query_lower = query.lower()
     if query_lower:
         rows = [
             r for r in rows
             if query_lower in (r.get("hashtag") or "").lower() or query_lower in (r.get("category") or "").lower()
         ]
-    if category:
-        rows = [r for r in rows if (r.get("category") or "").lower() == category.lower()]
     total = len(rows)
     start = (page - 1) * page_size
     end = start + page_size
@@ -5574,7 +5566,7 @@ async def debug_profile_status(current_user: Dict[str, Any] = Depends(get_curren
     """Debug profile lookup for the current user."""
     user_id = current_user.get("id")
     email = current_user.get("email")
-    profile = get_user_profile(user_id) if user_id else None
+    profile = await get_user_profile_async(user_id) if user_id else None
     return {
         "user_id": user_id,
         "email": email,
@@ -5643,13 +5635,18 @@ async def admin_autopost_feedback_weights(
         target_user_id = get_user_id_by_email(email)
     if not target_user_id:
         raise HTTPException(status_code=400, detail="user_id or email is required")
-    conn = get_db_connection()
-    refresh_feedback_weights(conn, target_user_id)
-    refresh_global_feedback_weights(conn)
-    weights = get_feedback_weights(conn, target_user_id)
-    global_weights = get_global_feedback_weights(conn)
-    strength = get_learning_strength(conn, target_user_id)
-    conn.close()
+
+    def _refresh_weights() -> Tuple[Dict[str, Any], Dict[str, Any], float]:
+        with DB_POOL.write() as conn:
+            refresh_feedback_weights(conn, target_user_id)
+            refresh_global_feedback_weights(conn)
+            return (
+                get_feedback_weights(conn, target_user_id),
+                get_global_feedback_weights(conn),
+                get_learning_strength(conn, target_user_id)
+            )
+
+    weights, global_weights, strength = await asyncio.to_thread(_refresh_weights)
     return {
         "user_id": target_user_id,
         "learning_strength": round(strength, 3),
@@ -5704,7 +5701,7 @@ async def admin_subscription_update(
     if subscribed is not None:
         update_user_subscription(target_user_id, bool(subscribed))
     if trial_remaining is not None:
-        update_user_trial_remaining(target_user_id, int(trial_remaining))
+        await update_user_trial_remaining_async(target_user_id, int(trial_remaining))
 
     profile = get_profile_by_user_id(target_user_id)
     if not profile:
@@ -5727,9 +5724,8 @@ async def admin_subscription_update(
                 )
             except Exception:
                 logger.error("Failed to insert admin adjustment", exc_info=True)
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="subscription_update",
@@ -5739,8 +5735,6 @@ async def admin_subscription_update(
             "trial_upload_remaining": int(profile.get("trial_upload_remaining") or 0)
         }
     )
-    conn.commit()
-    conn.close()
     return {
         "user_id": target_user_id,
         "subscribed": bool(profile.get("subscribed")),
@@ -5828,9 +5822,9 @@ def _matches_filters(
     is_admin: Optional[bool],
     status: Optional[str]
 ) -> bool:
-    if subscribed is not None and bool(profile.get("subscribed")) != subscribed:
+    if subscribed is not None and bool((profile or {}).get("subscribed")) != subscribed:
         return False
-    if is_admin is not None and bool(profile.get("is_admin")) != is_admin:
+    if is_admin is not None and bool((profile or {}).get("is_admin")) != is_admin:
         return False
     if status:
         status_norm = status.lower()
@@ -5839,6 +5833,44 @@ def _matches_filters(
     return True
 
 
+async def _scan_admin_users(
+    limit: int,
+    subscribed: Optional[bool],
+    is_admin: Optional[bool],
+    status: Optional[str],
+    query: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Serialized auth users (Auth order) matching the filters, up to `limit`.
+    Scans Auth in large pages; profiles are fetched once per page, never per user.
+    Users without a profile row match subscribed=False, is_admin=False and status=inactive.
+    """
+    matched: List[Dict[str, Any]] = []
+    current_page = 1
+    total = None
+    scan_per_page = 200
+
+    while len(matched) < limit:
+        users, total = await asyncio.to_thread(list_auth_users, current_page, scan_per_page, query)
+        if not users:
+            break
+        page_size = len(users)
+        if query:
+            users = [user for user in users if query in (user.get("email") or "").lower()]
+        profiles = await asyncio.to_thread(get_profiles_by_user_ids, [u.get("id") for u in users])
+        for user in users:
+            profile = profiles.get(user.get("id"))
+            if not _matches_filters(profile, subscribed, is_admin, status):
+                continue
+            matched.append(_serialize_admin_user(user, profile))
+        current_page += 1
+        if page_size < scan_per_page:
+            break
+        if total is not None and current_page > ((total // scan_per_page) + 2):
+            break
+    return matched[:limit], total
+
+
 @app.get("/api/admin/users")
 async def admin_list_users(
     page: int = 1,
@@ -5851,29 +5883,18 @@ async def admin_list_users(
     per_page = max(1, min(per_page, 100))
     page = max(1, page)
     target_start = (page - 1) * per_page
-    target_end = target_start + per_page
-
-    matched: List[Dict[str, Any]] = []
-    current_page = 1
-    total = None
 
-    while len(matched) < target_end:
-        users, total = list_auth_users(page=current_page, per_page=per_page)
-        if not users:
-            break
-        for user in users:
-            user_id = user.get("id")
-            profile = get_profile_by_user_id(user_id) if user_id else None
-            if not _matches_filters(profile, subscribed, is_admin, status):
-                continue
-            matched.append(_serialize_admin_user(user, profile))
-        current_page += 1
-        if total is not None and current_page > ((total // per_page) + 2):
-            break
+    if subscribed is None and is_admin is None and not status:
+        # Unfiltered: one Auth page + one bulk profile fetch.
+        users, total = await asyncio.to_thread(list_auth_users, page, per_page)
+        profiles = await asyncio.to_thread(get_profiles_by_user_ids, [u.get("id") for u in users])
+        items = [_serialize_admin_user(user, profiles.get(user.get("id"))) for user in users]
+        return {"items": items, "page": page, "per_page": per_page, "total": total}
 
-    items = matched[target_start:target_end]
+    # Filtered: same auth-user order and the same profile-less matches as the unfiltered list.
+    items, total = await _scan_admin_users(target_start + per_page, subscribed, is_admin, status)
     return {
-        "items": items,
+        "items": items[target_start:],
         "page": page,
         "per_page": per_page,
         "total": total
@@ -5897,29 +5918,8 @@ async def admin_search_users(
         return {"items": [], "page": page, "per_page": per_page, "total": 0}
 
     target_start = (page - 1) * per_page
-    target_end = target_start + per_page
-    matched: List[Dict[str, Any]] = []
-    current_page = 1
-    total = None
-
-    while len(matched) < target_end:
-        users, total = list_auth_users(page=current_page, per_page=per_page)
-        if not users:
-            break
-        for user in users:
-            email = (user.get("email") or "").lower()
-            if query not in email:
-                continue
-            user_id = user.get("id")
-            profile = get_profile_by_user_id(user_id) if user_id else None
-            if not _matches_filters(profile, subscribed, is_admin, status):
-                continue
-            matched.append(_serialize_admin_user(user, profile))
-        current_page += 1
-        if total is not None and current_page > ((total // per_page) + 2):
-            break
-
-    items = matched[target_start:target_end]
+    matched, total = await _scan_admin_users(target_start + per_page, subscribed, is_admin, status, query)
+    items = matched[target_start:]
     return {
         "items": items,
         "page": page,
@@ -5955,9 +5955,8 @@ async def admin_set_subscription(
         upsert_subscription_record(user_id, False, None)
 
     updated = get_profile_by_user_id(user_id)
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="set_subscription",
@@ -5968,8 +5967,6 @@ async def admin_set_subscription(
             "subscription_expires_at": updated.get("subscription_expires_at") if updated else None
         }
     )
-    conn.commit()
-    conn.close()
     return {
         "id": user_id,
         "trial_upload_remaining": int(updated.get("trial_upload_remaining") or 0),
@@ -6020,17 +6017,14 @@ async def admin_bulk_set_subscription(
             upsert_subscription_record(uid, False, None)
         updated_count += 1
 
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="bulk_set_subscription",
         target_user_id=None,
         details={"active": active, "days": days, "count": updated_count}
     )
-    conn.commit()
-    conn.close()
     return {"updated": updated_count}
 
 
@@ -6041,19 +6035,16 @@ async def admin_reset_trial(
     current_user: Dict[str, Any] = Depends(require_admin)
 ):
     profile_before = get_profile_by_user_id(user_id)
-    update_user_trial_remaining(user_id, 3)
+    await update_user_trial_remaining_async(user_id, 3)
     updated = get_profile_by_user_id(user_id)
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="reset_trial",
         target_user_id=user_id,
         details={"trial_upload_remaining": 3}
     )
-    conn.commit()
-    conn.close()
     if profile_before and updated:
         before = int(profile_before.get("trial_upload_remaining") or 0)
         after = int(updated.get("trial_upload_remaining") or 0)
@@ -6100,7 +6091,7 @@ async def admin_bulk_reset_trial(
     updated_count = 0
     for uid in unique_ids:
         profile_before = get_profile_by_user_id(uid)
-        update_user_trial_remaining(uid, 3)
+        await update_user_trial_remaining_async(uid, 3)
         profile_after = get_profile_by_user_id(uid)
         if profile_before and profile_after:
             before = int(profile_before.get("trial_upload_remaining") or 0)
@@ -6121,17 +6112,14 @@ async def admin_bulk_reset_trial(
                     logger.error("Failed to insert admin adjustment", exc_info=True)
         updated_count += 1
 
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="bulk_reset_trial",
         target_user_id=None,
         details={"count": updated_count}
     )
-    conn.commit()
-    conn.close()
     return {"updated": updated_count}
 
 
@@ -6144,17 +6132,14 @@ async def admin_set_admin(
     is_admin = bool(payload.get("is_admin"))
     update_user_admin_flag(user_id, is_admin)
     updated = get_profile_by_user_id(user_id)
-    conn = get_db_connection()
-    _log_admin_audit(
-        conn,
+    await asyncio.to_thread(
+        _log_admin_audit,
         actor_user_id=current_user.get("id") or "unknown",
         actor_email=current_user.get("email"),
         action="set_admin",
         target_user_id=user_id,
         details={"is_admin": is_admin}
     )
-    conn.commit()
-    conn.close()
     return {
         "id": user_id,
         "is_admin": bool(updated.get("is_admin"))
@@ -6181,7 +6166,7 @@ async def admin_add_coins(
     if not reason:
         raise HTTPException(status_code=400, detail="reason is required")
 
-    updated = update_user_coins(user_id, delta_int)
+    updated = await update_user_coins_async(user_id, delta_int)
     try:
         insert_admin_adjustment(
             admin_user_id=current_user.get("id") or "unknown",
@@ -6219,7 +6204,7 @@ async def admin_sub_coins(
     if not reason:
         raise HTTPException(status_code=400, detail="reason is required")
 
-    updated = update_user_coins(user_id, -delta_int)
+    updated = await update_user_coins_async(user_id, -delta_int)
     try:
         insert_admin_adjustment(
             admin_user_id=current_user.get("id") or "unknown",
@@ -6272,7 +6257,7 @@ async def admin_bulk_add_coins(
 
     updated_count = 0
     for uid in unique_ids:
-        updated = update_user_coins(uid, delta_int)
+        updated = await update_user_coins_async(uid, delta_int)
         if updated:
             updated_count += 1
         try:
@@ -6324,7 +6309,7 @@ async def admin_bulk_sub_coins(
 
     updated_count = 0
     for uid in unique_ids:
-        updated = update_user_coins(uid, -delta_int)
+        updated = await update_user_coins_async(uid, -delta_int)
         if updated:
             updated_count += 1
         try:
@@ -6364,7 +6349,7 @@ async def autopost_ws(websocket: WebSocket):
     if not token:
         await websocket.close(code=1008)
         return
-    user = verify_user_token(token)
+    user = await _verify_access_token(token)
     if not user or not user.get("id"):
         await websocket.close(code=1008)
         return
@@ -6391,7 +6376,7 @@ async def generate_image_proxy(
     """Proxy endpoint to Node.js image generation service"""
     try:
         # Security: enforce auth + coins server-side for legacy generation.
-        user_id, profile = _get_profile_for_user(current_user)
+        user_id, profile = await _get_profile_for_user(current_user)
         _require_coins(profile, LEGACY_IMAGE_COST)
         # Prepare request body for Node.js service
         body = {
@@ -6430,7 +6415,7 @@ async def generate_image_proxy(
             )
             response.raise_for_status()
             result = response.json()
-            update_user_coins(user_id, -LEGACY_IMAGE_COST)
+            await update_user_coins_async(user_id, -LEGACY_IMAGE_COST)
             return result
     
     except httpx.HTTPError as e:
@@ -6451,7 +6436,7 @@ async def generate_video(
     """Generate a video from an image"""
     try:
         # Security: enforce auth + coins server-side for legacy generation.
-        user_id, profile = _get_profile_for_user(current_user)
+        user_id, profile = await _get_profile_for_user(current_user)
         _require_coins(profile, LEGACY_VIDEO_COST)
         # Convert options to dict
         options = {
@@ -6466,7 +6451,7 @@ async def generate_video(
             request.image,
             options
         )
-        update_user_coins(user_id, -LEGACY_VIDEO_COST)
+        await update_user_coins_async(user_id, -LEGACY_VIDEO_COST)
         return {"videoUrl": video_url}
     except HTTPException:
         raise
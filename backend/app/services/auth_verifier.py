@@ -0,0 +1,204 @@
+"""
+Local verification of Supabase access tokens.
+
+Tokens are first checked against the project's JWT secret (HS256) or the
+cached JWKS published by Supabase Auth (asymmetric signing keys), so forged,
+expired or anonymous tokens are rejected without a round trip. A token that
+passes is confirmed once through the remote /auth/v1/user check, which owns
+the email_confirmed_at rule, and the verified user is cached briefly by token
+hash.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt  # type: ignore
+from jose.exceptions import ExpiredSignatureError, JWTError  # type: ignore
+
+from app.services.supabase_service import SUPABASE_URL, SUPABASE_ANON_KEY, verify_user_token
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE", "authenticated")
+AUTH_VERIFY_MODE = os.getenv("AUTH_VERIFY_MODE", "local").lower()  # local | remote
+AUTH_JWKS_TTL_SECONDS = float(os.getenv("AUTH_JWKS_TTL_SECONDS", "600"))
+AUTH_CLAIMS_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CLAIMS_CACHE_TTL_SECONDS", "60"))
+AUTH_CLAIMS_CACHE_MAX = int(os.getenv("AUTH_CLAIMS_CACHE_MAX", "10000"))
+
+_HMAC_ALGORITHMS = ["HS256"]
+_ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+# Do not hammer the JWKS endpoint when tokens carry an unknown kid.
+_JWKS_MIN_REFRESH_SECONDS = 30.0
+
+
+class SupabaseAuthVerifier:
+    """Verify Supabase JWTs locally and cache verified users by token hash."""
+
+    def __init__(
+        self,
+        supabase_url: Optional[str],
+        jwt_secret: str,
+        audience: str,
+        jwks_ttl: float,
+        cache_ttl: float,
+        cache_max: int
+    ) -> None:
+        self.supabase_url = (supabase_url or "").rstrip("/")
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.jwks_ttl = jwks_ttl
+        self.cache_ttl = cache_ttl
+        self.cache_max = max(1, cache_max)
+        self._lock = threading.Lock()
+        self._claims_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._jwks: List[Dict[str, Any]] = []
+        self._jwks_fetched_at = 0.0
+        self._stats = {"cache_hits": 0, "local_rejected": 0, "remote_verified": 0, "rejected": 0}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_tokens"] = len(self._claims_cache)
+        return stats
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_cached(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached verified user for `token`, or None (never does I/O)."""
+        key = self._token_key(token)
+        now = time.time()
+        with self._lock:
+            cached = self._claims_cache.get(key)
+            if not cached:
+                return None
+            expires_at, user = cached
+            if now >= expires_at:
+                self._claims_cache.pop(key, None)
+                return None
+            self._claims_cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            return dict(user)
+
+    def _remember(self, token: str, user: Dict[str, Any], token_exp: Optional[float]) -> None:
+        expires_at = time.time() + self.cache_ttl
+        if token_exp:
+            # Never serve a cached user past the token's own expiry.
+            expires_at = min(expires_at, float(token_exp))
+        key = self._token_key(token)
+        with self._lock:
+            self._claims_cache[key] = (expires_at, dict(user))
+            self._claims_cache.move_to_end(key)
+            while len(self._claims_cache) > self.cache_max:
+                self._claims_cache.popitem(last=False)
+
+    def _fetch_jwks(self, force: bool = False) -> List[Dict[str, Any]]:
+        now = time.time()
+        age = now - self._jwks_fetched_at
+        if self._jwks and age < self.jwks_ttl and not force:
+            return self._jwks
+        if force and age < _JWKS_MIN_REFRESH_SECONDS:
+            return self._jwks
+        if not self.supabase_url:
+            return []
+        try:
+            headers = {"apikey": SUPABASE_ANON_KEY} if SUPABASE_ANON_KEY else {}
+            response = httpx.get(
+                f"{self.supabase_url}/auth/v1/.well-known/jwks.json",
+                headers=headers,
+                timeout=5.0
+            )
+            response.raise_for_status()
+            keys = response.json().get("keys") or []
+            self._jwks = [k for k in keys if isinstance(k, dict)]
+        except Exception as exc:
+            logger.warning(f"Failed to fetch Supabase JWKS: {exc}")
+        self._jwks_fetched_at = now
+        return self._jwks
+
+    def _resolve_key(self, header: Dict[str, Any]) -> Tuple[Optional[Any], List[str]]:
+        alg = header.get("alg")
+        if alg in _HMAC_ALGORITHMS:
+            return (self.jwt_secret or None), _HMAC_ALGORITHMS
+        if alg not in _ASYMMETRIC_ALGORITHMS:
+            return None, []
+        kid = header.get("kid")
+        for force in (False, True):
+            for key in self._fetch_jwks(force=force):
+                if key.get("kid") == kid:
+                    return key, [alg]
+        return None, []
+
+    def _decode_locally(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return verified claims, None if the token cannot be checked locally; raise JWTError if invalid."""
+        header = jwt.get_unverified_header(token)
+        key, algorithms = self._resolve_key(header)
+        if key is None:
+            return None
+        return jwt.decode(token, key, algorithms=algorithms, audience=self.audience)
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify `token` and return {"id", "email", "user_metadata"} (same shape as
+        verify_user_token) or None when the token is invalid.
+        """
+        if not token:
+            return None
+        cached = self.get_cached(token)
+        if cached:
+            return cached
+
+        claims: Optional[Dict[str, Any]] = None
+        if AUTH_VERIFY_MODE == "local":
+            try:
+                claims = self._decode_locally(token)
+            except ExpiredSignatureError:
+                self._count("local_rejected")
+                return None
+            except JWTError as exc:
+                logger.warning(f"Token verification failed locally: {exc}")
+                self._count("local_rejected")
+                return None
+
+        if claims is not None:
+            # SECURITY: same acceptance rules as the remote check.
+            if not claims.get("sub") or not claims.get("email") or claims.get("is_anonymous"):
+                self._count("local_rejected")
+                return None
+
+        # SECURITY: access tokens do not carry email_confirmed_at, and user_metadata is
+        # user-writable, so a valid signature alone never admits a token. Supabase Auth
+        # confirms it once; the result is cached by token hash.
+        user = verify_user_token(token)
+        if not user or (claims is not None and user.get("id") != claims.get("sub")):
+            self._count("rejected")
+            return None
+        token_exp = claims.get("exp") if claims else None
+        self._remember(token, user, token_exp)
+        self._count("remote_verified")
+        return user
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+_AUTH_VERIFIER = SupabaseAuthVerifier(
+    supabase_url=SUPABASE_URL,
+    jwt_secret=SUPABASE_JWT_SECRET,
+    audience=AUTH_JWT_AUDIENCE,
+    jwks_ttl=AUTH_JWKS_TTL_SECONDS,
+    cache_ttl=AUTH_CLAIMS_CACHE_TTL_SECONDS,
+    cache_max=AUTH_CLAIMS_CACHE_MAX
+)
+
+
+def get_auth_verifier() -> SupabaseAuthVerifier:
+    return _AUTH_VERIFIER
@@ -0,0 +1,190 @@
+"""
+Pooled SQLite connections for premium_studio.db.
+
+Each thread keeps a small stack of idle connections that close() hands back
+instead of closing, so request paths stop paying the open + PRAGMA cost on
+every get_db_connection(). PRAGMAs are applied once per connection; WAL is a
+database-level setting, so readers never block the writer and the writer
+never blocks readers. Concurrent writers are serialised by SQLite itself:
+each one waits up to busy_timeout for the database write lock, so there is
+no separate in-process lock. write() wraps multi-statement writes in one
+BEGIN IMMEDIATE transaction and times how long BEGIN IMMEDIATE waited for
+that lock, so get_stats() shows writer contention (write_wait_ms_*) and
+writers that gave up after busy_timeout (write_busy_errors).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Negative cache_size is in KiB (default ~20 MB page cache per connection).
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_POOL_MAX_IDLE_PER_THREAD = max(0, int(os.getenv("SQLITE_POOL_MAX_IDLE_PER_THREAD", "4")))
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool."""
+
+    pool: Optional["SQLitePool"] = None
+    idle = False
+
+    def close(self) -> None:
+        if self.pool is None:
+            super().close()
+            return
+        self.pool.release(self)
+
+    def really_close(self) -> None:
+        super().close()
+
+
+class SQLitePool:
+    def __init__(
+        self,
+        db_path: str,
+        max_idle_per_thread: int = SQLITE_POOL_MAX_IDLE_PER_THREAD,
+        busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS
+    ) -> None:
+        self.db_path = db_path
+        self.max_idle_per_thread = max_idle_per_thread
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._journal_mode: Optional[str] = None
+        self._stats: Dict[str, Any] = {
+            "opened": 0,
+            "reused": 0,
+            "closed": 0,
+            "in_use": 0,
+            "rolled_back_on_release": 0,
+            "open_ms_total": 0.0,
+            "writes": 0,
+            "write_busy_errors": 0,
+            "write_wait_ms_total": 0.0,
+            "write_wait_ms_max": 0.0
+        }
+
+    def _idle(self) -> List[PooledConnection]:
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = []
+        return idle
+
+    def _open(self) -> PooledConnection:
+        start = time.perf_counter()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            factory=PooledConnection
+        )
+        # Persistent for the database file; only the first connection actually switches it.
+        mode = conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}").fetchone()
+        self._journal_mode = str(mode[0]) if mode else None
+        conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        conn.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.pool = self
+        with self._stats_lock:
+            self._stats["opened"] += 1
+            self._stats["open_ms_total"] += (time.perf_counter() - start) * 1000
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """A connection for the calling thread (Row factory); close() returns it here."""
+        idle = self._idle()
+        if idle:
+            conn = idle.pop()
+            conn.idle = False
+            with self._stats_lock:
+                self._stats["reused"] += 1
+        else:
+            conn = self._open()
+        conn.row_factory = sqlite3.Row
+        with self._stats_lock:
+            self._stats["in_use"] += 1
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        if conn.idle:
+            return
+        conn.idle = True
+        with self._stats_lock:
+            self._stats["in_use"] -= 1
+        try:
+            # Match the old close() semantics: uncommitted work is discarded.
+            if conn.in_transaction:
+                conn.rollback()
+                with self._stats_lock:
+                    self._stats["rolled_back_on_release"] += 1
+            idle = self._idle()
+            if len(idle) < self.max_idle_per_thread:
+                idle.append(conn)
+                return
+        except sqlite3.Error as e:
+            logger.warning(f"Dropping pooled SQLite connection: {e}")
+        conn.really_close()
+        with self._stats_lock:
+            self._stats["closed"] += 1
+
+    @contextmanager
+    def write(self) -> Iterator[PooledConnection]:
+        """
+        One transaction for a multi-statement write: BEGIN IMMEDIATE, commit on success.
+        BEGIN IMMEDIATE may wait up to busy_timeout, so call this off the event loop.
+        """
+        conn = self.acquire()
+        try:
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                with self._stats_lock:
+                    self._stats["write_busy_errors"] += 1
+                raise
+            waited_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._stats["writes"] += 1
+                self._stats["write_wait_ms_total"] += waited_ms
+                self._stats["write_wait_ms_max"] = max(self._stats["write_wait_ms_max"], waited_ms)
+            yield conn
+            conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def close_thread_connections(self) -> int:
+        """Really close the calling thread's idle connections (shutdown)."""
+        idle = self._idle()
+        closed = len(idle)
+        while idle:
+            idle.pop().really_close()
+        with self._stats_lock:
+            self._stats["closed"] += closed
+        return closed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        open_ms_total = stats.pop("open_ms_total")
+        stats["open_ms_avg"] = round(open_ms_total / stats["opened"], 3) if stats["opened"] else None
+        write_wait_ms_total = stats.pop("write_wait_ms_total")
+        stats["write_wait_ms_avg"] = round(write_wait_ms_total / stats["writes"], 3) if stats["writes"] else None
+        stats["write_wait_ms_max"] = round(stats["write_wait_ms_max"], 3)
+        stats["journal_mode"] = self._journal_mode
+        stats["busy_timeout_ms"] = self.busy_timeout_ms
+        stats["max_idle_per_thread"] = self.max_idle_per_thread
+        return stats
@@ -0,0 +1,84 @@
+"""
+Query embedding cache: bounded LRU with TTL keyed by (provider, model, normalized text).
+Trend lookups repeat the same few queries constantly, so hits skip the embedding server.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+CacheKey = Tuple[str, str, str]
+
+
+def normalize_embedding_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", (text or "").strip()).lower()
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[float]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(provider: str, model: str, text: str) -> CacheKey:
+        return (provider, model, normalize_embedding_text(text))
+
+    def get(self, key: CacheKey) -> Optional[List[float]]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return cached[1]
+            if cached:
+                self._entries.pop(key, None)
+            self._misses += 1
+            return None
+
+    def set(self, key: CacheKey, vector: List[float]) -> None:
+        if not vector or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+_EMBEDDING_CACHE = EmbeddingCache(EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return _EMBEDDING_CACHE
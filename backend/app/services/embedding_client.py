@@ -0,0 +1,179 @@
+"""
+Embedding client for the autopost trend index.
+
+Large inputs are split into chunks of EMBEDDING_BATCH_SIZE and sent over one
+pooled httpx.AsyncClient with at most EMBEDDING_MAX_CONCURRENCY requests in
+flight. Ollama uses the batch /api/embed endpoint; servers that predate it
+(404) fall back to one /api/embeddings call per text, still bounded. Single
+query embeddings go through a shared keep-alive sync client.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_SIZE = max(1, int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+EMBEDDING_MAX_CONCURRENCY = max(1, int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4")))
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "60"))
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _run_sync(coro: Awaitable[List[List[float]]]) -> List[List[float]]:
+    """Run a coroutine from sync code, also when called on an event loop thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        provider: str,
+        base_url: str,
+        model: str,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        timeout: float = EMBEDDING_TIMEOUT_SECONDS
+    ) -> None:
+        self.provider = provider
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # None = not probed yet; False once the server answers 404 on /api/embed.
+        self._ollama_batch: Optional[bool] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_client_lock = threading.Lock()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency
+        )
+
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._sync_client_lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(limits=self._limits(), timeout=self.timeout)
+        return self._sync_client
+
+    def _ollama_batch_request(self, texts: List[str]) -> Dict[str, Any]:
+        return {"url": f"{self.base_url}/api/embed", "json": {"model": self.model, "input": texts}}
+
+    def _ollama_single_request(self, text: str) -> Dict[str, Any]:
+        return {"url": f"{self.base_url}/api/embeddings", "json": {"model": self.model, "prompt": text}}
+
+    def _openai_request(self, texts: List[str]) -> Dict[str, Any]:
+        return {"url": f"{self.base_url}/v1/embeddings", "json": {"model": self.model, "input": texts}}
+
+    @staticmethod
+    def _parse_openai(data: Dict[str, Any], expected: int) -> List[List[float]]:
+        items = sorted(data.get("data", []), key=lambda d: d.get("index", 0))
+        vectors = [d.get("embedding", []) for d in items]
+        if len(vectors) != expected:
+            raise ValueError(f"Embedding server returned {len(vectors)} vectors for {expected} inputs")
+        return vectors
+
+    @staticmethod
+    def _parse_ollama_batch(data: Dict[str, Any], expected: int) -> List[List[float]]:
+        vectors = data.get("embeddings") or []
+        if len(vectors) != expected:
+            raise ValueError(f"Embedding server returned {len(vectors)} vectors for {expected} inputs")
+        return vectors
+
+    async def _post(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, request: Dict[str, Any]) -> httpx.Response:
+        async with semaphore:
+            return await client.post(request["url"], json=request["json"])
+
+    async def _ollama_fan_out(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, texts: List[str]) -> List[List[float]]:
+        async def one(text: str) -> List[float]:
+            response = await self._post(client, semaphore, self._ollama_single_request(text))
+            response.raise_for_status()
+            return response.json().get("embedding", [])
+
+        return list(await asyncio.gather(*(one(text) for text in texts)))
+
+    async def _ollama_chunk(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, texts: List[str]) -> List[List[float]]:
+        if self._ollama_batch is not False:
+            response = await self._post(client, semaphore, self._ollama_batch_request(texts))
+            if response.status_code == 404:
+                if self._ollama_batch is None:
+                    logger.info("Ollama /api/embed not available; falling back to per-text /api/embeddings")
+                self._ollama_batch = False
+            else:
+                response.raise_for_status()
+                self._ollama_batch = True
+                return self._parse_ollama_batch(response.json(), len(texts))
+        return await self._ollama_fan_out(client, semaphore, texts)
+
+    async def _openai_chunk(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, texts: List[str]) -> List[List[float]]:
+        response = await self._post(client, semaphore, self._openai_request(texts))
+        response.raise_for_status()
+        return self._parse_openai(response.json(), len(texts))
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts; result order matches `texts`. Raises on HTTP errors."""
+        if not texts:
+            return []
+        if self.provider == "ollama":
+            embed_chunk = self._ollama_chunk
+        elif self.provider == "openai_compat":
+            embed_chunk = self._openai_chunk
+        else:
+            return []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with httpx.AsyncClient(limits=self._limits(), timeout=self.timeout) as client:
+            chunks = _chunks(texts, self.batch_size)
+            if self.provider == "ollama" and self._ollama_batch is None and len(chunks) > 1:
+                # Probe batch support on the first chunk so the rest don't all hit a 404.
+                first = await embed_chunk(client, semaphore, chunks[0])
+                rest = await asyncio.gather(*(embed_chunk(client, semaphore, chunk) for chunk in chunks[1:]))
+                results = [first, *rest]
+            else:
+                results = await asyncio.gather(*(embed_chunk(client, semaphore, chunk) for chunk in chunks))
+        return [vector for chunk_vectors in results for vector in chunk_vectors]
+
+    def _embed_one(self, text: str) -> List[float]:
+        client = self._get_sync_client()
+        if self.provider == "openai_compat":
+            response = client.post(**self._openai_request([text]))
+            response.raise_for_status()
+            return self._parse_openai(response.json(), 1)[0]
+        if self._ollama_batch is not False:
+            response = client.post(**self._ollama_batch_request([text]))
+            if response.status_code != 404:
+                response.raise_for_status()
+                self._ollama_batch = True
+                return self._parse_ollama_batch(response.json(), 1)[0]
+            self._ollama_batch = False
+        response = client.post(**self._ollama_single_request(text))
+        response.raise_for_status()
+        return response.json().get("embedding", [])
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Sync entry point: one text reuses the keep-alive client, more go through aembed."""
+        if not texts or self.provider not in ("ollama", "openai_compat"):
+            return []
+        if len(texts) == 1:
+            return [self._embed_one(texts[0])]
+        return _run_sync(self.aembed(texts))
+
+    def close(self) -> None:
+        client, self._sync_client = self._sync_client, None
+        if client is not None:
+            client.close()
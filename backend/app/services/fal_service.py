@@ -6,6 +6,7 @@ import httpx
 import logging
 import asyncio
 import json
+import random
 from typing import List, Dict, Any, Optional, Tuple
 from io import BytesIO
 
@@ -13,6 +14,30 @@ logger = logging.getLogger(__name__)
 
 FAL_KEY = os.getenv('FAL_KEY')
 FAL_API_BASE = "https://fal.run"
+# Max Fal.ai generation requests in flight per process (shared by all callers)
+FAL_MAX_CONCURRENCY = max(1, int(os.getenv("FAL_MAX_CONCURRENCY", "4")))
+
+# Queue API (submit -> status -> result) instead of holding one long sync HTTP call per job
+FAL_QUEUE_BASE = "https://queue.fal.run"
+FAL_USE_QUEUE = os.getenv("FAL_USE_QUEUE", "true").lower() in {"1", "true", "yes", "on"}
+FAL_QUEUE_POLL_INITIAL_SECONDS = float(os.getenv("FAL_QUEUE_POLL_INITIAL_SECONDS", "1.0"))
+FAL_QUEUE_POLL_MAX_SECONDS = float(os.getenv("FAL_QUEUE_POLL_MAX_SECONDS", "10.0"))
+FAL_QUEUE_REQUEST_TIMEOUT = 30.0
+FAL_IMAGE_DEADLINE_SECONDS = float(os.getenv("FAL_IMAGE_DEADLINE_SECONDS", "180"))
+FAL_VIDEO_DEADLINE_SECONDS = float(os.getenv("FAL_VIDEO_DEADLINE_SECONDS", "600"))
+
+_FAL_SEMAPHORE: Optional[asyncio.Semaphore] = None
+_FAL_SEMAPHORE_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_fal_semaphore() -> asyncio.Semaphore:
+    """Semaphores are bound to a loop; recreate when the running loop changes."""
+    global _FAL_SEMAPHORE, _FAL_SEMAPHORE_LOOP
+    loop = asyncio.get_running_loop()
+    if _FAL_SEMAPHORE is None or _FAL_SEMAPHORE_LOOP is not loop:
+        _FAL_SEMAPHORE = asyncio.Semaphore(FAL_MAX_CONCURRENCY)
+        _FAL_SEMAPHORE_LOOP = loop
+    return _FAL_SEMAPHORE
 
 # LOCKED CONFIGURATION: Model dan parameter untuk image-to-image generation
 # Model: fal-ai/flux-2/lora/edit - Image editing (FLUX.2 [dev] from Black Forest Labs)
@@ -274,6 +299,99 @@ if not FAL_KEY:
     logger.warning("FAL_KEY not found in environment variables")
 
 
+def _fal_headers(json_body: bool = False) -> Dict[str, str]:
+    headers = {"Authorization": f"Key {FAL_KEY}"}
+    if json_body:
+        headers["Content-Type"] = "application/json"
+    return headers
+
+
+def _next_poll_delay(delay: float) -> float:
+    """Exponential backoff with full jitter between the initial and max poll interval."""
+    upper = min(FAL_QUEUE_POLL_MAX_SECONDS, delay * 2)
+    return random.uniform(FAL_QUEUE_POLL_INITIAL_SECONDS, max(FAL_QUEUE_POLL_INITIAL_SECONDS, upper))
+
+
+async def _fal_request(
+    client: httpx.AsyncClient,
+    model_endpoint: str,
+    payload: Dict[str, Any],
+    deadline_seconds: float
+) -> httpx.Response:
+    """
+    Run one Fal.ai job and return the HTTP response carrying the model output.
+
+    With FAL_USE_QUEUE the job is submitted to the queue API and its status is
+    polled with jittered exponential backoff until COMPLETED or the deadline;
+    otherwise it falls back to the synchronous fal.run endpoint. Submit errors
+    (401/403/4xx) are returned as-is so callers keep their status handling;
+    a failed job raises RuntimeError and a missed deadline TimeoutError.
+    """
+    if not FAL_USE_QUEUE:
+        return await client.post(
+            f"{FAL_API_BASE}/{model_endpoint}",
+            headers=_fal_headers(json_body=True),
+            json=payload,
+            timeout=deadline_seconds
+        )
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_seconds
+    submit_response = await client.post(
+        f"{FAL_QUEUE_BASE}/{model_endpoint}",
+        headers=_fal_headers(json_body=True),
+        json=payload,
+        timeout=FAL_QUEUE_REQUEST_TIMEOUT
+    )
+    if submit_response.status_code >= 400:
+        return submit_response
+    submit_result = submit_response.json()
+    request_id = submit_result.get("request_id")
+    if not request_id:
+        # Not a queue acknowledgement; treat the body as the result.
+        return submit_response
+    # Prefer the URLs fal returns: nested model paths share the app-level queue path.
+    status_url = submit_result.get("status_url") or f"{FAL_QUEUE_BASE}/{model_endpoint}/requests/{request_id}/status"
+    response_url = submit_result.get("response_url") or f"{FAL_QUEUE_BASE}/{model_endpoint}/requests/{request_id}"
+    cancel_url = submit_result.get("cancel_url")
+    logger.info(f"Fal.ai job queued: {model_endpoint} request_id={request_id}")
+
+    async def cancel_job() -> None:
+        if not cancel_url:
+            return
+        try:
+            await client.put(cancel_url, headers=_fal_headers(), timeout=FAL_QUEUE_REQUEST_TIMEOUT)
+        except Exception as cancel_error:
+            logger.warning(f"Failed to cancel Fal.ai job {request_id}: {cancel_error}")
+
+    delay = FAL_QUEUE_POLL_INITIAL_SECONDS
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                await cancel_job()
+                raise TimeoutError(f"Fal.ai job {request_id} timed out after {int(deadline_seconds)}s")
+            await asyncio.sleep(min(delay, remaining))
+            delay = _next_poll_delay(delay)
+
+            status_response = await client.get(status_url, headers=_fal_headers(), timeout=FAL_QUEUE_REQUEST_TIMEOUT)
+            if status_response.status_code >= 500:
+                logger.warning(f"Fal.ai status check {status_response.status_code} for {request_id}, retrying")
+                continue
+            status_response.raise_for_status()
+            status = (status_response.json() or {}).get("status")
+            if status == "COMPLETED":
+                break
+            if status in ("FAILED", "ERROR", "CANCELLED"):
+                raise RuntimeError(f"Fal.ai job {request_id} failed: {status_response.text[:300]}")
+    except asyncio.CancelledError:
+        # The caller gave up on this job (e.g. a sibling failed): stop it server-side too.
+        await cancel_job()
+        raise
+
+    return await client.get(response_url, headers=_fal_headers(), timeout=FAL_QUEUE_REQUEST_TIMEOUT)
+
+
 # Removed upload_image_to_fal_storage - images now uploaded to Supabase Storage instead
 
 
@@ -334,11 +452,11 @@ async def generate_images(
     
     try:
         async with httpx.AsyncClient(timeout=180.0) as client:
-            images = []
             error_summaries: List[str] = []
             
-            # Generate multiple images (one request per image)
-            for i in range(num_images):
+            async def _generate_one(i: int) -> List[str]:
+                """One Fal.ai request for image index `i`; returns the URLs it produced."""
+                images: List[str] = []
                 try:
                     # Dynamic configuration for second image (i == 1) to make it more realistic
                     # First image (i == 0) uses default configuration
@@ -451,14 +569,7 @@ async def generate_images(
                     logger.info(f"   {json.dumps(payload_for_log, indent=2)}")
                     logger.debug(f"   Full request payload (detailed): {json.dumps(request_payload, indent=2)}")
                     
-                    response = await client.post(
-                        f"{FAL_API_BASE}/{model_endpoint}",
-                        headers={
-                            "Authorization": f"Key {FAL_KEY}",
-                            "Content-Type": "application/json"
-                        },
-                        json=request_payload
-                    )
+                    response = await _fal_request(client, model_endpoint, request_payload, FAL_IMAGE_DEADLINE_SECONDS)
                     # Check response status before processing
                     if response.status_code == 403:
                         error_detail = response.text if hasattr(response, 'text') else response.content.decode('utf-8', errors='ignore')
@@ -534,74 +645,8 @@ async def generate_images(
                             # If we have enough images, break from inner loop
                             if len(images) >= num_images:
                                 break
-                        
-                        # If we have enough images, break from outer loop
-                        if len(images) >= num_images:
-                            break
-                    
-                    # If still no URLs extracted, check for async job
-                    if not extracted_urls and ("request_id" in result or "job_id" in result):
-                        # Handle async job (polling)
-                        request_id = result.get("request_id") or result.get("job_id")
-                        max_polls = 30
-                        
-                        for poll_count in range(max_polls):
-                            await asyncio.sleep(2)
-                            poll_response = await client.get(
-                                f"{FAL_API_BASE}/{model_endpoint}/requests/{request_id}",
-                                headers={"Authorization": f"Key {FAL_KEY}"}
-                            )
-                            poll_result = poll_response.json()
-                            
-                            if poll_result.get("status") == "COMPLETED":
-                                # Extract all images from async result
-                                poll_urls = []
-                                if "images" in poll_result:
-                                    if isinstance(poll_result["images"], list):
-                                        for img_item in poll_result["images"]:
-                                            img_url = img_item.get("url") if isinstance(img_item, dict) else img_item
-                                            if img_url:
-                                                poll_urls.append(img_url)
-                                    elif isinstance(poll_result["images"], dict):
-                                        img_url = poll_result["images"].get("url")
-                                        if img_url:
-                                            poll_urls.append(img_url)
-                                elif "image" in poll_result:
-                                    img_url = poll_result["image"].get("url") if isinstance(poll_result["image"], dict) else poll_result["image"]
-                                    if img_url:
-                                        poll_urls.append(img_url)
-                                elif "url" in poll_result:
-                                    poll_urls.append(poll_result["url"])
-                                
-                                if poll_urls:
-                                    extracted_urls = poll_urls
-                                    logger.info(f"✅ Extracted {len(extracted_urls)} image URL(s) from async job result")
-                                    # Process extracted URLs from async job
-                                    for idx, image_url in enumerate(extracted_urls):
-                                        try:
-                                            compressed_url, metadata = await compress_and_log_image(
-                                                image_url,
-                                                width=request_payload.get("width") if "width" in request_payload else None,
-                                                height=request_payload.get("height") if "height" in request_payload else None
-                                            )
-                                            images.append(compressed_url)
-                                            logger.info(f"✅ Generated and compressed image {len(images)}/{num_images} from async job: {compressed_url[:100]}...")
-                                        except Exception as comp_error:
-                                            logger.warning(f"⚠️ Compression failed, using original URL: {str(comp_error)}")
-                                            images.append(image_url)
-                                            logger.info(f"✅ Generated image {len(images)}/{num_images} from async job (uncompressed): {image_url[:100]}...")
-                                        
-                                        if len(images) >= num_images:
-                                            break
-                                    
-                                    if len(images) >= num_images:
-                                        break
-                                break
-                            elif poll_result.get("status") == "FAILED":
-                                logger.warning(f"Fal.ai job {request_id} failed")
-                                break
                     
-                        # Fallback: try to find URL in response text if still no URLs
+                    # Fallback: try to find URL in response text if still no URLs
                     if not extracted_urls:
                         logger.warning(f"⚠️ Could not extract image URL from Fal.ai response. Full response: {json.dumps(result, indent=2)[:1000]}")
                         # Try to find any URL-like field in the response
@@ -635,7 +680,34 @@ async def generate_images(
                 except Exception as e:
                     logger.error(f"Error generating image {i+1}: {str(e)}", exc_info=True)
                     error_summaries.append(f"image {i+1}: {type(e).__name__} - {str(e)[:200]}")
-                    # Continue with next image even if one fails (but log error)
+                    # Other images still count even if this one fails (but log error)
+                return images
+            
+            async def _generate_one_limited(i: int) -> List[str]:
+                async with _get_fal_semaphore():
+                    return await _generate_one(i)
+            
+            # Generate multiple images concurrently (one request per image, capped by FAL_MAX_CONCURRENCY)
+            tasks = [asyncio.create_task(_generate_one_limited(i)) for i in range(num_images)]
+            try:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            failed = [task for task in tasks if task in done and task.exception() is not None]
+            if failed:
+                # ValueError means auth/config failure: abort the whole batch and stop paying
+                # for sibling jobs that are still queued or running.
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise failed[0].exception()
+            images: List[str] = []
+            for task in tasks:
+                images.extend(task.result())
+            images = images[:num_images]
             
             if not images:
                 error_hint = " | ".join(error_summaries[-3:]) if error_summaries else "Unknown error (no details from Fal.ai)"
@@ -653,6 +725,17 @@ async def generate_images(
         raise ValueError(f"Failed to generate images: {str(e)}")
 
 
+def _extract_video_url(result: Dict[str, Any]) -> Optional[str]:
+    if "video" in result:
+        video_data = result["video"]
+        return video_data.get("url") if isinstance(video_data, dict) else video_data
+    if "url" in result:
+        return result["url"]
+    if "video_url" in result:
+        return result["video_url"]
+    return None
+
+
 async def generate_video(prompt: str, image_url: Optional[str] = None) -> str:
     """
     Generate video using Fal.ai kling-v2/video-generation model
@@ -668,7 +751,7 @@ async def generate_video(prompt: str, image_url: Optional[str] = None) -> str:
         raise ValueError("FAL_KEY is not configured")
     
     try:
-        async with httpx.AsyncClient(timeout=300.0) as client:  # Longer timeout for video
+        async with httpx.AsyncClient(timeout=FAL_QUEUE_REQUEST_TIMEOUT) as client:
             payload = {
                 "prompt": prompt,
                 "duration": 5,  # 5 seconds video
@@ -678,70 +761,23 @@ async def generate_video(prompt: str, image_url: Optional[str] = None) -> str:
             if image_url:
                 payload["image_url"] = image_url
             
-            # Submit job
-            submit_response = await client.post(
-                f"{FAL_API_BASE}/fal-ai/kling-v2/video-generation",
-                headers={
-                    "Authorization": f"Key {FAL_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json=payload
+            # Submit job and wait for the result (queue API, backoff polling)
+            response = await _fal_request(
+                client,
+                "fal-ai/kling-v2/video-generation",
+                payload,
+                FAL_VIDEO_DEADLINE_SECONDS
             )
-            submit_response.raise_for_status()
-            submit_result = submit_response.json()
+            response.raise_for_status()
+            result = response.json()
             
-            # Check if async job or direct result
-            if "request_id" in submit_result or "job_id" in submit_result:
-                # Async job - poll for result
-                request_id = submit_result.get("request_id") or submit_result.get("job_id")
-                max_polls = 60  # Video takes longer
-                poll_count = 0
-                
-                while poll_count < max_polls:
-                    await asyncio.sleep(3)  # Wait 3 seconds between polls
-                    poll_response = await client.get(
-                        f"{FAL_API_BASE}/fal-ai/kling-v2/video-generation/requests/{request_id}",
-                        headers={"Authorization": f"Key {FAL_KEY}"}
-                    )
-                    poll_result = poll_response.json()
-                    
-                    if poll_result.get("status") == "COMPLETED":
-                        video_url = None
-                        if "video" in poll_result:
-                            video_data = poll_result["video"]
-                            video_url = video_data.get("url") if isinstance(video_data, dict) else video_data
-                        elif "url" in poll_result:
-                            video_url = poll_result["url"]
-                        elif "video_url" in poll_result:
-                            video_url = poll_result["video_url"]
-                        
-                        if video_url:
-                            logger.info(f"Generated video from Fal.ai: {video_url}")
-                            return video_url
-                    elif poll_result.get("status") == "FAILED":
-                        logger.error(f"Fal.ai video job failed: {poll_result}")
-                        raise ValueError("Video generation failed")
-                    
-                    poll_count += 1
-                
-                raise ValueError("Video generation timeout")
-            else:
-                # Direct result
-                video_url = None
-                if "video" in submit_result:
-                    video_data = submit_result["video"]
-                    video_url = video_data.get("url") if isinstance(video_data, dict) else video_data
-                elif "url" in submit_result:
-                    video_url = submit_result["url"]
-                elif "video_url" in submit_result:
-                    video_url = submit_result["video_url"]
-                
-                if not video_url:
-                    logger.error(f"No video URL found in Fal.ai response: {submit_result}")
-                    raise ValueError("No video generated from Fal.ai")
-                
-                logger.info(f"Generated video from Fal.ai: {video_url}")
-                return video_url
+            video_url = _extract_video_url(result)
+            if not video_url:
+                logger.error(f"No video URL found in Fal.ai response: {result}")
+                raise ValueError("No video generated from Fal.ai")
+            
+            logger.info(f"Generated video from Fal.ai: {video_url}")
+            return video_url
             
     except httpx.HTTPStatusError as e:
         logger.error(f"Fal.ai API error: {e.response.status_code} - {e.response.text}")
@@ -761,7 +797,7 @@ async def generate_kling_image_to_video(prompt: str, image_url: str, negative_pr
         raise ValueError("image_url is required")
 
     try:
-        async with httpx.AsyncClient(timeout=300.0) as client:
+        async with httpx.AsyncClient(timeout=FAL_QUEUE_REQUEST_TIMEOUT) as client:
             payload = {
                 "prompt": prompt,
                 "image_url": image_url,
@@ -771,54 +807,21 @@ async def generate_kling_image_to_video(prompt: str, image_url: str, negative_pr
             if negative_prompt:
                 payload["negative_prompt"] = negative_prompt
 
-            submit_response = await client.post(
-                f"{FAL_API_BASE}/fal-ai/kling-video/v2.1/standard/image-to-video",
-                headers={
-                    "Authorization": f"Key {FAL_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json=payload
+            response = await _fal_request(
+                client,
+                "fal-ai/kling-video/v2.1/standard/image-to-video",
+                payload,
+                FAL_VIDEO_DEADLINE_SECONDS
             )
-            submit_response.raise_for_status()
-            submit_result = submit_response.json()
-
-            request_id = submit_result.get("request_id") or submit_result.get("job_id")
-            if request_id:
-                max_polls = 60
-                poll_count = 0
-                while poll_count < max_polls:
-                    await asyncio.sleep(3)
-                    poll_response = await client.get(
-                        f"{FAL_API_BASE}/fal-ai/kling-video/v2.1/standard/image-to-video/requests/{request_id}",
-                        headers={"Authorization": f"Key {FAL_KEY}"}
-                    )
-                    poll_result = poll_response.json()
-                    if poll_result.get("status") == "COMPLETED":
-                        video_url = None
-                        if "video" in poll_result:
-                            video_data = poll_result["video"]
-                            video_url = video_data.get("url") if isinstance(video_data, dict) else video_data
-                        elif "url" in poll_result:
-                            video_url = poll_result["url"]
-                        elif "video_url" in poll_result:
-                            video_url = poll_result["video_url"]
-                        if video_url:
-                            logger.info(f"Generated Kling video: {video_url}")
-                            return video_url
-                    elif poll_result.get("status") == "FAILED":
-                        raise ValueError(f"Kling video generation failed: {poll_result}")
-                    poll_count += 1
-                raise ValueError("Kling video generation timed out")
-
-            if "video" in submit_result:
-                video_data = submit_result["video"]
-                video_url = video_data.get("url") if isinstance(video_data, dict) else video_data
-                if video_url:
-                    return video_url
-            if "video_url" in submit_result:
-                return submit_result["video_url"]
-
-            raise ValueError(f"Unexpected response from Kling video: {submit_result}")
+            response.raise_for_status()
+            result = response.json()
+
+            video_url = _extract_video_url(result)
+            if video_url:
+                logger.info(f"Generated Kling video: {video_url}")
+                return video_url
+
+            raise ValueError(f"Unexpected response from Kling video: {result}")
     except httpx.HTTPStatusError as e:
         error_text = e.response.text if hasattr(e.response, 'text') else str(e)
         logger.error(f"Fal.ai Kling API error: {e.response.status_code} - {error_text}")
@@ -826,4 +829,3 @@ async def generate_kling_image_to_video(prompt: str, image_url: str, negative_pr
     except Exception as e:
         logger.error(f"Error generating Kling video: {str(e)}", exc_info=True)
         raise ValueError(f"Failed to generate Kling video: {str(e)}")
-
@@ -0,0 +1,160 @@
+"""
+FFmpeg capability registry: resolve ffmpeg/ffprobe once per process and record
+version, encoders and filters so hot paths never fork `ffmpeg -version`.
+"""
+
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+# A missing FFmpeg is re-probed after this many seconds (so installing it needs no restart).
+FFMPEG_RECHECK_SECONDS = float(os.getenv("FFMPEG_RECHECK_SECONDS", "60"))
+_PROBE_TIMEOUT_SECONDS = 5
+
+# Bundled Windows build in the project folder takes precedence over the system binary.
+_LOCAL_FFMPEG = Path(__file__).resolve().parents[3] / "ffmpeg" / "ffmpeg-8.0.1-essentials_build" / "bin" / "ffmpeg.exe"
+
+
+@dataclass(frozen=True)
+class FfmpegCapabilities:
+    available: bool
+    ffmpeg_path: str
+    ffprobe_path: str
+    version: Optional[str] = None
+    encoders: FrozenSet[str] = field(default_factory=frozenset)
+    filters: FrozenSet[str] = field(default_factory=frozenset)
+    probed_at: float = 0.0
+    error: Optional[str] = None
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def has_filter(self, name: str) -> bool:
+        return name in self.filters
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "ffmpeg_path": self.ffmpeg_path,
+            "ffprobe_path": self.ffprobe_path,
+            "version": self.version,
+            "encoders": len(self.encoders),
+            "filters": len(self.filters),
+            "libx264": self.has_encoder("libx264"),
+            "zoompan": self.has_filter("zoompan"),
+            "error": self.error
+        }
+
+
+def _resolve_ffmpeg_path() -> str:
+    if _LOCAL_FFMPEG.exists():
+        return str(_LOCAL_FFMPEG)
+    return "ffmpeg"
+
+
+def _ffprobe_path_for(ffmpeg_path: str) -> str:
+    if ffmpeg_path.lower().endswith("ffmpeg.exe"):
+        return ffmpeg_path[:-9] + "ffprobe.exe"
+    if ffmpeg_path.lower().endswith("ffmpeg"):
+        return ffmpeg_path[:-6] + "ffprobe"
+    return "ffprobe"
+
+
+def _run(ffmpeg_path: str, *args: str) -> str:
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", *args],
+        capture_output=True,
+        text=True,
+        timeout=_PROBE_TIMEOUT_SECONDS
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[:200] or f"exit code {result.returncode}")
+    return result.stdout
+
+
+def _parse_codec_names(output: str) -> FrozenSet[str]:
+    # Lines look like " V....D libx264   H.264 ..." / " ... zoompan   V->V  Apply Zoom & Pan effect."
+    names = set()
+    for line in output.splitlines():
+        match = re.match(r"^\s*[A-Z.|]{3,8}\s+(\S+)\s", line)
+        if match and match.group(1) != "=":
+            names.add(match.group(1))
+    return frozenset(names)
+
+
+def probe_ffmpeg_capabilities() -> FfmpegCapabilities:
+    """Probe the FFmpeg binary (spawns processes; use get_ffmpeg_capabilities on hot paths)."""
+    ffmpeg_path = _resolve_ffmpeg_path()
+    ffprobe_path = _ffprobe_path_for(ffmpeg_path)
+    try:
+        version_output = _run(ffmpeg_path, "-version")
+    except (FileNotFoundError, subprocess.TimeoutExpired, RuntimeError, OSError) as exc:
+        return FfmpegCapabilities(
+            available=False,
+            ffmpeg_path=ffmpeg_path,
+            ffprobe_path=ffprobe_path,
+            probed_at=time.time(),
+            error=str(exc)
+        )
+    first_line = version_output.splitlines()[0] if version_output else ""
+    version_match = re.search(r"ffmpeg version (\S+)", first_line)
+    encoders: FrozenSet[str] = frozenset()
+    filters: FrozenSet[str] = frozenset()
+    try:
+        encoders = _parse_codec_names(_run(ffmpeg_path, "-encoders"))
+        filters = _parse_codec_names(_run(ffmpeg_path, "-filters"))
+    except Exception as exc:
+        logger.warning(f"FFmpeg encoder/filter listing failed: {exc}")
+    return FfmpegCapabilities(
+        available=True,
+        ffmpeg_path=ffmpeg_path,
+        ffprobe_path=ffprobe_path,
+        version=version_match.group(1) if version_match else first_line or None,
+        encoders=encoders,
+        filters=filters,
+        probed_at=time.time()
+    )
+
+
+_CAPABILITIES: Optional[FfmpegCapabilities] = None
+_CAPABILITIES_LOCK = threading.Lock()
+
+
+def refresh_ffmpeg_capabilities() -> FfmpegCapabilities:
+    """Re-probe FFmpeg and replace the process-wide registry entry."""
+    global _CAPABILITIES
+    capabilities = probe_ffmpeg_capabilities()
+    with _CAPABILITIES_LOCK:
+        _CAPABILITIES = capabilities
+    if capabilities.available:
+        logger.info(
+            f"FFmpeg {capabilities.version} at {capabilities.ffmpeg_path} "
+            f"({len(capabilities.encoders)} encoders, {len(capabilities.filters)} filters)"
+        )
+    else:
+        logger.warning(f"FFmpeg not available: {capabilities.error}")
+    return capabilities
+
+
+def get_ffmpeg_capabilities() -> FfmpegCapabilities:
+    """Cached capabilities; probes on first use and re-probes a missing FFmpeg every FFMPEG_RECHECK_SECONDS."""
+    capabilities = _CAPABILITIES
+    if capabilities is not None:
+        if capabilities.available or (time.time() - capabilities.probed_at) < FFMPEG_RECHECK_SECONDS:
+            return capabilities
+    with _CAPABILITIES_LOCK:
+        # Another thread may have probed while we waited.
+        capabilities = _CAPABILITIES
+        if capabilities is not None and (
+            capabilities.available or (time.time() - capabilities.probed_at) < FFMPEG_RECHECK_SECONDS
+        ):
+            return capabilities
+    return refresh_ffmpeg_capabilities()
@@ -13,60 +13,20 @@ import httpx
 from io import BytesIO
 import cv2
 import numpy as np
+from app.services.ffmpeg_capabilities import get_ffmpeg_capabilities
 from app.services.face_detection import detect_face, create_face_mask, get_face_region_info
 
 logger = logging.getLogger(__name__)
 
 
 def check_ffmpeg_available() -> bool:
-    """Check if FFmpeg is available"""
-    import sys
-    from pathlib import Path
-    
-    # Try local FFmpeg first (in project folder)
-    project_root = Path(__file__).resolve().parents[3]
-    local_ffmpeg = project_root / "ffmpeg" / "ffmpeg-8.0.1-essentials_build" / "bin" / "ffmpeg.exe"
-    
-    if local_ffmpeg.exists():
-        try:
-            result = subprocess.run(
-                [str(local_ffmpeg), '-version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
-    
-    # Fallback to system FFmpeg
-    try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+    """Check if FFmpeg is available (cached capability registry, no subprocess)"""
+    return get_ffmpeg_capabilities().available
 
 
 def get_ffmpeg_path() -> str:
     """Get the path to FFmpeg executable"""
-    import sys
-    from pathlib import Path
-    
-    # Try local FFmpeg first (in project folder)
-    project_root = Path(__file__).resolve().parents[3]
-    local_ffmpeg = project_root / "ffmpeg" / "ffmpeg-8.0.1-essentials_build" / "bin" / "ffmpeg.exe"
-    
-    if local_ffmpeg.exists():
-        return str(local_ffmpeg)
-    
-    # Fallback to system FFmpeg
-    return 'ffmpeg'
+    return get_ffmpeg_capabilities().ffmpeg_path
 
 
 def download_image_from_url(image_url: str) -> BytesIO:
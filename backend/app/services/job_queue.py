@@ -0,0 +1,402 @@
+"""
+Durable generation job queue backed by the app's SQLite database.
+
+Requests enqueue a job and return immediately; worker coroutines claim jobs
+atomically (so several processes can share one database), run the handler
+registered for the job kind and persist the result. State changes are pushed
+through a notify callback (the /ws/autopost broadcaster in main.py).
+
+A claimed job carries the claiming process's worker_id and a lease that is
+renewed while the handler runs. Only jobs whose lease has run out (their
+process died or was stopped) are recovered, so a second worker or a rolling
+restart never touches another live process's jobs.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = max(0, int(os.getenv("JOB_WORKERS", "2")))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+# Generation jobs charge coins; by default an interrupted job is failed, not re-run.
+JOB_MAX_ATTEMPTS = max(1, int(os.getenv("JOB_MAX_ATTEMPTS", "1")))
+# A RUNNING job whose lease is older than this is treated as interrupted; renewed every third of it.
+JOB_LEASE_SECONDS = max(5.0, float(os.getenv("JOB_LEASE_SECONDS", "60")))
+
+JOB_STATUS_QUEUED = "QUEUED"
+JOB_STATUS_RUNNING = "RUNNING"
+JOB_STATUS_SUCCEEDED = "SUCCEEDED"
+JOB_STATUS_FAILED = "FAILED"
+
+ProgressReporter = Callable[[float, Optional[str]], Awaitable[None]]
+JobHandler = Callable[[Dict[str, Any], ProgressReporter], Awaitable[Any]]
+JobNotifier = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+
+class JobFailed(Exception):
+    """Raised by handlers to fail a job with an HTTP-style status code."""
+
+    def __init__(self, status_code: int, detail: Any) -> None:
+        super().__init__(str(detail))
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _lease_until(seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=seconds)).isoformat()
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db_path: str,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ) -> None:
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_recovery = 0.0
+        self._handlers: Dict[str, JobHandler] = {}
+        self._notify: Optional[JobNotifier] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_schema(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS generation_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    user_context TEXT,
+                    result TEXT,
+                    error TEXT,
+                    error_status INTEGER,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_until TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(generation_jobs)")}
+            for column in ("worker_id", "lease_until"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE generation_jobs ADD COLUMN {column} TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_jobs_status_created ON generation_jobs (status, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_jobs_user_created ON generation_jobs (user_id, created_at)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers.keys())
+
+    def set_notifier(self, notify: JobNotifier) -> None:
+        self._notify = notify
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in ("payload", "user_context", "result"):
+            if job.get(key):
+                job[key] = json.loads(job[key])
+        return job
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job fields safe to return to the owner (no payload/user context)."""
+        return {
+            "id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "progress": job.get("progress") or 0,
+            "message": job.get("message"),
+            "error": job.get("error"),
+            "created_at": job.get("created_at"),
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at")
+        }
+
+    def enqueue(self, user_id: str, kind: str, payload: Dict[str, Any], user_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = _now_iso()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                INSERT INTO generation_jobs (id, user_id, kind, status, payload, user_context, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, user_id, kind, JOB_STATUS_QUEUED, json.dumps(payload), json.dumps(user_context or {}), now, now)
+            )
+            conn.commit()
+            row = conn.execute("SELECT * FROM generation_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self._row_to_job(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM generation_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def list_for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM generation_jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_job(row) for row in rows]
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest QUEUED job to RUNNING under this worker's lease (safe across processes)."""
+        now = _now_iso()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                """
+                UPDATE generation_jobs
+                SET status = ?, started_at = ?, updated_at = ?, attempts = attempts + 1,
+                    worker_id = ?, lease_until = ?
+                WHERE id = (
+                    SELECT id FROM generation_jobs WHERE status = ? ORDER BY created_at LIMIT 1
+                ) AND status = ?
+                RETURNING *
+                """,
+                (
+                    JOB_STATUS_RUNNING,
+                    now,
+                    now,
+                    self.worker_id,
+                    _lease_until(self.lease_seconds),
+                    JOB_STATUS_QUEUED,
+                    JOB_STATUS_QUEUED
+                )
+            ).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def _update(self, job_id: str, **fields: Any) -> bool:
+        """Update a job this worker still owns; False if the lease was lost to recovery."""
+        fields["updated_at"] = _now_iso()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                f"UPDATE generation_jobs SET {assignments} WHERE id = ? AND worker_id = ? AND status = ?",
+                (*fields.values(), job_id, self.worker_id, JOB_STATUS_RUNNING)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if not updated:
+            logger.warning(f"Job {job_id} is no longer owned by {self.worker_id}; update skipped")
+        return bool(updated)
+
+    def recover_interrupted(self) -> int:
+        """Requeue (or fail, once out of attempts) RUNNING jobs whose owner's lease has expired."""
+        now = _now_iso()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        conn = self._connect()
+        try:
+            requeued = conn.execute(
+                f"""
+                UPDATE generation_jobs SET status = ?, worker_id = NULL, lease_until = NULL, updated_at = ?
+                WHERE {expired} AND attempts < ?
+                """,
+                (JOB_STATUS_QUEUED, now, JOB_STATUS_RUNNING, now, JOB_MAX_ATTEMPTS)
+            ).rowcount
+            failed = conn.execute(
+                f"""
+                UPDATE generation_jobs
+                SET status = ?, error = ?, error_status = ?, finished_at = ?, lease_until = NULL, updated_at = ?
+                WHERE {expired}
+                """,
+                (JOB_STATUS_FAILED, "Job interrupted by server restart", 500, now, now, JOB_STATUS_RUNNING, now)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if requeued or failed:
+            logger.warning(f"Recovered interrupted jobs: requeued={requeued} failed={failed}")
+        return requeued + failed
+
+    async def _emit(self, job: Dict[str, Any], **changes: Any) -> None:
+        if not self._notify:
+            return
+        view = self.public_view({**job, **changes})
+        try:
+            await self._notify(job["user_id"], "job.updated", view)
+        except Exception as exc:
+            logger.warning(f"Job notify failed for {job['id']}: {exc}")
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        handler = self._handlers.get(job["kind"])
+        await self._emit(job, status=JOB_STATUS_RUNNING)
+
+        async def report(progress: float, message: Optional[str] = None) -> None:
+            progress = max(0.0, min(1.0, float(progress)))
+            await asyncio.to_thread(self._update, job["id"], progress=progress, message=message)
+            await self._emit(job, status=JOB_STATUS_RUNNING, progress=progress, message=message)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            if handler is None:
+                raise JobFailed(400, f"Unknown job kind: {job['kind']}")
+            result = await handler(job, report)
+        except asyncio.CancelledError:
+            # Shutdown: leave it RUNNING; recover_interrupted takes it once the lease runs out.
+            raise
+        except JobFailed as exc:
+            await self._finish_failed(job, exc.status_code, exc.detail)
+        except Exception as exc:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {exc}", exc_info=True)
+            await self._finish_failed(job, 500, str(exc))
+        else:
+            finished_at = _now_iso()
+            await asyncio.to_thread(
+                self._update,
+                job["id"],
+                status=JOB_STATUS_SUCCEEDED,
+                result=json.dumps(result),
+                progress=1.0,
+                finished_at=finished_at
+            )
+            await self._emit(job, status=JOB_STATUS_SUCCEEDED, progress=1.0, finished_at=finished_at)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew the job's lease while its handler runs."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                owned = await asyncio.to_thread(self._update, job_id, lease_until=_lease_until(self.lease_seconds))
+            except Exception as exc:
+                logger.warning(f"Job {job_id} lease renewal failed: {exc}")
+                continue
+            if not owned:
+                return
+
+    async def _finish_failed(self, job: Dict[str, Any], status_code: int, detail: Any) -> None:
+        error = detail if isinstance(detail, str) else json.dumps(detail)
+        finished_at = _now_iso()
+        await asyncio.to_thread(
+            self._update,
+            job["id"],
+            status=JOB_STATUS_FAILED,
+            error=error,
+            error_status=status_code,
+            finished_at=finished_at
+        )
+        await self._emit(job, status=JOB_STATUS_FAILED, error=error, finished_at=finished_at)
+
+    async def _worker(self, index: int) -> None:
+        assert self._wakeup is not None
+        while True:
+            # Clear before claiming so an enqueue that races the claim still wakes us.
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception as exc:
+                logger.error(f"Job worker {index} failed to claim: {exc}", exc_info=True)
+                job = None
+            if job is None:
+                if index == 0:
+                    await self._maybe_recover()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            logger.info(f"Job worker {index} running {job['kind']} job {job['id']}")
+            await self._run_job(job)
+
+    async def _maybe_recover(self) -> None:
+        """Pick up jobs of processes that died while this one keeps running."""
+        loop = asyncio.get_running_loop()
+        if loop.time() - self._last_recovery < self.lease_seconds:
+            return
+        self._last_recovery = loop.time()
+        try:
+            await asyncio.to_thread(self.recover_interrupted)
+        except Exception as exc:
+            logger.error(f"Job recovery failed: {exc}", exc_info=True)
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self.recover_interrupted()
+        self._last_recovery = asyncio.get_running_loop().time()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} worker(s)")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS total FROM generation_jobs GROUP BY status"
+            ).fetchall()
+        finally:
+            conn.close()
+        stats: Dict[str, Any] = {row["status"].lower(): row["total"] for row in rows}
+        stats["workers"] = len(self._tasks)
+        return stats
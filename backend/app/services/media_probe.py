@@ -0,0 +1,169 @@
+"""
+Single-pass media probe for autopost scene signals.
+
+One ffmpeg process per video reports the input streams (audio presence),
+streams mono 16 kHz PCM over stdout straight into the webrtcvad frame loop
+and, when asked, writes the downscaled scene sample clip in the same pass.
+"""
+
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_FRAME_BYTES = VAD_SAMPLE_RATE * 2 * VAD_FRAME_MS // 1000
+VOICE_SPEECH_RATIO = 0.2
+
+_INPUT_STREAM = re.compile(r"Stream #0:\d+\S*: (Audio|Video):")
+
+
+@dataclass
+class MediaProbe:
+    audio_present: Optional[bool] = None
+    voice_present: Optional[bool] = None
+    sample_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _load_vad(mode: int):
+    try:
+        import webrtcvad  # type: ignore
+    except Exception:
+        return None
+    return webrtcvad.Vad(mode)
+
+
+def _input_stream_types(stderr: str) -> Optional[set]:
+    """Stream types of input #0 from ffmpeg's banner, or None if ffmpeg could not open the file."""
+    if "Input #0" not in stderr:
+        return None
+    section = stderr.split("Input #0", 1)[1]
+    for marker in ("Stream mapping:", "Output #"):
+        section = section.split(marker, 1)[0]
+    return {match.group(1).lower() for match in _INPUT_STREAM.finditer(section)}
+
+
+def _last_line(stderr: str) -> str:
+    lines = stderr.strip().splitlines()
+    return lines[-1][:200] if lines else "ffmpeg failed"
+
+
+class _Run:
+    def __init__(self) -> None:
+        self.returncode: Optional[int] = None
+        self.stderr = ""
+        self.total_frames = 0
+        self.speech_frames = 0
+        self.timed_out = False
+
+
+def _run_ffmpeg(cmd: List[str], vad, timeout: float) -> _Run:
+    run = _Run()
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_chunks: List[bytes] = []
+    # Drain stderr concurrently so a chatty ffmpeg never blocks on a full pipe.
+    drain = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    drain.start()
+
+    def _kill() -> None:
+        run.timed_out = True
+        process.kill()
+
+    timer = threading.Timer(timeout, _kill)
+    timer.start()
+    try:
+        while True:
+            frame = process.stdout.read(VAD_FRAME_BYTES)
+            if len(frame) < VAD_FRAME_BYTES:
+                break
+            if vad is not None:
+                run.total_frames += 1
+                if vad.is_speech(frame, VAD_SAMPLE_RATE):
+                    run.speech_frames += 1
+        run.returncode = process.wait()
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drain.join(timeout=1)
+    run.stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+    return run
+
+
+def probe_media(
+    file_path: str,
+    ffmpeg_path: str,
+    voice_seconds: float,
+    vad_mode: int,
+    sample_filter: Optional[str] = None,
+    sample_seconds: float = 0.0,
+    timeout: float = 20.0
+) -> MediaProbe:
+    """
+    Audio/voice presence and (when sample_filter is given) a sample clip path the caller must delete.
+    Fields stay None when a signal could not be determined.
+    """
+    vad = _load_vad(vad_mode)
+    sample_path: Optional[str] = None
+    if sample_filter:
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        tmp.close()
+        sample_path = tmp.name
+    want_sample = sample_path is not None
+    want_audio = vad is not None
+    result = MediaProbe()
+    try:
+        for _ in range(2):
+            cmd = [ffmpeg_path, "-hide_banner", "-nostats", "-y", "-i", file_path]
+            if want_sample:
+                cmd += ["-map", "0:v:0?", "-t", str(sample_seconds), "-vf", sample_filter, "-an", sample_path]
+            if want_audio:
+                cmd += [
+                    "-map", "0:a:0?", "-t", str(voice_seconds),
+                    "-ac", "1", "-ar", str(VAD_SAMPLE_RATE), "-f", "s16le", "pipe:1"
+                ]
+            run = _run_ffmpeg(cmd, vad if want_audio else None, timeout)
+            stream_types = _input_stream_types(run.stderr)
+            if run.timed_out:
+                result.error = "timeout"
+            if stream_types is None:
+                result.error = result.error or _last_line(run.stderr)
+                break
+            result.audio_present = "audio" in stream_types
+            # Without outputs ffmpeg exits non-zero after printing the streams, which is all we needed.
+            if run.timed_out or run.returncode == 0 or not (want_sample or want_audio):
+                break
+            # An optional map that matched nothing makes ffmpeg reject that output; retry without it.
+            retry_sample = want_sample and "video" in stream_types
+            retry_audio = want_audio and result.audio_present
+            if (retry_sample, retry_audio) == (want_sample, want_audio) or not (retry_sample or retry_audio):
+                result.error = _last_line(run.stderr)
+                break
+            want_sample, want_audio = retry_sample, retry_audio
+
+        if result.audio_present is False:
+            result.voice_present = False
+        elif result.audio_present and want_audio and run.total_frames:
+            result.voice_present = (run.speech_frames / run.total_frames) >= VOICE_SPEECH_RATIO
+    except Exception as exc:
+        logger.warning(f"Media probe failed for {file_path}: {exc}")
+        result.error = str(exc)
+
+    if sample_path:
+        if want_sample and result.error is None and os.path.exists(sample_path) and os.path.getsize(sample_path) > 0:
+            result.sample_path = sample_path
+        else:
+            try:
+                os.remove(sample_path)
+            except OSError:
+                pass
+    return result
@@ -0,0 +1,181 @@
+"""
+Qdrant sync for the autopost trend collection.
+
+Point IDs are derived from the trend content hash, so re-uploading or
+reordering the CSV rewrites nothing. A sync scrolls the existing points,
+upserts only new or changed ones in batches and deletes points whose rows
+left the CSV. All calls share one pooled httpx.Client.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+QDRANT_UPSERT_BATCH_SIZE = max(1, int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256")))
+QDRANT_SCROLL_PAGE_SIZE = max(1, int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", "1000")))
+# wait=true makes each batch durable/searchable before the next one is sent.
+QDRANT_UPSERT_WAIT = os.getenv("QDRANT_UPSERT_WAIT", "true").lower() in {"1", "true", "yes", "on"}
+QDRANT_TIMEOUT_SECONDS = float(os.getenv("QDRANT_TIMEOUT_SECONDS", "20"))
+
+
+def qdrant_point_id(content_hash: str) -> str:
+    """Stable Qdrant point ID (UUID) for a trend content hash."""
+    return str(uuid.UUID(hex=content_hash[:32]))
+
+
+class QdrantTrendStore:
+    def __init__(self, url: str, api_key: str, collection: str) -> None:
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        self.collection = collection
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._ready_vector_size: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def _headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["api-key"] = self.api_key
+        return headers
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        headers=self._headers(),
+                        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                        timeout=QDRANT_TIMEOUT_SECONDS
+                    )
+        return self._client
+
+    def _endpoint(self, path: str = "") -> str:
+        return f"{self.url}/collections/{self.collection}{path}"
+
+    def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def ensure_collection(self, vector_size: int) -> None:
+        """Create the collection and its category payload index once per process."""
+        if self._ready_vector_size == vector_size:
+            return
+        client = self._get_client()
+        response = client.get(self._endpoint())
+        if response.status_code == 200:
+            existing = (
+                response.json().get("result", {}).get("config", {}).get("params", {}).get("vectors", {}) or {}
+            ).get("size")
+            if existing and existing != vector_size:
+                logger.warning(
+                    f"Qdrant collection {self.collection} has vector size {existing}, embeddings have {vector_size}"
+                )
+        else:
+            client.put(self._endpoint(), json={"vectors": {"size": vector_size, "distance": "Cosine"}}).raise_for_status()
+        # Keyword index keeps category-filtered search and count fast; creating it again is a no-op.
+        client.put(
+            self._endpoint("/index"),
+            params={"wait": "true"},
+            json={"field_name": "category", "field_schema": "keyword"}
+        ).raise_for_status()
+        self._ready_vector_size = vector_size
+
+    def _existing_points(self) -> Dict[Any, Dict[str, Any]]:
+        """Payload by point ID, with the ID kept as Qdrant returned it (legacy points use integers)."""
+        client = self._get_client()
+        points: Dict[Any, Dict[str, Any]] = {}
+        offset: Any = None
+        while True:
+            body: Dict[str, Any] = {"limit": QDRANT_SCROLL_PAGE_SIZE, "with_payload": True, "with_vector": False}
+            if offset is not None:
+                body["offset"] = offset
+            response = client.post(self._endpoint("/points/scroll"), json=body)
+            response.raise_for_status()
+            result = response.json().get("result", {})
+            for point in result.get("points", []):
+                points[point.get("id")] = point.get("payload") or {}
+            offset = result.get("next_page_offset")
+            if offset is None:
+                return points
+
+    def sync(
+        self,
+        content_hashes: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """Make the collection match the given points; returns upserted/deleted/unchanged counts."""
+        if not self.enabled or not vectors:
+            return {"upserted": 0, "deleted": 0, "unchanged": 0}
+        self.ensure_collection(len(vectors[0]))
+        existing = self._existing_points()
+
+        wanted: Dict[str, Dict[str, Any]] = {}
+        for content_hash, vector, payload in zip(content_hashes, vectors, payloads):
+            point_id = qdrant_point_id(content_hash)
+            wanted[point_id] = {"id": point_id, "vector": [float(x) for x in vector], "payload": payload}
+        # Same ID means same (model, hashtag, category), hence the same vector; only payload can drift.
+        changed = [point for point_id, point in wanted.items() if existing.get(point_id) != point["payload"]]
+        stale: Set[Any] = set(existing) - set(wanted)
+
+        client = self._get_client()
+        wait = "true" if QDRANT_UPSERT_WAIT else "false"
+        for start in range(0, len(changed), QDRANT_UPSERT_BATCH_SIZE):
+            client.put(
+                self._endpoint("/points"),
+                params={"wait": wait},
+                json={"points": changed[start:start + QDRANT_UPSERT_BATCH_SIZE]}
+            ).raise_for_status()
+        # Delete with the raw IDs: Qdrant rejects integer IDs sent as strings.
+        stale_ids = sorted(stale, key=str)
+        for start in range(0, len(stale_ids), QDRANT_UPSERT_BATCH_SIZE):
+            client.post(
+                self._endpoint("/points/delete"),
+                params={"wait": wait},
+                json={"points": stale_ids[start:start + QDRANT_UPSERT_BATCH_SIZE]}
+            ).raise_for_status()
+        stats = {"upserted": len(changed), "deleted": len(stale_ids), "unchanged": len(wanted) - len(changed)}
+        logger.info(f"Qdrant trends sync: {stats}")
+        return stats
+
+    @staticmethod
+    def _category_filter(category_key: str) -> Optional[Dict[str, Any]]:
+        if not category_key:
+            return None
+        return {"must": [{"key": "category", "match": {"value": category_key}}]}
+
+    def search(self, vector: Sequence[float], category_key: str, limit: int) -> List[Dict[str, Any]]:
+        """Raw scored points ([] on any non-200 answer)."""
+        response = self._get_client().post(
+            self._endpoint("/points/search"),
+            json={
+                "vector": [float(x) for x in vector],
+                "limit": limit,
+                "with_payload": True,
+                "filter": self._category_filter(category_key)
+            }
+        )
+        if response.status_code != 200:
+            return []
+        return response.json().get("result", [])
+
+    def count(self, category_key: str) -> Optional[int]:
+        response = self._get_client().post(
+            self._endpoint("/points/count"),
+            json={"filter": self._category_filter(category_key), "exact": True},
+            timeout=10.0
+        )
+        if response.status_code != 200:
+            return None
+        return response.json().get("result", {}).get("count")
@@ -0,0 +1,198 @@
+"""
+Background recheck scheduler for autopost videos waiting on a better score.
+
+A sweeper coroutine periodically claims due WAITING_RECHECK rows across all
+users, oldest next_check_at first and in batches, and re-scores them on a
+small thread pool. Claiming pushes next_check_at forward by a lease, so
+several processes sharing one database never re-score the same row twice
+and a row whose worker died is picked up again once the lease runs out.
+Request handlers therefore only read; they never re-score on the way.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RECHECK_INTERVAL_SECONDS = float(os.getenv("AUTPOST_RECHECK_INTERVAL_SECONDS", "30"))
+RECHECK_BATCH_SIZE = max(1, int(os.getenv("AUTPOST_RECHECK_BATCH_SIZE", "50")))
+RECHECK_CONCURRENCY = max(1, int(os.getenv("AUTPOST_RECHECK_CONCURRENCY", "2")))
+RECHECK_LEASE_SECONDS = float(os.getenv("AUTPOST_RECHECK_LEASE_SECONDS", "600"))
+# Set to false on extra processes that share the database but should not sweep.
+RECHECK_ENABLED = os.getenv("AUTPOST_RECHECK_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+
+# Re-scores one claimed video; returns (user_id, new status) or None if the row is gone.
+RecheckHandler = Callable[[int], Optional[Tuple[str, str]]]
+RecheckNotifier = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+
+class RecheckScheduler:
+    def __init__(
+        self,
+        db_path: str,
+        handler: RecheckHandler,
+        interval: float = RECHECK_INTERVAL_SECONDS,
+        batch_size: int = RECHECK_BATCH_SIZE,
+        concurrency: int = RECHECK_CONCURRENCY,
+        lease_seconds: float = RECHECK_LEASE_SECONDS
+    ) -> None:
+        self.db_path = db_path
+        self.handler = handler
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self._notify: Optional[RecheckNotifier] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats: Dict[str, Any] = {
+            "sweeps": 0,
+            "rechecked": 0,
+            "queued": 0,
+            "failed": 0,
+            "claim_conflicts": 0,
+            "last_sweep_at": None,
+            "last_sweep_ms": None,
+            "last_batch": 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def set_notifier(self, notify: RecheckNotifier) -> None:
+        self._notify = notify
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="autopost-recheck")
+        return self._pool
+
+    def _claim_due(self, limit: int, user_id: Optional[str] = None) -> List[int]:
+        """Claim up to `limit` due rows, oldest next_check_at first, by moving next_check_at to the lease end."""
+        now = datetime.now()
+        lease_until = (now + timedelta(seconds=self.lease_seconds)).isoformat()
+        query = (
+            "SELECT id, next_check_at FROM autopost_videos "
+            "WHERE status = 'WAITING_RECHECK' AND next_check_at IS NOT NULL AND next_check_at <= ?"
+        )
+        params: List[Any] = [now.isoformat()]
+        if user_id:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY next_check_at ASC LIMIT ?"
+        params.append(limit)
+        conn = self._connect()
+        try:
+            due = conn.execute(query, params).fetchall()
+            claimed: List[int] = []
+            for video_id, next_check_at in due:
+                cursor = conn.execute(
+                    """
+                    UPDATE autopost_videos SET next_check_at = ?
+                    WHERE id = ? AND status = 'WAITING_RECHECK' AND next_check_at = ?
+                    """,
+                    (lease_until, video_id, next_check_at)
+                )
+                if cursor.rowcount == 1:
+                    claimed.append(video_id)
+                else:
+                    self._stats["claim_conflicts"] += 1
+            conn.commit()
+            return claimed
+        finally:
+            conn.close()
+
+    async def sweep(self, user_id: Optional[str] = None) -> int:
+        """Re-score every due row (or only `user_id`'s) in batches; returns how many were re-scored."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        per_user: Dict[str, int] = {}
+        total = 0
+        while True:
+            claimed = await asyncio.to_thread(self._claim_due, self.batch_size, user_id)
+            self._stats["last_batch"] = len(claimed)
+            if not claimed:
+                break
+            pool = self._get_pool()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, self.handler, video_id) for video_id in claimed),
+                return_exceptions=True
+            )
+            for video_id, result in zip(claimed, results):
+                if isinstance(result, BaseException):
+                    self._stats["failed"] += 1
+                    logger.error(f"Autopost recheck failed for video_id={video_id}: {result}", exc_info=result)
+                    continue
+                if result is None:
+                    continue
+                owner, status = result
+                per_user[owner] = per_user.get(owner, 0) + 1
+                total += 1
+                self._stats["rechecked"] += 1
+                if status == "QUEUED":
+                    self._stats["queued"] += 1
+            if len(claimed) < self.batch_size:
+                break
+        self._stats["sweeps"] += 1
+        self._stats["last_sweep_at"] = datetime.now().isoformat()
+        self._stats["last_sweep_ms"] = int((loop.time() - start) * 1000)
+        if self._notify is not None:
+            for owner, updated in per_user.items():
+                try:
+                    await self._notify(owner, "autopost.recheck", {"updated": updated})
+                except Exception as e:
+                    logger.warning(f"Broadcast autopost recheck failed: {e}")
+        return total
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Autopost recheck sweep failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Autopost recheck scheduler started (every {self.interval}s, batch {self.batch_size}, "
+            f"concurrency {self.concurrency})"
+        )
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency
+        }
@@ -0,0 +1,111 @@
+"""
+Render executor: bounded concurrent FFmpeg jobs without blocking the event loop.
+Each render runs as an asyncio subprocess; a semaphore caps how many run at once.
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import time
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _default_concurrency() -> int:
+    # FFmpeg/libx264 already uses several threads per job; keep headroom for the API.
+    return max(1, min(3, (os.cpu_count() or 1) // 2 or 1))
+
+
+RENDER_MAX_CONCURRENCY = max(1, int(os.getenv("RENDER_MAX_CONCURRENCY", str(_default_concurrency()))))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "120"))
+
+_RENDER_SEMAPHORE: "asyncio.Semaphore | None" = None
+_RENDER_SEMAPHORE_LOOP: "asyncio.AbstractEventLoop | None" = None
+_RENDER_STATS: Dict[str, Any] = {
+    "active": 0,
+    "waiting": 0,
+    "completed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "last_duration_ms": None
+}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Semaphores are bound to a loop; recreate when the running loop changes (tests, reloads)."""
+    global _RENDER_SEMAPHORE, _RENDER_SEMAPHORE_LOOP
+    loop = asyncio.get_running_loop()
+    if _RENDER_SEMAPHORE is None or _RENDER_SEMAPHORE_LOOP is not loop:
+        _RENDER_SEMAPHORE = asyncio.Semaphore(RENDER_MAX_CONCURRENCY)
+        _RENDER_SEMAPHORE_LOOP = loop
+    return _RENDER_SEMAPHORE
+
+
+def get_render_stats() -> Dict[str, Any]:
+    """Snapshot of executor counters (for /ready and logs)."""
+    stats = dict(_RENDER_STATS)
+    stats["max_concurrency"] = RENDER_MAX_CONCURRENCY
+    return stats
+
+
+def _run_blocking(cmd: List[str], timeout: float) -> Tuple[int, str]:
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    return result.returncode, result.stderr or ""
+
+
+async def _run_subprocess(cmd: List[str], timeout: float) -> Tuple[int, str]:
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except NotImplementedError:
+        # Windows selector loops cannot spawn subprocesses; fall back to a worker thread.
+        return await asyncio.to_thread(_run_blocking, cmd, timeout)
+
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode or 0, (stderr or b"").decode("utf-8", errors="replace")
+
+
+async def run_ffmpeg(cmd: List[str], timeout: float = RENDER_TIMEOUT_SECONDS) -> str:
+    """
+    Run an FFmpeg command under the render concurrency limit.
+
+    Returns stderr on success; raises RuntimeError on a non-zero exit and
+    subprocess.TimeoutExpired when the job exceeds `timeout`.
+    """
+    semaphore = _get_semaphore()
+    _RENDER_STATS["waiting"] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _RENDER_STATS["waiting"] -= 1
+    _RENDER_STATS["active"] += 1
+    start = time.perf_counter()
+    try:
+        returncode, stderr = await _run_subprocess(cmd, timeout)
+        if returncode != 0:
+            _RENDER_STATS["failed"] += 1
+            logger.error(f"FFmpeg error: {stderr}")
+            raise RuntimeError(f"FFmpeg failed: {stderr}")
+        _RENDER_STATS["completed"] += 1
+        return stderr
+    except subprocess.TimeoutExpired:
+        _RENDER_STATS["timeouts"] += 1
+        raise
+    finally:
+        _RENDER_STATS["active"] -= 1
+        _RENDER_STATS["last_duration_ms"] = int((time.perf_counter() - start) * 1000)
+        semaphore.release()
@@ -0,0 +1,157 @@
+"""
+Scene-analysis executor: post-upload scene scoring off the event loop.
+
+The analysis is blocking work (SQLite, ffmpeg, the scene endpoint, LLM
+scoring), so it runs on a dedicated, bounded thread pool. Submissions are
+deduplicated by video id and refused once the backlog is full; a refused
+video simply keeps the score it was given at upload time. Results are
+pushed through a notify callback (the /ws/autopost broadcaster in main.py).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SCENE_ANALYSIS_WORKERS = max(1, int(os.getenv("AUTPOST_SCENE_WORKERS", "2")))
+# Videos allowed to wait for a free worker; further submissions are rejected.
+SCENE_ANALYSIS_QUEUE_MAX = max(0, int(os.getenv("AUTPOST_SCENE_QUEUE_MAX", "32")))
+
+SCENE_SUBMIT_QUEUED = "queued"
+SCENE_SUBMIT_DUPLICATE = "duplicate"
+SCENE_SUBMIT_REJECTED = "rejected"
+
+SceneHandler = Callable[[int, str, str], Optional[str]]
+SceneNotifier = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+
+class SceneAnalysisExecutor:
+    def __init__(
+        self,
+        handler: SceneHandler,
+        workers: int = SCENE_ANALYSIS_WORKERS,
+        max_queue: int = SCENE_ANALYSIS_QUEUE_MAX
+    ) -> None:
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._notify: Optional[SceneNotifier] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # video_id -> submit time, for every video queued or running.
+        self._pending: Dict[int, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, Any] = {
+            "waiting": 0,
+            "active": 0,
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "max_depth": 0,
+            "last_wait_ms": None,
+            "last_duration_ms": None,
+            "total_wait_ms": 0,
+            "total_duration_ms": 0
+        }
+
+    def set_notifier(self, notify: SceneNotifier) -> None:
+        self._notify = notify
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scene-analysis")
+            return self._pool
+
+    def submit(self, video_id: int, file_path: str, user_id: str) -> str:
+        """Schedule analysis from the event loop; returns queued, duplicate or rejected without blocking."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if video_id in self._pending:
+                self._stats["deduplicated"] += 1
+                return SCENE_SUBMIT_DUPLICATE
+            if len(self._pending) >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                logger.warning(f"Scene analysis backlog full; keeping upload score for video_id={video_id}")
+                return SCENE_SUBMIT_REJECTED
+            self._pending[video_id] = time.perf_counter()
+            self._stats["submitted"] += 1
+            self._stats["waiting"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._pending))
+        task = loop.create_task(self._run(video_id, file_path, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return SCENE_SUBMIT_QUEUED
+
+    def _work(self, video_id: int, file_path: str, user_id: str) -> Optional[str]:
+        start = time.perf_counter()
+        with self._lock:
+            wait_ms = int((start - self._pending.get(video_id, start)) * 1000)
+            self._stats["waiting"] -= 1
+            self._stats["active"] += 1
+            self._stats["last_wait_ms"] = wait_ms
+            self._stats["total_wait_ms"] += wait_ms
+        try:
+            return self.handler(video_id, file_path, user_id)
+        finally:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self._stats["active"] -= 1
+                self._stats["last_duration_ms"] = duration_ms
+                self._stats["total_duration_ms"] += duration_ms
+
+    async def _run(self, video_id: int, file_path: str, user_id: str) -> None:
+        try:
+            future = self._get_pool().submit(self._work, video_id, file_path, user_id)
+            status = await asyncio.wrap_future(future)
+            with self._lock:
+                self._stats["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            with self._lock:
+                self._stats["failed"] += 1
+            logger.error(f"Async scene analysis failed for video_id={video_id}: {exc}", exc_info=True)
+            return
+        finally:
+            with self._lock:
+                self._pending.pop(video_id, None)
+        if status and self._notify is not None:
+            try:
+                await self._notify(user_id, "autopost.updated", {"id": video_id, "status": status})
+            except Exception as exc:
+                logger.warning(f"Broadcast autopost update failed: {exc}")
+
+    async def stop(self) -> None:
+        """Drop queued analyses; ones already running finish in their threads."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        with self._lock:
+            self._pending.clear()
+            self._stats["waiting"] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            started = stats["completed"] + stats["failed"]
+            stats["depth"] = len(self._pending)
+            total_wait_ms = stats.pop("total_wait_ms")
+            total_duration_ms = stats.pop("total_duration_ms")
+            stats["avg_wait_ms"] = int(total_wait_ms / started) if started else None
+            stats["avg_duration_ms"] = int(total_duration_ms / started) if started else None
+            stats["workers"] = self.workers
+            stats["max_queue"] = self.max_queue
+            return stats
@@ -0,0 +1,227 @@
+"""
+Versioned schema migrations for premium_studio.db.
+
+Each migration runs once, inside its own transaction, and is recorded in
+schema_migrations. BEGIN IMMEDIATE serialises concurrent starters (several
+uvicorn workers on one database): the loser re-checks the version under the
+write lock and skips it. Migrations must be idempotent against databases
+created before the runner existed, which already carry some of the schema.
+"""
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _create_baseline_tables(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            title TEXT,
+            caption TEXT,
+            hook_text TEXT,
+            cta_text TEXT,
+            hashtags TEXT,
+            category TEXT,
+            title_source TEXT,
+            hook_source TEXT,
+            cta_source TEXT,
+            hashtags_source TEXT,
+            status TEXT NOT NULL,
+            score REAL,
+            score_details TEXT,
+            score_reasons TEXT,
+            threshold REAL,
+            next_check_at TEXT,
+            scheduled_at TEXT,
+            status_note TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            error TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            video_id INTEGER NOT NULL,
+            views INTEGER DEFAULT 0,
+            likes INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            shares INTEGER DEFAULT 0,
+            avg_watch_time REAL,
+            retention_curve TEXT,
+            posted_at TEXT,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_competitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            url TEXT,
+            notes TEXT,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_pattern_feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            pattern_type TEXT NOT NULL,
+            pattern_key TEXT NOT NULL,
+            weight REAL NOT NULL DEFAULT 1.0,
+            updated_at TEXT NOT NULL,
+            UNIQUE(user_id, pattern_type, pattern_key)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_pattern_feedback_global (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pattern_type TEXT NOT NULL,
+            pattern_key TEXT NOT NULL,
+            weight REAL NOT NULL DEFAULT 1.0,
+            updated_at TEXT NOT NULL,
+            UNIQUE(pattern_type, pattern_key)
+        )
+    ''')
+    # Running engagement sums per (user, dimension, key) for the scoring feedback loop
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS autopost_engagement_aggregates (
+            user_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            rate_sum REAL NOT NULL DEFAULT 0,
+            samples INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, dimension, key)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admin_audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            actor_user_id TEXT NOT NULL,
+            actor_email TEXT,
+            action TEXT NOT NULL,
+            target_user_id TEXT,
+            details TEXT,
+            created_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _add_autopost_video_columns(conn: sqlite3.Connection) -> None:
+    # Columns added after the first release; databases from that era lack them.
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(autopost_videos)")}
+    for column, column_type in (
+        ("title_source", "TEXT"),
+        ("hook_source", "TEXT"),
+        ("cta_source", "TEXT"),
+        ("hashtags_source", "TEXT"),
+        ("score_reasons", "TEXT"),
+        ("scheduled_at", "TEXT"),
+        ("status_note", "TEXT"),
+    ):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE autopost_videos ADD COLUMN {column} {column_type}")
+
+
+# Composite indexes follow the hot query shapes: equality columns first, then the ORDER BY column.
+HOT_PATH_INDEXES = (
+    # Task poll (oldest QUEUED), dashboard status filter, active-task count
+    ("idx_autopost_videos_user_status_created", "autopost_videos", "user_id, status, created_at"),
+    # Dashboard and insights listings
+    ("idx_autopost_videos_user_created", "autopost_videos", "user_id, created_at"),
+    # Background recheck sweep: due WAITING_RECHECK rows by next_check_at
+    ("idx_autopost_videos_status_next_check", "autopost_videos", "status, next_check_at"),
+    # Admin activity log
+    ("idx_autopost_videos_created", "autopost_videos", "created_at"),
+    # Insights, posting window, per-user feedback weights
+    ("idx_autopost_metrics_user_created", "autopost_metrics", "user_id, created_at"),
+    # Latest metrics row per video
+    ("idx_autopost_metrics_video_created", "autopost_metrics", "video_id, created_at"),
+    # Global feedback weights
+    ("idx_autopost_metrics_created", "autopost_metrics", "created_at"),
+    ("idx_autopost_competitors_user_created", "autopost_competitors", "user_id, created_at"),
+    ("idx_admin_audit_logs_created", "admin_audit_logs", "created_at"),
+)
+
+
+def _create_hot_path_indexes(conn: sqlite3.Connection) -> None:
+    for name, table, columns in HOT_PATH_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline_tables", _create_baseline_tables),
+    Migration(2, "autopost_videos_columns", _add_autopost_video_columns),
+    Migration(3, "hot_path_indexes", _create_hot_path_indexes),
+]
+
+
+def _ensure_migrations_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration version (0 for a database the runner has never touched)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0] or 0) if row else 0
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: Optional[Sequence[Migration]] = None) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied by this call."""
+    migrations = sorted(MIGRATIONS if migrations is None else migrations, key=lambda m: m.version)
+    _ensure_migrations_table(conn)
+    done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+    applied: List[int] = []
+    for migration in migrations:
+        if migration.version in done:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute(
+                "SELECT 1 FROM schema_migrations WHERE version = ?", (migration.version,)
+            ).fetchone():
+                conn.rollback()
+                continue
+            migration.apply(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.utcnow().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Schema migration {migration.version} ({migration.name}) failed", exc_info=True)
+            raise
+        applied.append(migration.version)
+        logger.info(f"Applied schema migration {migration.version} ({migration.name})")
+    return applied
@@ -0,0 +1,289 @@
+"""
+Autopost score cache: bounded in-process LRU with TTL, an optional SQLite
+tier (shared by every uvicorn worker using the same database, survives
+restarts) and single-flight, so concurrent identical scoring calls run the
+LLM once and the other callers wait for that result.
+"""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCORE_CACHE_MAX_ENTRIES = int(os.getenv("AUTPOST_SCORE_CACHE_MAX_ENTRIES", "5000"))
+SCORE_CACHE_SWEEP_SECONDS = float(os.getenv("AUTPOST_SCORE_CACHE_SWEEP_SECONDS", "60"))
+SCORE_CACHE_SQLITE = os.getenv("AUTPOST_SCORE_CACHE_SQLITE", "false").lower() in {"1", "true", "yes", "on"}
+
+Payload = Dict[str, Any]
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[Payload] = None
+        self.error: Optional[BaseException] = None
+
+
+class ScoreCache:
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = SCORE_CACHE_MAX_ENTRIES,
+        db_path: Optional[str] = None,
+        sweep_seconds: float = SCORE_CACHE_SWEEP_SECONDS
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.db_path = db_path
+        self.sweep_seconds = sweep_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Payload]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._last_sweep = time.time()
+        self._stats = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "single_flight_waits": 0,
+            "evictions": 0,
+            "expired": 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_schema(self) -> None:
+        if not self.db_path:
+            return
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS autopost_score_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_autopost_score_cache_expires ON autopost_score_cache (expires_at)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, expires_at: float, payload: Payload) -> None:
+        # Caller holds self._lock.
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _read_sqlite(self, key: str, now: float) -> Optional[Tuple[float, Payload]]:
+        if not self.db_path:
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT payload, expires_at FROM autopost_score_cache WHERE cache_key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Score cache read failed: {e}")
+            return None
+        if not row:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _write_sqlite(self, key: str, expires_at: float, payload: Payload) -> None:
+        if not self.db_path:
+            return
+        try:
+            encoded = json.dumps(payload, default=str)
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO autopost_score_cache (cache_key, payload, expires_at) VALUES (?, ?, ?)",
+                    (key, encoded, expires_at)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Score cache write failed: {e}")
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.sweep_seconds:
+            return
+        self._last_sweep = now
+        self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop expired entries from both tiers; returns how many memory entries went."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            self._stats["expired"] += len(expired)
+        if self.db_path:
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM autopost_score_cache WHERE expires_at <= ?", (now,))
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"Score cache sweep failed: {e}")
+        return len(expired)
+
+    def get(self, key: str) -> Optional[Payload]:
+        """Cached payload (a private copy) or None."""
+        now = time.time()
+        self._maybe_sweep(now)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return copy.deepcopy(cached[1])
+            if cached:
+                del self._entries[key]
+                self._stats["expired"] += 1
+        stored = self._read_sqlite(key, now)
+        with self._lock:
+            if stored is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["sqlite_hits"] += 1
+            self._remember(key, stored[0], stored[1])
+        return copy.deepcopy(stored[1])
+
+    def set(self, key: str, payload: Payload) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        stored = copy.deepcopy(payload)
+        with self._lock:
+            self._remember(key, expires_at, stored)
+        self._write_sqlite(key, expires_at, stored)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Payload]) -> Payload:
+        """Cached payload, or compute it once while concurrent callers for the same key wait."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._stats["single_flight_waits"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+        try:
+            result = compute()
+            self.set(key, result)
+            flight.result = copy.deepcopy(result)
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def get_or_compute_many(
+        self,
+        keys: Sequence[str],
+        compute: Callable[[List[int]], List[Payload]]
+    ) -> List[Payload]:
+        """
+        Batch get_or_compute: keys this call leads are computed together by
+        compute(positions) (positions index into `keys`, one per distinct key);
+        keys another caller is already computing are waited for, not recomputed.
+        """
+        results: List[Optional[Payload]] = [None] * len(keys)
+        positions: Dict[str, List[int]] = {}
+        for idx, key in enumerate(keys):
+            positions.setdefault(key, []).append(idx)
+
+        missing: List[str] = []
+        for key, idxs in positions.items():
+            cached = self.get(key)
+            if cached is None:
+                missing.append(key)
+                continue
+            for idx in idxs:
+                results[idx] = copy.deepcopy(cached)
+
+        led: Dict[str, _Flight] = {}
+        waiting: Dict[str, _Flight] = {}
+        with self._lock:
+            for key in missing:
+                flight = self._flights.get(key)
+                if flight is None:
+                    led[key] = self._flights[key] = _Flight()
+                else:
+                    waiting[key] = flight
+                    self._stats["single_flight_waits"] += 1
+
+        if led:
+            led_keys = list(led)
+            try:
+                computed = compute([positions[key][0] for key in led_keys])
+                for key, result in zip(led_keys, computed):
+                    self.set(key, result)
+                    led[key].result = copy.deepcopy(result)
+                    for idx in positions[key]:
+                        results[idx] = copy.deepcopy(result)
+            except BaseException as e:
+                for flight in led.values():
+                    flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in led_keys:
+                        self._flights.pop(key, None)
+                for flight in led.values():
+                    flight.done.set()
+
+        for key, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            for idx in positions[key]:
+                results[idx] = copy.deepcopy(flight.result)
+        return [result or {} for result in results]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["sqlite_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["sqlite_hits"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "in_flight": len(self._flights),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "sqlite": bool(self.db_path)
+            }
@@ -0,0 +1,237 @@
+"""
+Source image cache: download a generated image once and share the local file
+between face/product detection and every video render of a batch.
+
+Files are content-addressed (sha256 of the bytes) and indexed by URL with the
+server ETag; the index is an LRU bounded by total bytes on disk. The index is
+per process, so files left behind by earlier processes are pruned at startup
+once they have not been touched for SOURCE_IMAGE_CACHE_ORPHAN_SECONDS.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+SOURCE_IMAGE_CACHE_DIR = Path(
+    os.getenv("SOURCE_IMAGE_CACHE_DIR") or str(Path(tempfile.gettempdir()) / "pof_source_images")
+)
+SOURCE_IMAGE_CACHE_MAX_MB = float(os.getenv("SOURCE_IMAGE_CACHE_MAX_MB", "256"))
+# Generated assets are immutable, so only revalidate (If-None-Match) after this many seconds.
+SOURCE_IMAGE_CACHE_REVALIDATE_SECONDS = float(os.getenv("SOURCE_IMAGE_CACHE_REVALIDATE_SECONDS", "300"))
+# Cache hits refresh mtime, so only files no live process has used for this long are pruned.
+SOURCE_IMAGE_CACHE_ORPHAN_SECONDS = float(os.getenv("SOURCE_IMAGE_CACHE_ORPHAN_SECONDS", "86400"))
+SOURCE_IMAGE_DOWNLOAD_TIMEOUT = 30.0
+
+ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def image_extension_for_url(image_url: str) -> str:
+    """Same extension rules the video pipeline has always used for downloaded inputs."""
+    image_ext = Path(image_url.split("?", 1)[0]).suffix.lower() or ".jpg"
+    if image_ext not in ALLOWED_IMAGE_EXTENSIONS:
+        image_ext = ".jpg"
+    return image_ext
+
+
+@dataclass
+class _CacheEntry:
+    path: Path
+    size: int
+    etag: Optional[str]
+    fetched_at: float
+    pins: int = 0
+    # Replaced by newer content while pinned; the file is released on the last unpin.
+    retired: bool = False
+
+
+class SourceImageCache:
+    """Size-bounded LRU of downloaded source images, keyed by URL."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int,
+        revalidate_seconds: float,
+        orphan_seconds: float = SOURCE_IMAGE_CACHE_ORPHAN_SECONDS
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.orphan_seconds = orphan_seconds
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._file_refs: Dict[Path, int] = {}
+        self._url_locks: Dict[str, asyncio.Lock] = {}
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0, "orphans_pruned": 0}
+        self._prune_orphans()
+
+    def _prune_orphans(self) -> None:
+        """Remove files (and interrupted .tmp writes) that no process has touched for orphan_seconds."""
+        if not self.cache_dir.is_dir():
+            return
+        cutoff = time.time() - self.orphan_seconds
+        for path in self.cache_dir.iterdir():
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    self._stats["orphans_pruned"] += 1
+            except FileNotFoundError:
+                pass
+            except Exception as exc:
+                logger.warning(f"Failed to prune cached source image {path}: {exc}")
+        if self._stats["orphans_pruned"]:
+            logger.info(f"Pruned {self._stats['orphans_pruned']} orphaned source images from {self.cache_dir}")
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["entries"] = len(self._entries)
+        stats["bytes"] = self._total_bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    @asynccontextmanager
+    async def checkout(self, image_url: str) -> AsyncIterator[str]:
+        """
+        Yield a local path for `image_url`, downloading it at most once.
+        The entry is pinned (never evicted) while the context is open.
+        """
+        entry = await self._get_or_fetch(image_url)
+        entry.pins += 1
+        self._evict_if_needed()
+        try:
+            yield str(entry.path)
+        finally:
+            entry.pins -= 1
+            if entry.retired and entry.pins == 0:
+                self._release(entry)
+            self._evict_if_needed()
+
+    async def _get_or_fetch(self, image_url: str) -> _CacheEntry:
+        lock = self._url_locks.setdefault(image_url, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(image_url)
+            if entry and entry.path.exists():
+                self._entries.move_to_end(image_url)
+                self._touch(entry.path)
+                if (time.time() - entry.fetched_at) < self.revalidate_seconds:
+                    self._stats["hits"] += 1
+                    return entry
+                return await self._revalidate(image_url, entry)
+            if entry:
+                self._drop(image_url)
+            self._stats["misses"] += 1
+            return await self._download(image_url)
+
+    async def _revalidate(self, image_url: str, entry: _CacheEntry) -> _CacheEntry:
+        headers = {"If-None-Match": entry.etag} if entry.etag else {}
+        async with httpx.AsyncClient(timeout=SOURCE_IMAGE_DOWNLOAD_TIMEOUT) as client:
+            response = await client.get(image_url, headers=headers)
+        if response.status_code == 304:
+            entry.fetched_at = time.time()
+            self._stats["revalidated"] += 1
+            return entry
+        response.raise_for_status()
+        self._stats["misses"] += 1
+        fresh = self._store(image_url, response)
+        if fresh.path != entry.path and entry.pins > 0:
+            # Content changed under an open checkout: keep the old file until it is unpinned.
+            entry.retired = True
+        else:
+            self._release(entry)
+        return fresh
+
+    async def _download(self, image_url: str) -> _CacheEntry:
+        logger.info(f"Downloading source image: {image_url}")
+        async with httpx.AsyncClient(timeout=SOURCE_IMAGE_DOWNLOAD_TIMEOUT) as client:
+            response = await client.get(image_url)
+        response.raise_for_status()
+        return self._store(image_url, response)
+
+    def _store(self, image_url: str, response: httpx.Response) -> _CacheEntry:
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.cache_dir / f"{digest}{image_extension_for_url(image_url)}"
+        if not path.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        else:
+            self._touch(path)
+        refs = self._file_refs.get(path, 0)
+        if refs == 0:
+            self._total_bytes += len(content)
+        self._file_refs[path] = refs + 1
+        entry = _CacheEntry(
+            path=path,
+            size=len(content),
+            etag=response.headers.get("etag"),
+            fetched_at=time.time()
+        )
+        self._entries[image_url] = entry
+        self._entries.move_to_end(image_url)
+        return entry
+
+    def _drop(self, image_url: str) -> None:
+        entry = self._entries.pop(image_url, None)
+        if entry:
+            self._release(entry)
+
+    def _release(self, entry: _CacheEntry) -> None:
+        refs = self._file_refs.get(entry.path, 0) - 1
+        if refs > 0:
+            self._file_refs[entry.path] = refs
+            return
+        self._file_refs.pop(entry.path, None)
+        self._total_bytes = max(0, self._total_bytes - entry.size)
+        try:
+            entry.path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            logger.warning(f"Failed to remove cached source image {entry.path}: {exc}")
+
+    def _evict_if_needed(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        for url in list(self._entries.keys()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            entry = self._entries[url]
+            if entry.pins > 0:
+                continue
+            self._drop(url)
+            self._stats["evictions"] += 1
+            lock = self._url_locks.get(url)
+            if lock is not None and not lock.locked():
+                del self._url_locks[url]
+
+
+_SOURCE_IMAGE_CACHE = SourceImageCache(
+    cache_dir=SOURCE_IMAGE_CACHE_DIR,
+    max_bytes=int(SOURCE_IMAGE_CACHE_MAX_MB * 1024 * 1024),
+    revalidate_seconds=SOURCE_IMAGE_CACHE_REVALIDATE_SECONDS
+)
+
+
+def get_source_image_cache() -> SourceImageCache:
+    return _SOURCE_IMAGE_CACHE
@@ -0,0 +1,253 @@
+"""
+Async Supabase data access for request handlers.
+
+Talks to PostgREST (/rest/v1) and Auth (/auth/v1) over one shared
+httpx.AsyncClient (keep-alive, HTTP/2 when available, bounded pool) so
+handlers await I/O instead of blocking the event loop. Cache access,
+profile defaults, counter arithmetic and the token acceptance rules come
+from the public helpers in supabase_service, so the sync and async APIs
+stay coherent.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote_plus
+
+import httpx
+
+from app.services.supabase_service import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_ANON_KEY,
+    SUPABASE_HTTP_TIMEOUT,
+    supabase_http_limits,
+    supabase_http2_enabled,
+    balance_after_change,
+    cache_profile,
+    get_cached_profile,
+    new_profile_payload,
+    remember_profile_write,
+    verified_user_from_response
+)
+
+logger = logging.getLogger(__name__)
+
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared client; pooled connections belong to a loop, so recreate when the running loop changes."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            http2=supabase_http2_enabled(),
+            limits=supabase_http_limits(),
+            timeout=SUPABASE_HTTP_TIMEOUT
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def aclose_async_client() -> None:
+    global _async_client, _async_client_loop
+    client = _async_client
+    _async_client = None
+    _async_client_loop = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _require_service_config() -> None:
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        raise ValueError("Supabase client not initialized")
+
+
+def _service_headers(prefer: Optional[str] = None) -> Dict[str, str]:
+    headers = {
+        "apikey": SUPABASE_SERVICE_KEY or "",
+        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"
+    }
+    if prefer:
+        headers["Prefer"] = prefer
+    return headers
+
+
+async def _rest(
+    method: str,
+    table: str,
+    params: Optional[Dict[str, str]] = None,
+    json_body: Optional[Any] = None,
+    prefer: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Call PostgREST and return the row list; raises ValueError with the PostgREST error text."""
+    _require_service_config()
+    response = await get_async_client().request(
+        method,
+        f"{SUPABASE_URL}/rest/v1/{table}",
+        params=params,
+        json=json_body,
+        headers=_service_headers(prefer)
+    )
+    if response.status_code >= 400:
+        raise ValueError(f"PostgREST {method} {table} failed: {response.status_code} - {response.text[:300]}")
+    if not response.content:
+        return []
+    data = response.json()
+    return data if isinstance(data, list) else [data]
+
+
+async def _fetch_profile_async(user_id: str) -> Optional[Dict[str, Any]]:
+    rows = await _rest(
+        "GET",
+        "profiles",
+        params={"select": "*", "user_id": f"eq.{user_id}", "limit": "1"}
+    )
+    if rows:
+        cache_profile(user_id, rows[0])
+        return rows[0]
+    return None
+
+
+async def _update_profile_async(user_id: str, fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = await _rest(
+        "PATCH",
+        "profiles",
+        params={"user_id": f"eq.{user_id}"},
+        json_body=fields,
+        prefer="return=representation"
+    )
+    remember_profile_write(user_id, rows)
+    return rows
+
+
+async def get_user_profile_async(user_id: str) -> Optional[Dict[str, Any]]:
+    """Async get_user_profile: cached, raises on Supabase errors."""
+    _require_service_config()
+    cached = get_cached_profile(user_id)
+    if cached is not None:
+        return cached
+    try:
+        return await _fetch_profile_async(user_id)
+    except Exception as e:
+        logger.error(f"Error getting user profile: {str(e)}", exc_info=True)
+        raise
+
+
+async def get_profile_by_user_id_async(user_id: str) -> Optional[Dict[str, Any]]:
+    """Async get_profile_by_user_id: cached, returns None on errors."""
+    _require_service_config()
+    cached = get_cached_profile(user_id)
+    if cached is not None:
+        return cached
+    try:
+        return await _fetch_profile_async(user_id)
+    except Exception as e:
+        logger.error(f"Error getting profile by user_id: {str(e)}", exc_info=True)
+        return None
+
+
+async def ensure_user_profile_async(user_id: str, display_name: Optional[str] = None) -> Dict[str, Any]:
+    """Async ensure_user_profile (same defaults as the sync version)."""
+    try:
+        rows = await _rest(
+            "POST",
+            "profiles",
+            params={"on_conflict": "user_id"},
+            json_body=new_profile_payload(user_id, display_name),
+            prefer="resolution=merge-duplicates,return=representation"
+        )
+        remember_profile_write(user_id, rows)
+        if rows:
+            return rows[0]
+        existing = await get_user_profile_async(user_id)
+        if existing:
+            return existing
+        raise ValueError("Failed to ensure profile")
+    except Exception as e:
+        logger.error(f"Error ensuring user profile: {str(e)}", exc_info=True)
+        raise
+
+
+async def update_user_coins_async(user_id: str, coins_change: int) -> Dict[str, Any]:
+    """Async update_user_coins (fresh read-modify-write, never from cache)."""
+    try:
+        profile = await _fetch_profile_async(user_id)
+        if not profile:
+            raise ValueError("User profile not found")
+        new_balance = balance_after_change(profile, "coins_balance", coins_change)
+        rows = await _update_profile_async(user_id, {"coins_balance": new_balance})
+        if rows:
+            return rows[0]
+        raise ValueError("Failed to update coins")
+    except Exception as e:
+        logger.error(f"Error updating user coins: {str(e)}", exc_info=True)
+        raise
+
+
+async def update_user_quota_async(user_id: str, quota_change: int) -> Dict[str, Any]:
+    """Async update_user_quota (fresh read-modify-write, never from cache)."""
+    try:
+        profile = await _fetch_profile_async(user_id)
+        if not profile:
+            raise ValueError("User profile not found")
+        new_quota = balance_after_change(profile, "free_image_quota", quota_change)
+        rows = await _update_profile_async(user_id, {"free_image_quota": new_quota})
+        if rows:
+            return rows[0]
+        raise ValueError("Failed to update quota")
+    except Exception as e:
+        logger.error(f"Error updating user quota: {str(e)}", exc_info=True)
+        raise
+
+
+async def update_user_trial_remaining_async(user_id: str, trial_remaining: int) -> Dict[str, Any]:
+    """Async update_user_trial_remaining."""
+    try:
+        rows = await _update_profile_async(
+            user_id,
+            {"trial_upload_remaining": max(0, int(trial_remaining))}
+        )
+        if rows:
+            return rows[0]
+        raise ValueError("Failed to update trial remaining")
+    except Exception as e:
+        logger.error(f"Error updating trial remaining: {str(e)}", exc_info=True)
+        raise
+
+
+async def get_user_by_id_async(user_id: str) -> Optional[Dict[str, Any]]:
+    """Async get_user_by_id (Auth Admin API)."""
+    _require_service_config()
+    try:
+        response = await get_async_client().get(
+            f"{SUPABASE_URL}/auth/v1/admin/users/{quote_plus(user_id)}",
+            headers=_service_headers()
+        )
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch user by id: {response.status_code} - {response.text}")
+            return None
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error getting user by id: {str(e)}", exc_info=True)
+        return None
+
+
+async def verify_user_token_async(token: str) -> Optional[Dict[str, Any]]:
+    """Async verify_user_token (remote /auth/v1/user check with the anon key)."""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise ValueError("Supabase client not initialized. Please configure SUPABASE_URL and SUPABASE_ANON_KEY in config.env")
+    if not token:
+        logger.warning("Token verification failed: empty token")
+        return None
+    try:
+        response = await get_async_client().get(
+            f"{SUPABASE_URL}/auth/v1/user",
+            headers={"Authorization": f"Bearer {token}", "apikey": SUPABASE_ANON_KEY},
+            timeout=10.0
+        )
+        return verified_user_from_response(response)
+    except Exception as e:
+        logger.error(f"Error verifying user token: {str(e)}", exc_info=True)
+        return None
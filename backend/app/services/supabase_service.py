@@ -1,11 +1,15 @@
 """
 Supabase service for database operations
 """
+import importlib.util
 import os
 import logging
 import httpx
 import base64
 import json
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any, Tuple, List
 from urllib.parse import quote_plus
 from datetime import datetime, timedelta
@@ -27,6 +31,44 @@ else:
 
 _storage_client: Optional[Client] = None
 
+# Shared HTTP connection pool for raw Auth/PostgREST calls (see supabase_async for the async twin).
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "50"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "15"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in {"1", "true", "yes", "on"}
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def supabase_http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def supabase_http2_enabled() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 without it."""
+    if not SUPABASE_HTTP2:
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def _get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    http2=supabase_http2_enabled(),
+                    limits=supabase_http_limits(),
+                    timeout=SUPABASE_HTTP_TIMEOUT
+                )
+    return _http_client
+
 
 def _get_storage_client() -> Client:
     key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_SERVICE_KEY
@@ -52,6 +94,129 @@ def _safe_decode_jwt_claims(token: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "30"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "5000"))
+
+
+class _ProfileCache:
+    """
+    In-process TTL + LRU cache of `profiles` rows keyed by user_id.
+    Mutators in this module write through (or invalidate) so readers see their own writes.
+    NOTE: per-process only; other workers converge within the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return dict(cached[1])
+            if cached:
+                self._entries.pop(user_id, None)
+            self._misses += 1
+            return None
+
+    def set(self, user_id: str, profile: Optional[Dict[str, Any]]) -> None:
+        if not user_id or not isinstance(profile, dict) or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(profile))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "invalidations": self._invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+_profile_cache = _ProfileCache(PROFILE_CACHE_TTL_SECONDS, PROFILE_CACHE_MAX_ENTRIES)
+
+
+def get_profile_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the in-process profile cache."""
+    return _profile_cache.stats()
+
+
+def invalidate_profile_cache(user_id: Optional[str] = None) -> None:
+    """Drop one cached profile (or all of them when user_id is None)."""
+    _profile_cache.invalidate(user_id)
+
+
+def get_cached_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Cached profile row, or None on a miss (never does I/O)."""
+    return _profile_cache.get(user_id)
+
+
+def cache_profile(user_id: str, row: Dict[str, Any]) -> None:
+    """Store a freshly read profile row (shared by the sync and async readers)."""
+    _profile_cache.set(user_id, row)
+
+
+def new_profile_payload(user_id: str, display_name: Optional[str] = None) -> Dict[str, Any]:
+    """Defaults for a profile created on first sign-in."""
+    payload: Dict[str, Any] = {
+        "user_id": user_id,
+        "coins_balance": 0,
+        "trial_upload_remaining": 3,
+        "role_user": "user"
+    }
+    if display_name:
+        payload["display_name"] = display_name
+    return payload
+
+
+def balance_after_change(profile: Dict[str, Any], field: str, change: int) -> int:
+    """New value of a counter column (coins, quota) after `change`, never below zero."""
+    return max(0, (profile.get(field) or 0) + change)
+
+
+def remember_profile_write(user_id: str, response_data: Any) -> None:
+    """Write-through for mutators: cache the returned row, or invalidate if none came back."""
+    if response_data and isinstance(response_data, list) and isinstance(response_data[0], dict):
+        _profile_cache.set(user_id, response_data[0])
+    else:
+        _profile_cache.invalidate(user_id)
+
+
+def _fetch_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Read a profile straight from Supabase (bypasses the cache; used for read-modify-write)."""
+    response = supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+    if response.data and len(response.data) > 0:
+        cache_profile(user_id, response.data[0])
+        return response.data[0]
+    return None
+
+
 def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Get user profile from Supabase
@@ -65,11 +230,11 @@ def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     if not supabase:
         raise ValueError("Supabase client not initialized")
     
+    cached = _profile_cache.get(user_id)
+    if cached is not None:
+        return cached
     try:
-        response = supabase.table("profiles").select("*").eq("user_id", user_id).execute()
-        if response.data and len(response.data) > 0:
-            return response.data[0]
-        return None
+        return _fetch_profile(user_id)
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error getting user profile: {error_msg}", exc_info=True)
@@ -109,7 +274,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
             "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
             "apikey": SUPABASE_SERVICE_KEY
         }
-        response = httpx.get(url, headers=headers, timeout=10.0)
+        response = _get_http_client().get(url, headers=headers, timeout=10.0)
         if response.status_code != 200:
             logger.warning(f"Failed to fetch user by email: {response.status_code} - {response.text}")
             return None
@@ -140,7 +305,7 @@ def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
             "apikey": SUPABASE_SERVICE_KEY,
             "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"
         }
-        response = httpx.get(url, headers=headers, timeout=15)
+        response = _get_http_client().get(url, headers=headers, timeout=15)
         if response.status_code != 200:
             logger.warning(f"Failed to fetch user by id: {response.status_code} - {response.text}")
             return None
@@ -150,9 +315,15 @@ def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def list_auth_users(page: int = 1, per_page: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+def list_auth_users(
+    page: int = 1,
+    per_page: int = 20,
+    filter_text: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
     """
     List users via Supabase Admin API.
+    filter_text is passed as GoTrue's `filter` (email/name substring); callers must still
+    filter locally because older Auth servers ignore it.
     """
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         raise ValueError("Supabase credentials not initialized")
@@ -162,7 +333,10 @@ def list_auth_users(page: int = 1, per_page: int = 20) -> Tuple[List[Dict[str, A
             "apikey": SUPABASE_SERVICE_KEY,
             "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"
         }
-        response = httpx.get(url, headers=headers, params={"page": page, "per_page": per_page}, timeout=15)
+        params: Dict[str, Any] = {"page": page, "per_page": per_page}
+        if filter_text:
+            params["filter"] = filter_text
+        response = _get_http_client().get(url, headers=headers, params=params, timeout=15)
         if response.status_code != 200:
             logger.warning(f"Failed to list users: {response.status_code} - {response.text}")
             return [], None
@@ -205,6 +379,7 @@ def upsert_user_role(user_id: str, role_user: str) -> Optional[Dict[str, Any]]:
     try:
         payload = {"user_id": user_id, "role_user": role_user}
         response = supabase.table("profiles").upsert(payload, on_conflict="user_id").execute()
+        remember_profile_write(user_id, response.data)
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -249,7 +424,8 @@ def ensure_admin_users_by_email(emails: List[str]) -> int:
             response = supabase.table("admin_users").upsert({"user_id": user_id}, on_conflict="user_id").execute()
             if response.data:
                 updated += 1
-            supabase.table("profiles").update({"is_admin": True}).eq("user_id", user_id).execute()
+            profile_response = supabase.table("profiles").update({"is_admin": True}).eq("user_id", user_id).execute()
+            remember_profile_write(user_id, profile_response.data)
         except Exception as e:
             logger.error(f"Bootstrap admin_users failed for {email}: {str(e)}", exc_info=True)
     return updated
@@ -286,17 +462,18 @@ def update_user_quota(user_id: str, quota_change: int) -> Dict[str, Any]:
         raise ValueError("Supabase client not initialized")
     
     try:
-        # Get current profile
-        profile = get_user_profile(user_id)
+        # Get current profile (fresh read: never compute a new balance from a cached row)
+        profile = _fetch_profile(user_id)
         if not profile:
             raise ValueError("User profile not found")
         
-        new_quota = max(0, profile.get("free_image_quota", 0) + quota_change)
+        new_quota = balance_after_change(profile, "free_image_quota", quota_change)
         
         # Update quota
         response = supabase.table("profiles").update({
             "free_image_quota": new_quota
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         
         if response.data and len(response.data) > 0:
             return response.data[0]
@@ -321,17 +498,18 @@ def update_user_coins(user_id: str, coins_change: int) -> Dict[str, Any]:
         raise ValueError("Supabase client not initialized")
     
     try:
-        # Get current profile
-        profile = get_user_profile(user_id)
+        # Get current profile (fresh read: never compute a new balance from a cached row)
+        profile = _fetch_profile(user_id)
         if not profile:
             raise ValueError("User profile not found")
         
-        new_balance = max(0, profile.get("coins_balance", 0) + coins_change)
+        new_balance = balance_after_change(profile, "coins_balance", coins_change)
         
         # Update coins
         response = supabase.table("profiles").update({
             "coins_balance": new_balance
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         
         if response.data and len(response.data) > 0:
             return response.data[0]
@@ -351,6 +529,7 @@ def update_user_trial_remaining(user_id: str, trial_remaining: int) -> Dict[str,
         response = supabase.table("profiles").update({
             "trial_upload_remaining": max(0, int(trial_remaining))
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         if response.data and len(response.data) > 0:
             return response.data[0]
         raise ValueError("Failed to update trial remaining")
@@ -425,6 +604,7 @@ def update_user_subscription(user_id: str, subscribed: bool) -> Dict[str, Any]:
         response = supabase.table("profiles").update({
             "subscribed": bool(subscribed)
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         if response.data and len(response.data) > 0:
             return response.data[0]
         raise ValueError("Failed to update subscription")
@@ -443,6 +623,7 @@ def update_user_admin_flag(user_id: str, is_admin: bool) -> Dict[str, Any]:
         response = supabase.table("profiles").update({
             "is_admin": bool(is_admin)
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         if bool(is_admin):
             supabase.table("admin_users").upsert({"user_id": user_id}, on_conflict="user_id").execute()
         else:
@@ -466,6 +647,7 @@ def update_user_subscription_expires(user_id: str, expires_at: Optional[str]) ->
             "subscription_expires_at": expires_at,
             "subscribed_until": expires_at
         }).eq("user_id", user_id).execute()
+        remember_profile_write(user_id, response.data)
         if response.data and len(response.data) > 0:
             return response.data[0]
         raise ValueError("Failed to update subscription_expires_at")
@@ -481,15 +663,9 @@ def ensure_user_profile(user_id: str, display_name: Optional[str] = None) -> Dic
     if not supabase:
         raise ValueError("Supabase client not initialized")
     try:
-        payload: Dict[str, Any] = {
-            "user_id": user_id,
-            "coins_balance": 0,
-            "trial_upload_remaining": 3,
-            "role_user": "user"
-        }
-        if display_name:
-            payload["display_name"] = display_name
+        payload = new_profile_payload(user_id, display_name)
         response = supabase.table("profiles").upsert(payload, on_conflict="user_id").execute()
+        remember_profile_write(user_id, response.data)
         if response.data and len(response.data) > 0:
             return response.data[0]
         existing = get_user_profile(user_id)
@@ -523,16 +699,44 @@ def get_profile_by_user_id(user_id: str) -> Optional[Dict[str, Any]]:
     """
     if not supabase:
         raise ValueError("Supabase client not initialized")
+    cached = _profile_cache.get(user_id)
+    if cached is not None:
+        return cached
     try:
-        response = supabase.table("profiles").select("*").eq("user_id", user_id).limit(1).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        return _fetch_profile(user_id)
     except Exception as e:
         logger.error(f"Error getting profile by user_id: {str(e)}", exc_info=True)
         return None
 
 
+PROFILE_BULK_CHUNK_SIZE = 200
+
+
+def get_profiles_by_user_ids(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk profile fetch (user_id=in.(...)), one round-trip per PROFILE_BULK_CHUNK_SIZE ids.
+    Returns {user_id: profile}; users without a profile are absent. Raises on Supabase
+    errors so a failed chunk is never mistaken for users without a profile.
+    """
+    if not supabase:
+        raise ValueError("Supabase client not initialized")
+    unique_ids = [uid for uid in dict.fromkeys(user_ids) if uid]
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(unique_ids), PROFILE_BULK_CHUNK_SIZE):
+        chunk = unique_ids[start:start + PROFILE_BULK_CHUNK_SIZE]
+        try:
+            response = supabase.table("profiles").select("*").in_("user_id", chunk).execute()
+        except Exception as e:
+            logger.error(f"Error bulk fetching profiles: {str(e)}", exc_info=True)
+            raise
+        for row in response.data or []:
+            user_id = row.get("user_id")
+            if user_id:
+                profiles[user_id] = row
+                cache_profile(user_id, row)
+    return profiles
+
+
 def insert_midtrans_transaction_log(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Insert Midtrans transaction log into Supabase table `midtrans_transactions`.
@@ -703,37 +907,42 @@ def verify_user_token(token: str) -> Optional[Dict[str, Any]]:
             "apikey": SUPABASE_ANON_KEY
         }
 
-        response = httpx.get(verify_url, headers=headers, timeout=10.0)
-        if response.status_code != 200:
-            logger.warning(
-                "Token verification failed",
-                extra={"status_code": response.status_code, "body": response.text[:200]}
-            )
-            return None
+        response = _get_http_client().get(verify_url, headers=headers, timeout=10.0)
+        return verified_user_from_response(response)
+    except Exception as e:
+        logger.error(f"Error verifying user token: {str(e)}", exc_info=True)
+        return None
 
-        payload = response.json()
-        user_data = payload if isinstance(payload, dict) else {}
-        user_id = user_data.get("id")
-        email = user_data.get("email")
-        email_confirmed_at = user_data.get("email_confirmed_at") or user_data.get("confirmed_at")
 
-        # SECURITY: reject missing id/email or unverified email.
-        if not user_id or not email:
-            logger.warning("Token verification rejected: missing id or email")
-            return None
-        if not email_confirmed_at:
-            logger.warning("Token verification rejected: email not confirmed")
-            return None
+def verified_user_from_response(response: httpx.Response) -> Optional[Dict[str, Any]]:
+    """Apply the /auth/v1/user acceptance rules (shared by the sync and async clients)."""
+    if response.status_code != 200:
+        logger.warning(
+            "Token verification failed",
+            extra={"status_code": response.status_code, "body": response.text[:200]}
+        )
+        return None
 
-        return {
-            "id": user_id,
-            "email": email,
-            "user_metadata": user_data.get("user_metadata", {})
-        }
-    except Exception as e:
-        logger.error(f"Error verifying user token: {str(e)}", exc_info=True)
+    payload = response.json()
+    user_data = payload if isinstance(payload, dict) else {}
+    user_id = user_data.get("id")
+    email = user_data.get("email")
+    email_confirmed_at = user_data.get("email_confirmed_at") or user_data.get("confirmed_at")
+
+    # SECURITY: reject missing id/email or unverified email.
+    if not user_id or not email:
+        logger.warning("Token verification rejected: missing id or email")
+        return None
+    if not email_confirmed_at:
+        logger.warning("Token verification rejected: email not confirmed")
         return None
 
+    return {
+        "id": user_id,
+        "email": email,
+        "user_metadata": user_data.get("user_metadata", {})
+    }
+
 
 def upload_image_to_supabase_storage(
     file_content: bytes,
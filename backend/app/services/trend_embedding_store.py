@@ -0,0 +1,159 @@
+"""
+Persistent trend embeddings keyed by a content hash of (provider, model,
+hashtag, category), stored as float32 blobs in the app's SQLite database.
+
+A trends refresh only embeds rows whose hash is not stored yet and drops
+vectors for rows that left the CSV, so restarts and uploads cost time in
+proportion to what changed rather than to the whole CSV.
+"""
+
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SQLITE_MAX_VARIABLES = 900
+
+
+def trend_content_hash(provider: str, model: str, hashtag: str, category: str) -> str:
+    raw = "\x1f".join((provider, model, hashtag or "", category or ""))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TrendEmbeddingStore:
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_schema(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trend_embeddings (
+                    content_hash TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trend_embeddings_model ON trend_embeddings (model)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def load(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors for the given hashes (read-only float32 views over the blobs)."""
+        wanted = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        if not wanted:
+            return found
+        conn = self._connect()
+        try:
+            for start in range(0, len(wanted), _SQLITE_MAX_VARIABLES):
+                chunk = wanted[start:start + _SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT content_hash, dim, vector FROM trend_embeddings WHERE content_hash IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for content_hash, dim, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if vector.shape == (dim,):
+                        found[content_hash] = vector
+        finally:
+            conn.close()
+        return found
+
+    def save(self, model: str, vectors: Dict[str, Sequence[float]]) -> int:
+        now = datetime.utcnow().isoformat()
+        records = []
+        for content_hash, vector in vectors.items():
+            array = np.asarray(vector, dtype=np.float32)
+            if array.ndim != 1 or array.size == 0:
+                continue
+            records.append((content_hash, model, int(array.size), array.tobytes(), now))
+        if not records:
+            return 0
+        conn = self._connect()
+        try:
+            conn.executemany(
+                """
+                INSERT INTO trend_embeddings (content_hash, model, dim, vector, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET
+                    model = excluded.model, dim = excluded.dim,
+                    vector = excluded.vector, updated_at = excluded.updated_at
+                """,
+                records
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return len(records)
+
+    def prune(self, keep_hashes: Iterable[str]) -> int:
+        """Delete every stored vector whose hash is not in keep_hashes (rows removed from the CSV)."""
+        keep = set(keep_hashes)
+        conn = self._connect()
+        try:
+            stored = [row[0] for row in conn.execute("SELECT content_hash FROM trend_embeddings")]
+            stale = [(content_hash,) for content_hash in stored if content_hash not in keep]
+            if stale:
+                conn.executemany("DELETE FROM trend_embeddings WHERE content_hash = ?", stale)
+                conn.commit()
+        finally:
+            conn.close()
+        return len(stale)
+
+    def sync(
+        self,
+        provider: str,
+        model: str,
+        rows: List[Dict[str, str]],
+        texts: List[str],
+        embed_texts: Callable[[List[str]], List[List[float]]]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Vectors for `rows` (aligned with `texts`), embedding only hashes not stored yet.
+        Rows whose embedding failed get None; embedding errors are logged, not raised.
+        """
+        hashes = [
+            trend_content_hash(provider, model, row.get("hashtag", ""), row.get("category", ""))
+            for row in rows
+        ]
+        stored = self.load(hashes)
+        missing: Dict[str, str] = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in stored:
+                missing.setdefault(content_hash, text)
+        model_key = f"{provider}:{model}"
+        embedded = 0
+        if missing:
+            try:
+                new_vectors = embed_texts(list(missing.values()))
+            except Exception as e:
+                logger.warning(f"Failed to embed {len(missing)} new trend rows (LLM server unreachable?): {e}")
+                new_vectors = []
+            fresh = {
+                content_hash: vector
+                for content_hash, vector in zip(missing.keys(), new_vectors)
+                if vector is not None and len(vector) > 0
+            }
+            embedded = self.save(model_key, fresh)
+            stored.update({key: np.asarray(vector, dtype=np.float32) for key, vector in fresh.items()})
+        removed = self.prune(hashes)
+        logger.info(
+            f"Trend embeddings: {len(rows)} rows, {embedded}/{len(missing)} new embedded, "
+            f"{len(set(hashes)) - len(missing)} reused, {removed} pruned"
+        )
+        return [stored.get(content_hash) for content_hash in hashes]
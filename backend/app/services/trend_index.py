@@ -0,0 +1,81 @@
+"""
+In-memory trend index for RAG search: trend vectors are kept as one
+pre-normalized float32 matrix with per-category row masks, so a query is a
+single mat-vec plus a top-k partition.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Same bonuses the row-by-row search used: exact category match, then "generic" rows.
+CATEGORY_MATCH_BONUS = 0.05
+GENERIC_CATEGORY_BONUS = 0.02
+GENERIC_CATEGORIES = ("", "general", "all")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors stay zero (cosine 0), as before.
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class TrendIndex:
+    """Trend rows plus their unit-length embedding matrix (row i <-> rows[i])."""
+
+    def __init__(self, rows: List[Dict[str, Any]], vectors: Sequence[Optional[Sequence[float]]]) -> None:
+        self.rows = rows
+        dim = max((len(v) for v in vectors if v is not None), default=0)
+        matrix = np.zeros((len(rows), dim), dtype=np.float32)
+        for idx, vector in enumerate(vectors[:len(rows)]):
+            # Rows without a usable vector score 0 on similarity (bonus only).
+            if vector is not None and len(vector) == dim:
+                matrix[idx] = vector
+        self.matrix = _normalize_rows(matrix)
+        self.dim = dim
+        categories = np.array([(row.get("category") or "") for row in rows], dtype=object)
+        self._category_masks: Dict[str, np.ndarray] = {
+            key: categories == key for key in set(categories.tolist())
+        }
+        self._generic_mask = np.isin(categories, GENERIC_CATEGORIES)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _category_bonus(self, category_key: str) -> np.ndarray:
+        bonus = np.where(self._generic_mask, GENERIC_CATEGORY_BONUS, 0.0).astype(np.float32)
+        match_mask = self._category_masks.get(category_key)
+        if match_mask is not None:
+            bonus[match_mask] = CATEGORY_MATCH_BONUS
+        return bonus
+
+    def search(self, query_vec: Sequence[float], category: Optional[str], limit: int = 8) -> List[Dict[str, Any]]:
+        """Top-`limit` rows by cosine similarity plus category bonus."""
+        if not self.rows or limit <= 0:
+            return []
+        category_key = (category or "").strip().lower()
+        scores = self._category_bonus(category_key)
+        query = np.asarray(query_vec, dtype=np.float32)
+        if self.dim and query.shape == (self.dim,):
+            norm = float(np.linalg.norm(query))
+            if norm > 0:
+                scores += self.matrix @ (query / norm)
+
+        count = len(scores)
+        if limit < count:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(count)
+        # Highest score first; ties keep CSV order like the old stable sort.
+        top = top[np.lexsort((top, -scores[top]))]
+        results: List[Dict[str, Any]] = []
+        for idx in top.tolist():
+            row = self.rows[idx]
+            results.append({
+                "hashtag": row.get("hashtag"),
+                "category": row.get("category"),
+                "score": float(scores[idx]),
+                "weight": row.get("weight", 1.0)
+            })
+        return results
@@ -0,0 +1,100 @@
+"""
+Parsed trends.csv kept in memory and re-read only when the file's mtime or
+size changes. The dataset carries per-category and weight-sorted views so
+fallback trend picks and admin listings never re-parse the CSV.
+"""
+
+import csv
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GENERIC_CATEGORIES = ("", "general", "all")
+
+
+class TrendsDataset:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = rows
+        # sorted() is stable, so equal weights keep CSV order.
+        self.by_weight = sorted(rows, key=lambda r: r.get("weight", 1.0), reverse=True)
+        # Per-category lists in CSV order and in weight order.
+        self.by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            self.by_category.setdefault(row.get("category") or "", []).append(row)
+        self.by_category_weight: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.by_weight:
+            self.by_category_weight.setdefault(row.get("category") or "", []).append(row)
+        self.generic = [row for row in self.by_weight if (row.get("category") or "") in GENERIC_CATEGORIES]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def for_category(self, category: Optional[str], by_weight: bool = False) -> List[Dict[str, Any]]:
+        groups = self.by_category_weight if by_weight else self.by_category
+        return groups.get((category or "").strip().lower(), [])
+
+    def top(self, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Best rows without embeddings: category rows, then generic rows, then anything, by weight."""
+        picked: List[Dict[str, Any]] = []
+        seen = set()
+        for pool in (self.for_category(category, by_weight=True), self.generic, self.by_weight):
+            for row in pool:
+                if len(picked) >= limit:
+                    return picked
+                if id(row) not in seen:
+                    seen.add(id(row))
+                    picked.append(row)
+        return picked
+
+
+def parse_trends_csv(path: Path) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            rows.append({
+                "category": (row.get("category") or "").strip().lower(),
+                "hashtag": (row.get("hashtag") or "").strip(),
+                "weight": float(row.get("weight") or 1.0)
+            })
+    return rows
+
+
+class TrendsCsvCache:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._dataset = TrendsDataset([])
+        self.loads = 0
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self) -> TrendsDataset:
+        """Current dataset; one stat() per call, a re-parse only when the file changed."""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return self._dataset
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return self._dataset
+            rows: List[Dict[str, Any]] = []
+            if signature is not None:
+                try:
+                    rows = parse_trends_csv(self.path)
+                except Exception as e:
+                    logger.warning(f"Failed to load trends CSV: {e}")
+            self._dataset = TrendsDataset(rows)
+            self._signature = signature
+            self.loads += 1
+            return self._dataset
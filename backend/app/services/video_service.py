@@ -7,63 +7,24 @@ import subprocess
 import logging
 import os
 import tempfile
-from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import httpx
 from io import BytesIO
+from app.services.ffmpeg_capabilities import get_ffmpeg_capabilities
+from app.services.render_executor import run_ffmpeg, RENDER_TIMEOUT_SECONDS
+from app.services.source_image_cache import get_source_image_cache
 
 logger = logging.getLogger(__name__)
 
 
 def check_ffmpeg_available() -> bool:
-    """Check if FFmpeg is available in the system"""
-    import sys
-    from pathlib import Path
-    
-    # Try local FFmpeg first (in project folder)
-    project_root = Path(__file__).resolve().parents[3]
-    local_ffmpeg = project_root / "ffmpeg" / "ffmpeg-8.0.1-essentials_build" / "bin" / "ffmpeg.exe"
-    
-    if local_ffmpeg.exists():
-        try:
-            result = subprocess.run(
-                [str(local_ffmpeg), '-version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
-    
-    # Fallback to system FFmpeg
-    try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+    """Check if FFmpeg is available in the system (cached capability registry, no subprocess)"""
+    return get_ffmpeg_capabilities().available
 
 
 def get_ffmpeg_path() -> str:
     """Get the path to FFmpeg executable"""
-    import sys
-    from pathlib import Path
-    
-    # Try local FFmpeg first (in project folder)
-    project_root = Path(__file__).resolve().parents[3]
-    local_ffmpeg = project_root / "ffmpeg" / "ffmpeg-8.0.1-essentials_build" / "bin" / "ffmpeg.exe"
-    
-    if local_ffmpeg.exists():
-        return str(local_ffmpeg)
-    
-    # Fallback to system FFmpeg
-    return 'ffmpeg'
+    return get_ffmpeg_capabilities().ffmpeg_path
 
 
 def download_image_from_url(image_url: str) -> BytesIO:
@@ -77,7 +38,7 @@ def download_image_from_url(image_url: str) -> BytesIO:
         raise
 
 
-def generateVideoFromImage(
+def build_cinematic_command(
     image_path: str,
     output_path: str,
     duration: float = 15.0,
@@ -90,17 +51,14 @@ def generateVideoFromImage(
     zoom_expr_override: Optional[str] = None,
     x_expr_override: Optional[str] = None,
     y_expr_override: Optional[str] = None
-) -> str:
+) -> List[str]:
     """
-    Generate a cinematic zoom-in video from a single image using FFmpeg.
+    Build the FFmpeg command for a cinematic zoom-in video from a single image.
     - 9:16 (1080x1920), 60 FPS
     - Supersampling (scale up first, then crop)
     - Easing zoom (sin/cos curve, no linear zoom)
     - No overlays, no alpha, no aspect distortion
     """
-    if not check_ffmpeg_available():
-        raise RuntimeError("FFmpeg is not available. Please install FFmpeg to use video generation.")
-
     width, height = resolution
     total_frames = int(duration * fps)
     ss_width, ss_height = width * 2, height * 2  # supersampling (2x)
@@ -173,8 +131,35 @@ def generateVideoFromImage(
     logger.info(f"Zoom end: {zoom_end:.3f}, Supersample: {ss_width}x{ss_height}")
     logger.debug(f"Filter complex: {filter_complex}")
     logger.debug(f"FFmpeg command: {' '.join(cmd)}")
+    return cmd
+
+
+def generateVideoFromImage(
+    image_path: str,
+    output_path: str,
+    duration: float = 15.0,
+    resolution: Tuple[int, int] = (1080, 1920),
+    fps: int = 60,
+    zoom_end: float = 1.36,
+    rotate_degrees: float = 0.0,
+    focus_x: Optional[float] = None,
+    focus_y: Optional[float] = None,
+    zoom_expr_override: Optional[str] = None,
+    x_expr_override: Optional[str] = None,
+    y_expr_override: Optional[str] = None
+) -> str:
+    """
+    Generate a cinematic zoom-in video from a single image using FFmpeg (blocking).
+    Async callers should use render_cinematic_video instead.
+    """
+    if not check_ffmpeg_available():
+        raise RuntimeError("FFmpeg is not available. Please install FFmpeg to use video generation.")
 
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+    cmd = build_cinematic_command(
+        image_path, output_path, duration, resolution, fps, zoom_end, rotate_degrees,
+        focus_x, focus_y, zoom_expr_override, x_expr_override, y_expr_override
+    )
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=RENDER_TIMEOUT_SECONDS)
     if result.returncode != 0:
         logger.error(f"FFmpeg error: {result.stderr}")
         raise RuntimeError(f"FFmpeg failed: {result.stderr}")
@@ -182,6 +167,35 @@ def generateVideoFromImage(
     return output_path
 
 
+async def render_cinematic_video(
+    image_path: str,
+    output_path: str,
+    duration: float = 15.0,
+    resolution: Tuple[int, int] = (1080, 1920),
+    fps: int = 60,
+    zoom_end: float = 1.36,
+    rotate_degrees: float = 0.0,
+    focus_x: Optional[float] = None,
+    focus_y: Optional[float] = None,
+    zoom_expr_override: Optional[str] = None,
+    x_expr_override: Optional[str] = None,
+    y_expr_override: Optional[str] = None
+) -> str:
+    """
+    Async counterpart of generateVideoFromImage.
+    Runs through the render executor so concurrent renders are bounded and the event loop stays free.
+    """
+    if not check_ffmpeg_available():
+        raise RuntimeError("FFmpeg is not available. Please install FFmpeg to use video generation.")
+
+    cmd = build_cinematic_command(
+        image_path, output_path, duration, resolution, fps, zoom_end, rotate_degrees,
+        focus_x, focus_y, zoom_expr_override, x_expr_override, y_expr_override
+    )
+    await run_ffmpeg(cmd, timeout=RENDER_TIMEOUT_SECONDS)
+    return output_path
+
+
 def create_fake_motion_video(
     image_path: str,
     output_path: str,
@@ -560,52 +574,31 @@ async def create_video_from_url(
     temp_dir = tempfile.mkdtemp()
     
     try:
-        # Download image
-        logger.info(f"Downloading image from: {image_url}")
-        image_data = download_image_from_url(image_url)
-        
-        # Save image to temp file
-        image_ext = Path(image_url).suffix or '.jpg'
-        if image_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
-            image_ext = '.jpg'
-        
-        image_path = os.path.join(temp_dir, f"input{image_ext}")
-        with open(image_path, 'wb') as f:
-            f.write(image_data.getvalue())
-        
-        # Generate output filename
-        if not output_filename:
-            output_filename = f"video_{os.path.basename(image_url).split('.')[0]}"
-        
-        output_path = os.path.join(temp_dir, f"{output_filename}.mp4")
-        
-        # Increase zoom speed by 3x (relative to start)
-        zoom_end_fast = 1.0 + (zoom_end - 1.0) * 3.0 if apply_zoom_boost else zoom_end
-
-        # Create video with custom parameters
-        create_fake_motion_video(
-            image_path=image_path,
-            output_path=output_path,
-            hook_text=hook_text,
-            cta_text=cta_text,
-            duration=duration,
-            zoom_start=zoom_start,
-            zoom_end=zoom_end_fast,
-            zoom_speed=zoom_speed,
-            hook_position=hook_position,
-            hook_timing=hook_timing,
-            cta_position=cta_position,
-            cta_timing=cta_timing,
-            pan_x=pan_x,
-            pan_y=pan_y,
-            pan_speed=pan_speed,
-            rotate=rotate,
-            focus_x=focus_x,
-            focus_y=focus_y,
-            zoom_expr_override=zoom_expr_override,
-            x_expr_override=x_expr_override,
-            y_expr_override=y_expr_override
-        )
+        # Source image comes from the shared cache: one download per URL across all variations
+        async with get_source_image_cache().checkout(image_url) as image_path:
+            # Generate output filename
+            if not output_filename:
+                output_filename = f"video_{os.path.basename(image_url).split('.')[0]}"
+
+            output_path = os.path.join(temp_dir, f"{output_filename}.mp4")
+
+            # Increase zoom speed by 3x (relative to start)
+            zoom_end_fast = 1.0 + (zoom_end - 1.0) * 3.0 if apply_zoom_boost else zoom_end
+
+            # Create video with custom parameters (same cinematic pipeline as create_fake_motion_video,
+            # rendered through the bounded executor instead of a blocking subprocess)
+            await render_cinematic_video(
+                image_path=image_path,
+                output_path=output_path,
+                duration=duration,
+                zoom_end=zoom_end_fast,
+                rotate_degrees=rotate,
+                focus_x=focus_x,
+                focus_y=focus_y,
+                zoom_expr_override=zoom_expr_override,
+                x_expr_override=x_expr_override,
+                y_expr_override=y_expr_override
+            )
         
         return output_path
         
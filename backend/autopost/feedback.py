@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import os
+import re
 
 
 MIN_SAMPLES = 5
@@ -117,6 +118,7 @@ def _apply_decay(conn, table: str, where_clause: str = "", params: Tuple = ()) -
 
 
 def refresh_feedback_weights(conn, user_id: str) -> Dict[str, Dict[str, float]]:
+    """Decay and recompute one user's pattern weights; the caller owns the write transaction."""
     _apply_decay(conn, "autopost_pattern_feedback", "WHERE user_id = ?", (user_id,))
     rows = conn.execute(
         """
@@ -186,7 +188,6 @@ def refresh_feedback_weights(conn, user_id: str) -> Dict[str, Dict[str, float]]:
                 """,
                 (user_id, pattern_type, key, float(weight), now)
             )
-    conn.commit()
 
     return {
         "hook": hook_weights,
@@ -196,6 +197,7 @@ def refresh_feedback_weights(conn, user_id: str) -> Dict[str, Dict[str, float]]:
 
 
 def refresh_global_feedback_weights(conn) -> Dict[str, Dict[str, float]]:
+    """Decay and recompute the global pattern weights; the caller owns the write transaction."""
     _apply_decay(conn, "autopost_pattern_feedback_global")
     rows = conn.execute(
         """
@@ -258,7 +260,6 @@ def refresh_global_feedback_weights(conn) -> Dict[str, Dict[str, float]]:
                 """,
                 (pattern_type, key, float(weight), now)
             )
-    conn.commit()
     return {
         "hook": hook_weights,
         "cta": cta_weights,
@@ -309,3 +310,126 @@ def merge_weights(global_weights: Dict[str, Dict[str, float]], user_weights: Dic
             u = user_weights.get(group, {}).get(key, 1.0)
             merged[group][key] = _clamp((alpha * u) + ((1 - alpha) * g), MIN_WEIGHT, MAX_WEIGHT)
     return merged
+
+
+# Engagement aggregates: running rate sums/counts per (user, dimension, key),
+# maintained on every metrics insert so the scoring feedback loop only does point lookups.
+ENGAGEMENT_DIMENSIONS = ("overall", "category", "hook", "cta", "hashtag")
+
+
+def _normalize_key(text: Optional[str]) -> str:
+    return (text or "").strip().lower()
+
+
+def _split_hashtags(hashtags: Optional[str]) -> List[str]:
+    tags = re.findall(r"#[^\s#,]+", hashtags or "")
+    return sorted({tag.lower() for tag in tags})
+
+
+def _engagement_keys(
+    category: Optional[str],
+    hook_text: Optional[str],
+    cta_text: Optional[str],
+    hashtags: Optional[str]
+) -> List[Tuple[str, str]]:
+    keys = [
+        ("overall", ""),
+        ("category", _normalize_key(category)),
+        ("hook", _normalize_key(hook_text)),
+        ("cta", _normalize_key(cta_text))
+    ]
+    keys.extend(("hashtag", tag) for tag in _split_hashtags(hashtags))
+    return keys
+
+
+def record_engagement_sample(
+    conn,
+    user_id: str,
+    category: Optional[str],
+    hook_text: Optional[str],
+    cta_text: Optional[str],
+    hashtags: Optional[str],
+    rate: float
+) -> None:
+    """Add one metrics sample to the user's aggregates (caller commits)."""
+    now = datetime.utcnow().isoformat()
+    conn.executemany(
+        """
+        INSERT INTO autopost_engagement_aggregates (user_id, dimension, key, rate_sum, samples, updated_at)
+        VALUES (?, ?, ?, ?, 1, ?)
+        ON CONFLICT(user_id, dimension, key)
+        DO UPDATE SET rate_sum = rate_sum + excluded.rate_sum, samples = samples + 1, updated_at = excluded.updated_at
+        """,
+        [
+            (user_id, dimension, key, float(rate), now)
+            for dimension, key in _engagement_keys(category, hook_text, cta_text, hashtags)
+        ]
+    )
+
+
+def rebuild_engagement_aggregates(conn) -> int:
+    """Recompute every aggregate from autopost_metrics (backfill); returns the samples replayed."""
+    rows = conn.execute(
+        """
+        SELECT m.user_id, v.category, v.hook_text, v.cta_text, v.hashtags,
+               m.views, m.likes, m.comments, m.shares
+        FROM autopost_metrics m
+        JOIN autopost_videos v ON v.id = m.video_id
+        """
+    ).fetchall()
+    conn.execute("DELETE FROM autopost_engagement_aggregates")
+    for row in rows:
+        rate = _engagement_rate(
+            int(row["views"] or 0),
+            int(row["likes"] or 0),
+            int(row["comments"] or 0),
+            int(row["shares"] or 0)
+        )
+        record_engagement_sample(
+            conn, row["user_id"], row["category"], row["hook_text"], row["cta_text"], row["hashtags"], rate
+        )
+    conn.commit()
+    return len(rows)
+
+
+def get_engagement_rates(
+    conn,
+    user_id: str,
+    category: Optional[str],
+    hook_text: Optional[str],
+    cta_text: Optional[str],
+    trend_tags: List[str]
+) -> Dict[str, Optional[float]]:
+    """
+    Average engagement rate overall and for the given category/hook/CTA, plus the pooled
+    rate of the trend hashtags; None where the user has no samples.
+    """
+    lookups: List[Tuple[str, str]] = [("overall", "")]
+    if category:
+        lookups.append(("category", _normalize_key(category)))
+    if hook_text:
+        lookups.append(("hook", _normalize_key(hook_text)))
+    if cta_text:
+        lookups.append(("cta", _normalize_key(cta_text)))
+    lookups.extend(("hashtag", tag.lower()) for tag in trend_tags if tag)
+    clause = " OR ".join("(dimension = ? AND key = ?)" for _ in lookups)
+    params: List[str] = [user_id]
+    for dimension, key in lookups:
+        params.extend((dimension, key))
+    rows = conn.execute(
+        f"""
+        SELECT dimension, rate_sum, samples
+        FROM autopost_engagement_aggregates
+        WHERE user_id = ? AND ({clause})
+        """,
+        params
+    ).fetchall()
+    totals: Dict[str, List[float]] = {}
+    for row in rows:
+        bucket = totals.setdefault(row["dimension"], [0.0, 0.0])
+        bucket[0] += float(row["rate_sum"] or 0.0)
+        bucket[1] += float(row["samples"] or 0)
+    return {
+        dimension: (totals[dimension][0] / totals[dimension][1]) if totals.get(dimension, [0, 0])[1] else None
+        for dimension in ENGAGEMENT_DIMENSIONS
+    }
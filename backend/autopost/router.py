@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, UploadFile, Request  # type: ignore
 from typing import Any, Dict, Optional, Callable
 
@@ -55,6 +57,7 @@ def create_autopost_router(
         current_user: Dict[str, Any] = Depends(get_current_user)
     ):
         user_id = current_user.get("id")
-        return service.regenerate_metadata(user_id, video_id)
+        # Scoring and the metadata write block, so keep them off the event loop.
+        return await asyncio.to_thread(service.regenerate_metadata, user_id, video_id)
 
     return router
@@ -3,15 +3,16 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, ContextManager, Dict, List, Optional, Tuple
 from uuid import uuid4
+import asyncio
 import json
 import logging
 import os
 
 from fastapi import BackgroundTasks, HTTPException, UploadFile  # type: ignore
 
-from .generator import generate_metadata, generate_variants
+from .generator import VariantMetadata, generate_metadata, generate_variants
 from .scoring import build_score_reasons
 from .scheduler import get_best_posting_window, resolve_schedule_time
 from .feedback import (
@@ -34,6 +35,7 @@ class AutopostDeps:
     default_threshold: float
     scene_provider: str
     get_db_connection: Callable[[], Any]
+    write_transaction: Callable[[], ContextManager[Any]]
     enforce_rate_limit: Callable[[str], None]
     get_user_profile: Callable[[str], Dict[str, Any]]
     update_user_trial_remaining: Callable[[str, int], Dict[str, Any]]
@@ -41,6 +43,7 @@ class AutopostDeps:
     get_trend_context: Callable[..., Any]
     get_scene_signals: Callable[[str], Optional[Dict[str, Any]]]
     score_video_metadata: Callable[..., Dict[str, Any]]
+    score_video_metadata_batch: Callable[..., List[Dict[str, Any]]]
     adjust_threshold_with_feedback: Callable[[float, Dict[str, Any], float], float]
     schedule_next_check: Callable[[], str]
     now_iso: Callable[[], str]
@@ -48,7 +51,6 @@ class AutopostDeps:
     broadcast_event: BroadcastFn
     cleanup_old_temp_videos: Callable[[], None]
     async_scene_analysis: Callable[[int, str, str], None]
-    recheck_due_videos: Callable[[Any, str], int]
     active_tasks: Callable[[str], int]
 
 
@@ -83,6 +85,45 @@ class AutopostService:
         if decrement:
             self.deps.update_user_trial_remaining(user_id, remaining - 1)
 
+    def _feedback_weights(self, user_id: str) -> Tuple[Dict[str, Dict[str, float]], float]:
+        """Refresh the learned pattern weights and read them back in one write transaction."""
+        with self.deps.write_transaction() as conn:
+            refresh_feedback_weights(conn, user_id)
+            refresh_global_feedback_weights(conn)
+            user_weights = get_feedback_weights(conn, user_id)
+            global_weights = get_global_feedback_weights(conn)
+            strength = get_learning_strength(conn, user_id)
+        return merge_weights(global_weights, user_weights, strength), strength
+
+    def _score_variants(
+        self,
+        variants: List[VariantMetadata],
+        caption: Optional[str],
+        category: Optional[str],
+        user_id: str
+    ) -> List[Dict[str, Any]]:
+        """Score generated variants in one batch call, best first."""
+        details_list = self.deps.score_video_metadata_batch(
+            [
+                {
+                    "title": variant.title,
+                    "caption": caption,
+                    "hook_text": variant.hook_text,
+                    "cta_text": variant.cta_text,
+                    "hashtags": variant.hashtags
+                }
+                for variant in variants
+            ],
+            category,
+            user_id
+        )
+        scored_variants = [
+            {"variant": variant, "score": float(details.get("score", 0.0))}
+            for variant, details in zip(variants, details_list)
+        ]
+        scored_variants.sort(key=lambda v: v["score"], reverse=True)
+        return scored_variants
+
     async def upload_video(
         self,
         file: UploadFile,
@@ -157,13 +198,7 @@ class AutopostService:
             trend_list, _, _ = self.deps.get_trend_context(title, caption, hook_text, cta_text, hashtags, category)
             trend_tag = trend_list[0] if trend_list else None
 
-            conn = self.deps.get_db_connection()
-            refresh_feedback_weights(conn, user_id)
-            refresh_global_feedback_weights(conn)
-            user_weights = get_feedback_weights(conn, user_id)
-            global_weights = get_global_feedback_weights(conn)
-            strength = get_learning_strength(conn, user_id)
-            weights = merge_weights(global_weights, user_weights, strength)
+            weights, strength = await asyncio.to_thread(self._feedback_weights, user_id)
 
             if title or hook_text or cta_text or hashtags:
                 generated = generate_metadata(title, hook_text, cta_text, hashtags, category, trend_tag=trend_tag)
@@ -174,23 +209,7 @@ class AutopostService:
                 sources = generated.sources
             else:
                 variants = generate_variants(category, trend_tag, weights, count=5)
-                scored_variants: List[Dict[str, Any]] = []
-                for variant in variants:
-                    details = self.deps.score_video_metadata(
-                        variant.title,
-                        caption,
-                        variant.hook_text,
-                        variant.cta_text,
-                        variant.hashtags,
-                        category,
-                        user_id,
-                        None
-                    )
-                    scored_variants.append({
-                        "variant": variant,
-                        "score": float(details.get("score", 0.0))
-                    })
-                scored_variants.sort(key=lambda v: v["score"], reverse=True)
+                scored_variants = self._score_variants(variants, caption, category, user_id)
                 best = scored_variants[0]["variant"]
                 logger.info(f"[AI VARIANTS] video={file.filename} scores={[round(v['score'], 2) for v in scored_variants]} strength={round(strength, 2)}")
                 logger.info(f"[AI VARIANTS] selected hook_pattern={best.hook_pattern} cta_pattern={best.cta_pattern} hashtag_pattern={best.hashtag_pattern}")
@@ -234,60 +253,61 @@ class AutopostService:
                 status = "QUEUED" if score >= threshold else "WAITING_RECHECK"
                 next_check_at = None if status == "QUEUED" else self.deps.schedule_next_check()
 
-            cursor = conn.cursor()
-            scheduled_at = None
-            status_note = None
-            if status == "QUEUED":
-                preferred_window = get_best_posting_window(conn, user_id)
-                scheduled_at_dt = resolve_schedule_time(datetime.now(), preferred_window)
-                if scheduled_at_dt:
-                    scheduled_at = scheduled_at_dt.isoformat()
-                    status_note = "scheduled"
+            def _insert_record() -> Tuple[int, Optional[str], Optional[str]]:
+                with self.deps.write_transaction() as conn:
+                    scheduled_at = None
+                    status_note = None
+                    if status == "QUEUED":
+                        preferred_window = get_best_posting_window(conn, user_id)
+                        scheduled_at_dt = resolve_schedule_time(datetime.now(), preferred_window)
+                        if scheduled_at_dt:
+                            scheduled_at = scheduled_at_dt.isoformat()
+                            status_note = "scheduled"
+
+                    cursor = conn.execute(
+                        """
+                        INSERT INTO autopost_videos
+                        (user_id, file_name, file_path, title, caption, hook_text, cta_text, hashtags, category,
+                         title_source, hook_source, cta_source, hashtags_source,
+                         status, score, score_details, score_reasons, threshold, next_check_at, scheduled_at, status_note,
+                         created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            user_id,
+                            file.filename,
+                            str(file_path),
+                            title,
+                            caption,
+                            hook_text,
+                            cta_text,
+                            hashtags,
+                            category,
+                            sources.get("title_source"),
+                            sources.get("hook_source"),
+                            sources.get("cta_source"),
+                            sources.get("hashtags_source"),
+                            status,
+                            score,
+                            json.dumps(details),
+                            json.dumps(score_reasons),
+                            threshold,
+                            next_check_at,
+                            scheduled_at,
+                            status_note,
+                            self.deps.now_iso(),
+                            self.deps.now_iso()
+                        )
+                    )
+                    return cursor.lastrowid, scheduled_at, status_note
 
-            cursor.execute(
-                """
-                INSERT INTO autopost_videos
-                (user_id, file_name, file_path, title, caption, hook_text, cta_text, hashtags, category,
-                 title_source, hook_source, cta_source, hashtags_source,
-                 status, score, score_details, score_reasons, threshold, next_check_at, scheduled_at, status_note,
-                 created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    file.filename,
-                    str(file_path),
-                    title,
-                    caption,
-                    hook_text,
-                    cta_text,
-                    hashtags,
-                    category,
-                    sources.get("title_source"),
-                    sources.get("hook_source"),
-                    sources.get("cta_source"),
-                    sources.get("hashtags_source"),
-                    status,
-                    score,
-                    json.dumps(details),
-                    json.dumps(score_reasons),
-                    threshold,
-                    next_check_at,
-                    scheduled_at,
-                    status_note,
-                    self.deps.now_iso(),
-                    self.deps.now_iso()
-                )
-            )
-            record_id = cursor.lastrowid
-            conn.commit()
+            record_id, scheduled_at, status_note = await asyncio.to_thread(_insert_record)
             remaining_coins = coins
 
             if self.deps.scene_provider != "none" and background_tasks is not None:
                 background_tasks.add_task(self.deps.async_scene_analysis, record_id, str(file_path), user_id)
             if not bool(profile.get("subscribed")):
                 self._trial_guard(profile, user_id, decrement=True)
-            conn.close()
 
             response_payload = {
                 "id": record_id,
@@ -325,7 +345,6 @@ class AutopostService:
             raise HTTPException(status_code=400, detail="User ID not found in token")
 
         conn = self.deps.get_db_connection()
-        self.deps.recheck_due_videos(conn, user_id)
         self.deps.cleanup_old_temp_videos()
         if status:
             rows = conn.execute(
@@ -369,8 +388,8 @@ class AutopostService:
             "SELECT * FROM autopost_videos WHERE id = ? AND user_id = ?",
             (video_id, user_id)
         ).fetchone()
+        conn.close()
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Video not found")
 
         category = row["category"]
@@ -380,31 +399,10 @@ class AutopostService:
 
         trend_list, _, _ = self.deps.get_trend_context(None, caption, None, None, None, category)
         trend_tag = trend_list[0] if trend_list else None
-        refresh_feedback_weights(conn, user_id)
-        refresh_global_feedback_weights(conn)
-        user_weights = get_feedback_weights(conn, user_id)
-        global_weights = get_global_feedback_weights(conn)
-        strength = get_learning_strength(conn, user_id)
-        weights = merge_weights(global_weights, user_weights, strength)
+        weights, strength = self._feedback_weights(user_id)
 
         variants = generate_variants(category, trend_tag, weights, count=5)
-        scored_variants: List[Dict[str, Any]] = []
-        for variant in variants:
-            details = self.deps.score_video_metadata(
-                variant.title,
-                caption,
-                variant.hook_text,
-                variant.cta_text,
-                variant.hashtags,
-                category,
-                user_id,
-                None
-            )
-            scored_variants.append({
-                "variant": variant,
-                "score": float(details.get("score", 0.0))
-            })
-        scored_variants.sort(key=lambda v: v["score"], reverse=True)
+        scored_variants = self._score_variants(variants, caption, category, user_id)
         best = scored_variants[0]["variant"]
         logger.info(f"[AI VARIANTS] video_id={video_id} scores={[round(v['score'], 2) for v in scored_variants]} strength={round(strength, 2)}")
         logger.info(f"[AI VARIANTS] selected hook_pattern={best.hook_pattern} cta_pattern={best.cta_pattern} hashtag_pattern={best.hashtag_pattern}")
@@ -452,6 +450,8 @@ class AutopostService:
                 new_status = "QUEUED" if score >= threshold else "WAITING_RECHECK"
                 next_check_at = None if new_status == "QUEUED" else self.deps.schedule_next_check()
 
+        # Scoring ran without a transaction; the schedule lookup and update share one.
+        with self.deps.write_transaction() as conn:
             if new_status == "QUEUED":
                 preferred_window = get_best_posting_window(conn, user_id)
                 scheduled_at_dt = resolve_schedule_time(datetime.now(), preferred_window)
@@ -459,42 +459,40 @@ class AutopostService:
                     scheduled_at = scheduled_at_dt.isoformat()
                     status_note = "scheduled"
 
-        conn.execute(
-            """
-            UPDATE autopost_videos
-            SET title = ?, hook_text = ?, cta_text = ?, hashtags = ?,
-                title_source = ?, hook_source = ?, cta_source = ?, hashtags_source = ?,
-                score = ?, score_details = ?, score_reasons = ?, threshold = ?,
-                status = ?, next_check_at = ?, scheduled_at = ?, status_note = ?,
-                updated_at = ?
-            WHERE id = ? AND user_id = ?
-            """,
-            (
-                title,
-                hook_text,
-                cta_text,
-                hashtags,
-                "ai_generated",
-                "ai_generated",
-                "ai_generated",
-                "ai_generated",
-                score,
-                json.dumps(details),
-                json.dumps(score_reasons),
-                threshold,
-                new_status,
-                next_check_at,
-                scheduled_at,
-                status_note,
-                self.deps.now_iso(),
-                video_id,
-                user_id
+            conn.execute(
+                """
+                UPDATE autopost_videos
+                SET title = ?, hook_text = ?, cta_text = ?, hashtags = ?,
+                    title_source = ?, hook_source = ?, cta_source = ?, hashtags_source = ?,
+                    score = ?, score_details = ?, score_reasons = ?, threshold = ?,
+                    status = ?, next_check_at = ?, scheduled_at = ?, status_note = ?,
+                    updated_at = ?
+                WHERE id = ? AND user_id = ?
+                """,
+                (
+                    title,
+                    hook_text,
+                    cta_text,
+                    hashtags,
+                    "ai_generated",
+                    "ai_generated",
+                    "ai_generated",
+                    "ai_generated",
+                    score,
+                    json.dumps(details),
+                    json.dumps(score_reasons),
+                    threshold,
+                    new_status,
+                    next_check_at,
+                    scheduled_at,
+                    status_note,
+                    self.deps.now_iso(),
+                    video_id,
+                    user_id
+                )
             )
-        )
-        conn.commit()
         if not bool(profile.get("subscribed")):
             self._trial_guard(profile, user_id, decrement=True)
-        conn.close()
 
         hashtag_list = [tag for tag in (hashtags or "").split() if tag]
         return {
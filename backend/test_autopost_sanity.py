@@ -30,6 +30,7 @@ def _build_test_service(temp_dir: Path, active_tasks_state: dict) -> AutopostSer
         default_threshold=7.0,
         scene_provider="none",
         get_db_connection=app_module.get_db_connection,
+        write_transaction=app_module.DB_POOL.write,
         enforce_rate_limit=_noop,
         get_user_profile=lambda _user_id: {
             "trial_upload_remaining": 3,
@@ -40,6 +41,9 @@ def _build_test_service(temp_dir: Path, active_tasks_state: dict) -> AutopostSer
         get_trend_context=lambda *_args, **_kwargs: ([], None, None),
         get_scene_signals=lambda *_args, **_kwargs: None,
         score_video_metadata=lambda *_args, **_kwargs: {"score": 9.5, "feedback": {}, "trend_similarity": 0.0},
+        score_video_metadata_batch=lambda items, *_args, **_kwargs: [
+            {"score": 9.5, "feedback": {}, "trend_similarity": 0.0} for _ in items
+        ],
         adjust_threshold_with_feedback=lambda default, *_args, **_kwargs: default,
         schedule_next_check=app_module._schedule_next_check,
         now_iso=app_module._now_iso,
@@ -47,7 +51,6 @@ def _build_test_service(temp_dir: Path, active_tasks_state: dict) -> AutopostSer
         broadcast_event=_noop_async,
         cleanup_old_temp_videos=_noop,
         async_scene_analysis=_noop_async,
-        recheck_due_videos=lambda *_args, **_kwargs: 0,
         active_tasks=active_tasks
     )
     return AutopostService(deps)
@@ -176,9 +179,13 @@ def run_sanity_tests():
         assert resp.status_code == 400
 
         # generate-image validation: missing prompt + invalid base64
-        original_get_user_profile = app_module.get_user_profile
+        original_get_user_profile_async = app_module.get_user_profile_async
         original_update_user_coins = app_module.update_user_coins
-        app_module.get_user_profile = lambda _user_id: {"coins_balance": 1000}
+
+        async def _profile_with_coins(_user_id):
+            return {"coins_balance": 1000}
+
+        app_module.get_user_profile_async = _profile_with_coins
         app_module.update_user_coins = _noop
         try:
             resp = client.post("/api/generate-image", json={})
@@ -227,7 +234,7 @@ def run_sanity_tests():
             )
             assert resp.status_code == 422
         finally:
-            app_module.get_user_profile = original_get_user_profile
+            app_module.get_user_profile_async = original_get_user_profile_async
             app_module.update_user_coins = original_update_user_coins
 
         # scheduler: resolve_schedule_time
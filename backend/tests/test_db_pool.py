@@ -0,0 +1,89 @@
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.db_pool import SQLitePool  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / "premium_studio.db"), busy_timeout_ms=2000)
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    return pool
+
+
+def _names(pool: SQLitePool):
+    conn = pool.acquire()
+    try:
+        return [row["name"] for row in conn.execute("SELECT name FROM items ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_write_commits_on_success_and_rolls_back_on_error(pool):
+    with pool.write() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('kept')")
+    with pytest.raises(RuntimeError):
+        with pool.write() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('dropped')")
+            raise RuntimeError("boom")
+
+    assert _names(pool) == ["kept"]
+    assert pool.get_stats()["in_use"] == 0
+
+
+def test_write_records_time_spent_waiting_for_the_write_lock(pool):
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold_write_lock():
+        with pool.write() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('first')")
+            holding.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    assert holding.wait(5)
+    threading.Timer(0.2, release.set).start()
+    with pool.write() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('second')")
+    holder.join(5)
+
+    stats = pool.get_stats()
+    assert _names(pool) == ["first", "second"]
+    assert stats["writes"] == 3
+    assert stats["write_wait_ms_max"] >= 100
+    assert stats["write_wait_ms_avg"] > 0
+    assert stats["write_busy_errors"] == 0
+
+
+def test_write_counts_writers_that_give_up_after_busy_timeout(tmp_path):
+    path = str(tmp_path / "premium_studio.db")
+    pool = SQLitePool(path, busy_timeout_ms=50)
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.write():
+                pass
+        assert time.perf_counter() - start >= 0.04
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+    stats = pool.get_stats()
+    assert stats["write_busy_errors"] == 1
+    assert stats["writes"] == 1
+    assert stats["in_use"] == 0
@@ -0,0 +1,65 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.job_queue import (  # noqa: E402
+    JOB_STATUS_FAILED,
+    JOB_STATUS_RUNNING,
+    JobQueue,
+)
+
+
+async def _noop_handler(_job, _report):
+    return None
+
+
+def _queue(db_path: str) -> JobQueue:
+    queue = JobQueue(db_path, workers=1)
+    queue.register("noop", _noop_handler)
+    return queue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "premium_studio.db")
+    JobQueue(path).init_schema()
+    return path
+
+
+def _expire_lease(db_path: str, job_id: str) -> None:
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "UPDATE generation_jobs SET lease_until = ? WHERE id = ?", ("2000-01-01T00:00:00", job_id)
+    )
+    connection.commit()
+    connection.close()
+
+
+def test_recovery_leaves_jobs_with_a_live_lease_alone(db_path):
+    owner, other = _queue(db_path), _queue(db_path)
+    job = owner.enqueue("user-1", "noop", {})
+    claimed = owner._claim_next()
+    assert claimed["id"] == job["id"]
+    assert claimed["worker_id"] == owner.worker_id
+
+    # A second process starting up must not fail the first one's in-flight job.
+    assert other.recover_interrupted() == 0
+    assert owner.get(job["id"])["status"] == JOB_STATUS_RUNNING
+    assert owner._update(job["id"], progress=0.5) is True
+
+
+def test_recovery_takes_jobs_whose_lease_expired(db_path):
+    owner, other = _queue(db_path), _queue(db_path)
+    job = owner.enqueue("user-1", "noop", {})
+    owner._claim_next()
+    _expire_lease(db_path, job["id"])
+
+    assert other.recover_interrupted() == 1
+    recovered = other.get(job["id"])
+    assert recovered["status"] == JOB_STATUS_FAILED
+    # The original owner lost the job and can no longer overwrite it.
+    assert owner._update(job["id"], progress=1.0) is False
@@ -0,0 +1,57 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.qdrant_trends import QdrantTrendStore, qdrant_point_id  # noqa: E402
+
+
+class _FakeQdrant:
+    """Just enough of the Qdrant REST API for QdrantTrendStore.sync."""
+
+    def __init__(self, points):
+        self.points = dict(points)
+        self.deleted = []
+
+    def __call__(self, request):
+        path = request.url.path
+        body = json.loads(request.content) if request.content else {}
+        if path.endswith("/index") or request.method == "GET":
+            return httpx.Response(200, json={"result": {"config": {"params": {"vectors": {"size": 2}}}}})
+        if path.endswith("/points/scroll"):
+            points = [{"id": point_id, "payload": payload} for point_id, payload in self.points.items()]
+            return httpx.Response(200, json={"result": {"points": points, "next_page_offset": None}})
+        if path.endswith("/points/delete"):
+            for point_id in body["points"]:
+                # Like Qdrant: IDs are unsigned integers or UUID strings, nothing else.
+                if isinstance(point_id, str) and not point_id.count("-") == 4:
+                    return httpx.Response(400, json={"status": {"error": f"invalid id {point_id!r}"}})
+                self.deleted.append(point_id)
+                self.points.pop(point_id, None)
+            return httpx.Response(200, json={"result": {}})
+        if path.endswith("/points"):
+            for point in body["points"]:
+                self.points[point["id"]] = point["payload"]
+            return httpx.Response(200, json={"result": {}})
+        return httpx.Response(404)
+
+
+def test_sync_deletes_legacy_integer_point_ids():
+    fake = _FakeQdrant({1: {"hashtag": "#old"}, 2: {"hashtag": "#older"}})
+    store = QdrantTrendStore("http://qdrant.test", "", "trends")
+    store._client = httpx.Client(transport=httpx.MockTransport(fake))
+    content_hash = "ab" * 32
+    payload = {"hashtag": "#new", "category": "fashion"}
+
+    stats = store.sync([content_hash], [[0.1, 0.2]], [payload])
+
+    assert stats == {"upserted": 1, "deleted": 2, "unchanged": 0}
+    assert sorted(fake.deleted) == [1, 2]
+    assert fake.points == {qdrant_point_id(content_hash): payload}
+    # A second sync finds nothing to do.
+    assert store.sync([content_hash], [[0.1, 0.2]], [payload]) == {"upserted": 0, "deleted": 0, "unchanged": 1}
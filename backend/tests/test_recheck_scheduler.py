@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.recheck_scheduler import RecheckScheduler  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "premium_studio.db"
+    connection = sqlite3.connect(str(path))
+    connection.execute(
+        """
+        CREATE TABLE autopost_videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            next_check_at TEXT
+        )
+        """
+    )
+    connection.commit()
+    connection.close()
+    return str(path)
+
+
+def _insert(db_path: str, user_id: str, status: str, next_check_at: str) -> int:
+    connection = sqlite3.connect(db_path)
+    cursor = connection.execute(
+        "INSERT INTO autopost_videos (user_id, status, next_check_at) VALUES (?, ?, ?)",
+        (user_id, status, next_check_at)
+    )
+    connection.commit()
+    connection.close()
+    return int(cursor.lastrowid)
+
+
+def _row(db_path: str, video_id: int):
+    connection = sqlite3.connect(db_path)
+    row = connection.execute(
+        "SELECT status, next_check_at FROM autopost_videos WHERE id = ?", (video_id,)
+    ).fetchone()
+    connection.close()
+    return row
+
+
+def _past() -> str:
+    return (datetime.now() - timedelta(minutes=5)).isoformat()
+
+
+def test_claimed_row_is_not_claimed_again(db_path):
+    video_id = _insert(db_path, "user-1", "WAITING_RECHECK", _past())
+    other_id = _insert(db_path, "user-1", "QUEUED", _past())
+    scheduler = RecheckScheduler(db_path, handler=lambda _video_id: None, lease_seconds=600)
+
+    assert scheduler._claim_due(10) == [video_id]
+    assert scheduler._claim_due(10) == []
+    # A second scheduler on the same database sees the lease too.
+    assert RecheckScheduler(db_path, handler=lambda _video_id: None)._claim_due(10) == []
+    assert _row(db_path, other_id)[1] is not None
+
+
+def test_claim_respects_user_filter(db_path):
+    mine = _insert(db_path, "user-1", "WAITING_RECHECK", _past())
+    theirs = _insert(db_path, "user-2", "WAITING_RECHECK", _past())
+    scheduler = RecheckScheduler(db_path, handler=lambda _video_id: None)
+
+    assert scheduler._claim_due(10, "user-1") == [mine]
+    assert scheduler._claim_due(10) == [theirs]
+
+
+def test_sweep_reschedules_rows_still_waiting(db_path):
+    original = _past()
+    waiting_id = _insert(db_path, "user-1", "WAITING_RECHECK", original)
+    queued_id = _insert(db_path, "user-1", "WAITING_RECHECK", original)
+    seen = []
+
+    def handler(video_id: int):
+        seen.append(video_id)
+        if video_id == queued_id:
+            connection = sqlite3.connect(db_path)
+            connection.execute(
+                "UPDATE autopost_videos SET status = 'QUEUED', next_check_at = NULL WHERE id = ?",
+                (video_id,)
+            )
+            connection.commit()
+            connection.close()
+            return "user-1", "QUEUED"
+        return "user-1", "WAITING_RECHECK"
+
+    scheduler = RecheckScheduler(db_path, handler=handler, batch_size=1, lease_seconds=600)
+    try:
+        assert asyncio.run(scheduler.sweep()) == 2
+    finally:
+        asyncio.run(scheduler.stop())
+
+    assert sorted(seen) == [waiting_id, queued_id]
+    status, next_check_at = _row(db_path, waiting_id)
+    assert status == "WAITING_RECHECK"
+    assert next_check_at != original
+    assert next_check_at > datetime.now().isoformat()
+    assert _row(db_path, queued_id) == ("QUEUED", None)
+
+    stats = scheduler.get_stats()
+    assert stats["rechecked"] == 2
+    assert stats["queued"] == 1
+    # The rescheduled row is not due, so another sweep finds nothing.
+    assert asyncio.run(scheduler.sweep()) == 0
@@ -0,0 +1,226 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.schema_migrations import (  # noqa: E402
+    MIGRATIONS,
+    Migration,
+    apply_migrations,
+    get_schema_version,
+)
+
+
+# (name, SQL as issued by the app, bound parameters, index every plan must use)
+HOT_QUERIES = [
+    (
+        "task_poll_next_queued",
+        "SELECT * FROM autopost_videos WHERE user_id = ? AND status = 'QUEUED' ORDER BY created_at ASC LIMIT 1",
+        ("user-1",),
+        "idx_autopost_videos_user_status_created",
+    ),
+    (
+        "dashboard_by_status",
+        "SELECT * FROM autopost_videos WHERE user_id = ? AND status = ? ORDER BY created_at DESC",
+        ("user-1", "QUEUED"),
+        "idx_autopost_videos_user_status_created",
+    ),
+    (
+        "dashboard_all",
+        "SELECT * FROM autopost_videos WHERE user_id = ? ORDER BY created_at DESC",
+        ("user-1",),
+        "idx_autopost_videos_user_created",
+    ),
+    (
+        "active_task_count",
+        """
+        SELECT COUNT(1) as total
+        FROM autopost_videos
+        WHERE user_id = ?
+          AND status IN ('QUEUED', 'IN_PROGRESS', 'WAITING_RECHECK', 'PROCESSING', 'RETRYING')
+        """,
+        ("user-1",),
+        "idx_autopost_videos_user_status_created",
+    ),
+    (
+        "recheck_sweep",
+        "SELECT id, next_check_at FROM autopost_videos "
+        "WHERE status = 'WAITING_RECHECK' AND next_check_at IS NOT NULL AND next_check_at <= ? "
+        "ORDER BY next_check_at ASC LIMIT ?",
+        ("2026-01-01T00:00:00", 50),
+        "idx_autopost_videos_status_next_check",
+    ),
+    (
+        "insights_recent_videos",
+        "SELECT * FROM autopost_videos WHERE user_id = ? ORDER BY created_at DESC LIMIT 30",
+        ("user-1",),
+        "idx_autopost_videos_user_created",
+    ),
+    (
+        "insights_recent_metrics",
+        "SELECT * FROM autopost_metrics WHERE user_id = ? ORDER BY created_at DESC LIMIT 50",
+        ("user-1",),
+        "idx_autopost_metrics_user_created",
+    ),
+    (
+        "posting_window_metrics",
+        """
+        SELECT views, likes, comments, shares, posted_at, created_at
+        FROM autopost_metrics
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT 200
+        """,
+        ("user-1",),
+        "idx_autopost_metrics_user_created",
+    ),
+    (
+        "learning_strength_count",
+        "SELECT COUNT(*) AS total FROM autopost_metrics WHERE user_id = ?",
+        ("user-1",),
+        "idx_autopost_metrics_user_created",
+    ),
+    (
+        "user_feedback_weights",
+        """
+        SELECT v.hook_text, v.cta_text, v.hashtags,
+               m.views, m.likes, m.comments, m.shares
+        FROM autopost_metrics m
+        JOIN autopost_videos v ON v.id = m.video_id
+        WHERE m.user_id = ?
+        ORDER BY m.created_at DESC
+        LIMIT 200
+        """,
+        ("user-1",),
+        "idx_autopost_metrics_user_created",
+    ),
+    (
+        "global_feedback_weights",
+        """
+        SELECT v.hook_text, v.cta_text, v.hashtags,
+               m.views, m.likes, m.comments, m.shares
+        FROM autopost_metrics m
+        JOIN autopost_videos v ON v.id = m.video_id
+        ORDER BY m.created_at DESC
+        LIMIT 500
+        """,
+        (),
+        "idx_autopost_metrics_created",
+    ),
+    (
+        "admin_activity_log",
+        """
+        SELECT v.*,
+               m.views, m.likes, m.comments, m.shares,
+               m.avg_watch_time, m.retention_curve,
+               m.created_at AS metrics_created_at
+        FROM autopost_videos v
+        LEFT JOIN autopost_metrics m
+          ON m.video_id = v.id
+         AND m.created_at = (
+             SELECT MAX(created_at) FROM autopost_metrics
+             WHERE video_id = v.id
+         )
+        ORDER BY v.created_at DESC
+        LIMIT ?
+        """,
+        (100,),
+        "idx_autopost_metrics_video_created",
+    ),
+    (
+        "competitors_list",
+        "SELECT * FROM autopost_competitors WHERE user_id = ? ORDER BY created_at DESC",
+        ("user-1",),
+        "idx_autopost_competitors_user_created",
+    ),
+    (
+        "admin_audit_logs",
+        "SELECT * FROM admin_audit_logs ORDER BY created_at DESC LIMIT ?",
+        (100,),
+        "idx_admin_audit_logs_created",
+    ),
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "premium_studio.db"))
+    apply_migrations(connection)
+    yield connection
+    connection.close()
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params) -> list:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+@pytest.mark.parametrize("name,sql,params,index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(conn, name, sql, params, index):
+    plan = _plan(conn, sql, params)
+    assert any(index in step for step in plan), f"{name} does not use {index}: {plan}"
+    # A plain "SCAN <table>" (no index) or a sort step means the index no longer matches the query shape.
+    for step in plan:
+        assert not (step.startswith("SCAN ") and "INDEX" not in step), f"{name} scans a table: {plan}"
+        assert "TEMP B-TREE" not in step, f"{name} sorts in a temp b-tree: {plan}"
+
+
+def test_migrations_record_version_and_are_idempotent(conn):
+    assert get_schema_version(conn) == max(m.version for m in MIGRATIONS)
+    assert apply_migrations(conn) == []
+    recorded = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert recorded == [m.version for m in MIGRATIONS]
+
+
+def test_legacy_database_gets_missing_columns_and_indexes(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "legacy.db"))
+    connection.execute(
+        """
+        CREATE TABLE autopost_videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            title TEXT,
+            caption TEXT,
+            hook_text TEXT,
+            cta_text TEXT,
+            hashtags TEXT,
+            category TEXT,
+            status TEXT NOT NULL,
+            score REAL,
+            score_details TEXT,
+            threshold REAL,
+            next_check_at TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            error TEXT
+        )
+        """
+    )
+    connection.commit()
+    assert get_schema_version(connection) == 0
+
+    assert apply_migrations(connection) == [m.version for m in MIGRATIONS]
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(autopost_videos)")}
+    assert {"title_source", "score_reasons", "scheduled_at", "status_note"} <= columns
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(autopost_videos)")}
+    assert "idx_autopost_videos_user_status_created" in indexes
+    connection.close()
+
+
+def test_failed_migration_rolls_back_and_is_retried(conn):
+    def broken(c: sqlite3.Connection) -> None:
+        c.execute("CREATE TABLE migration_probe (id INTEGER)")
+        raise RuntimeError("boom")
+
+    version = max(m.version for m in MIGRATIONS) + 1
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn, [*MIGRATIONS, Migration(version, "broken", broken)])
+    assert get_schema_version(conn) == version - 1
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'migration_probe'").fetchone()
+
+    fixed = Migration(version, "fixed", lambda c: c.execute("CREATE TABLE migration_probe (id INTEGER)"))
+    assert apply_migrations(conn, [*MIGRATIONS, fixed]) == [version]
@@ -0,0 +1,61 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.score_cache import ScoreCache  # noqa: E402
+
+
+def test_batch_waits_for_keys_already_in_flight():
+    cache = ScoreCache(ttl_seconds=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_single():
+        started.set()
+        release.wait(5)
+        return {"score": 1.0}
+
+    single = threading.Thread(target=lambda: cache.get_or_compute("a", slow_single))
+    single.start()
+    assert started.wait(5)
+
+    computed = []
+
+    def compute(positions):
+        computed.append(list(positions))
+        return [{"score": 2.0} for _ in positions]
+
+    batch_result = {}
+    batch = threading.Thread(
+        target=lambda: batch_result.setdefault("value", cache.get_or_compute_many(["a", "b", "b"], compute))
+    )
+    batch.start()
+    deadline = time.time() + 5
+    while cache.get_stats()["single_flight_waits"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    single.join(5)
+    batch.join(5)
+
+    # "a" was being scored by the single call, so the batch computed only "b", once.
+    assert computed == [[1]]
+    assert batch_result["value"] == [{"score": 1.0}, {"score": 2.0}, {"score": 2.0}]
+    assert cache.get_stats()["single_flight_waits"] == 1
+    assert cache.get_stats()["in_flight"] == 0
+
+
+def test_batch_uses_cached_entries_and_stores_new_ones():
+    cache = ScoreCache(ttl_seconds=60)
+    cache.set("a", {"score": 5.0})
+    calls = []
+
+    def compute(positions):
+        calls.append(list(positions))
+        return [{"score": 7.0}]
+
+    assert cache.get_or_compute_many(["a", "b"], compute) == [{"score": 5.0}, {"score": 7.0}]
+    assert calls == [[1]]
+    assert cache.get_or_compute_many(["b"], compute) == [{"score": 7.0}]
+    assert calls == [[1]]